@@ -5,14 +5,15 @@ import plotly.graph_objects as go
 from datetime import datetime
 import time
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 # Import custom modules
-from services.chat_engine import ChatEngine
 from services.faq_scraper import FAQScraper
+from services.registry import registry
 from models.churn_model import ChurnPredictor
 from utils.metrics import MetricsTracker
 from utils.data_processor import DataProcessor
@@ -265,14 +266,25 @@ st.markdown("""
 # Initialize session state
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+# Chat engine, churn model and metrics store are shared by all sessions through the
+# process-wide registry; each session holds a lease that follows FAQ and model file changes
+if 'metrics_store_lease' not in st.session_state:
+    st.session_state.metrics_store_lease = registry.lease('metrics_store')
+if 'metrics_aggregator_lease' not in st.session_state:
+    st.session_state.metrics_aggregator_lease = registry.lease('metrics_aggregator')
 if 'metrics_tracker' not in st.session_state:
-    st.session_state.metrics_tracker = MetricsTracker()
-if 'chat_engine' not in st.session_state:
-    st.session_state.chat_engine = ChatEngine()
-if 'churn_predictor' not in st.session_state:
-    st.session_state.churn_predictor = ChurnPredictor()
-    # Try to load existing model
-    st.session_state.churn_predictor.load_model()
+    st.session_state.metrics_tracker = MetricsTracker(store=st.session_state.metrics_store_lease.get(),
+                                                      aggregator=st.session_state.metrics_aggregator_lease.get(),
+                                                      session_id=uuid.uuid4().hex)
+if 'chat_engine_lease' not in st.session_state:
+    st.session_state.chat_engine_lease = registry.lease('chat_engine')
+if 'churn_predictor_lease' not in st.session_state:
+    st.session_state.churn_predictor_lease = registry.lease('churn_predictor')
+st.session_state.chat_engine = st.session_state.chat_engine_lease.get()
+st.session_state.churn_predictor = st.session_state.churn_predictor_lease.get()
+# Prometheus /metrics endpoint, started once per process
+if os.getenv('METRICS_PORT'):
+    registry.get('metrics_exporter')
 
 # Sidebar
 with st.sidebar:
@@ -292,9 +304,13 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### Quick Stats")
-    metrics = st.session_state.metrics_tracker.get_summary()
-    st.metric("Total Conversations", metrics['total_conversations'])
+    # Service-wide: every session in every app replica
+    metrics = st.session_state.metrics_tracker.get_summary(scope='service')
+    st.metric("Total Conversations", metrics['total_conversations'],
+              help=f"{st.session_state.metrics_tracker.stats.response_time.count} in this session")
     st.metric("Avg Response Time", f"{metrics['avg_response_time']:.2f}s")
+    st.metric("p95 Response Time", f"{metrics['p95_response_time']:.2f}s")
+    st.metric("Avg Time to First Token", f"{metrics['avg_time_to_first_token']:.2f}s")
     if metrics['avg_satisfaction'] > 0:
         st.metric("Avg Satisfaction", f"{metrics['avg_satisfaction']:.1f}/5")
 
@@ -358,13 +374,23 @@ if page == "💬 Chat Assistant":
             'timestamp': datetime.now()
         })
         
-        # Generate response
+        # Stream the response into a placeholder as it arrives
         start_time = time.time()
-        with st.spinner("Thinking..."):
-            response_data = st.session_state.chat_engine.generate_response(
-                user_input,
-                st.session_state.chat_history
-            )
+        placeholder = st.empty()
+        stream = st.session_state.chat_engine.generate_response_stream(
+            user_input,
+            st.session_state.chat_history
+        )
+        streamed_text = ""
+        for chunk in stream:
+            streamed_text += chunk
+            placeholder.markdown(f'''
+            <div class="chat-message assistant-message">
+                <strong>🤖 MTN SmartAssist:</strong><br>
+                {streamed_text}▌
+            </div>
+            ''', unsafe_allow_html=True)
+        response_data = stream.result
         response_time = time.time() - start_time
         
         # Add assistant message
@@ -379,7 +405,10 @@ if page == "💬 Chat Assistant":
         st.session_state.metrics_tracker.log_conversation(
             response_data['intent'],
             response_data['confidence'],
-            response_time
+            response_time,
+            intent_source=response_data.get('intent_source'),
+            time_to_first_token=response_data.get('time_to_first_token'),
+            timings=response_data.get('timings')
         )
         
         st.rerun()
@@ -436,7 +465,19 @@ elif page == "📊 Dashboard":
                     predictions = st.session_state.churn_predictor.predict(customer_df)
                     st.session_state.predictions = predictions
                 st.success("Churn prediction completed!")
-            
+
+            # Single-customer lookup through the shared micro-batching scoring service
+            lookup_id = st.selectbox("Look up a customer", [''] + customer_df['customer_id'].tolist())
+            if lookup_id:
+                customer = customer_df[customer_df['customer_id'] == lookup_id].iloc[0].to_dict()
+                try:
+                    score = registry.get('churn_scoring').score(customer)
+                    col1, col2 = st.columns(2)
+                    col1.metric("Churn Probability", f"{score['churn_probability']:.1%}")
+                    col2.metric("Risk Level", score['risk_level'])
+                except Exception as e:
+                    st.error(f"Could not score {lookup_id}: {e}")
+
             if 'predictions' in st.session_state:
                 pred_df = st.session_state.predictions
                 
@@ -479,7 +520,7 @@ elif page == "📊 Dashboard":
             st.markdown("---")
             st.subheader("💬 Conversation Analytics")
             
-            conv_metrics = st.session_state.metrics_tracker.get_summary()
+            conv_metrics = st.session_state.metrics_tracker.get_summary(history_hours=24, scope='service')
             
             if conv_metrics['total_conversations'] > 0:
                 col1, col2 = st.columns(2)
@@ -498,10 +539,51 @@ elif page == "📊 Dashboard":
                     # Metrics over time
                     st.metric("Average Confidence", f"{conv_metrics['avg_confidence']:.2%}")
                     st.metric("Average Response Time", f"{conv_metrics['avg_response_time']:.2f}s")
+                    st.metric("Response Time p50 / p95 / p99",
+                              f"{conv_metrics['p50_response_time']:.2f}s / {conv_metrics['p95_response_time']:.2f}s / "
+                              f"{conv_metrics['p99_response_time']:.2f}s")
+                    recent = conv_metrics['recent']
+                    st.metric(f"Conversations (last {recent['minutes']:g} min)", recent['conversations'],
+                              help=f"{recent['conversations_per_minute']:.1f}/min, "
+                                   f"avg response {recent['avg_response_time']:.2f}s")
+                    st.metric("Average Time to First Token", f"{conv_metrics['avg_time_to_first_token']:.2f}s")
+                    st.metric("LLM Intent Calls Avoided", f"{conv_metrics['llm_calls_avoided']:.0%}")
+                    response_cache = st.session_state.chat_engine.response_cache
+                    if response_cache is not None:
+                        st.metric("Response Cache Hit Rate", f"{response_cache.stats()['hit_rate']:.0%}")
+                    semantic_cache = st.session_state.chat_engine.semantic_cache
+                    if semantic_cache is not None:
+                        st.metric("Near-Duplicate Cache Hit Rate", f"{semantic_cache.stats()['hit_rate']:.0%}")
                     if conv_metrics['avg_satisfaction'] > 0:
                         st.metric("Customer Satisfaction", f"{conv_metrics['avg_satisfaction']:.1f}/5")
+                
+                # Where response time goes, stage by stage
+                stage_latency = conv_metrics['stage_latency_ms']
+                if stage_latency:
+                    st.subheader("⏱️ Stage Latency")
+                    st.dataframe(pd.DataFrame([
+                        {'Stage': stage, 'Avg Time (ms)': round(ms, 1)}
+                        for stage, ms in sorted(stage_latency.items(), key=lambda item: -item[1])
+                    ]), use_container_width=True)
             else:
                 st.info("No conversation data available yet. Start chatting to see analytics!")
+            
+            # All sessions, from the durable metrics store's rollups
+            history = conv_metrics.get('history')
+            if history and history['total_conversations'] > 0:
+                st.subheader("🌍 All Sessions (last 24h)")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Conversations", history['total_conversations'])
+                col2.metric("Avg Response Time", f"{history['avg_response_time']:.2f}s")
+                col3.metric("p95 Response Time", f"{history['p95_response_time']:.2f}s")
+                col4.metric("LLM Intent Calls Avoided", f"{history['llm_calls_avoided']:.0%}")
+                series = st.session_state.metrics_tracker.store.timeseries(hours=24)
+                if series:
+                    series_df = pd.DataFrame(series)
+                    series_df['timestamp'] = pd.to_datetime(series_df['timestamp'], unit='s')
+                    fig = px.bar(series_df, x='timestamp', y='conversations', title="Conversations per Hour",
+                                 color_discrete_sequence=['#FFCC00'])
+                    st.plotly_chart(fig, use_container_width=True)
         
         else:
             st.warning("No customer data available. Please upload data in the Admin Panel.")
@@ -512,6 +594,55 @@ elif page == "📊 Dashboard":
 elif page == "🔧 Admin Panel":
     st.markdown('<h1 class="main-header">Admin Panel</h1>', unsafe_allow_html=True)
     
+    with st.expander("🧠 Shared Resources"):
+        footprint = registry.footprint()
+        st.dataframe(pd.DataFrame([
+            {
+                'Resource': name,
+                'Generation': info['generation'],
+                'Sessions': info['refs'],
+                'Memory (MB)': round(info['bytes'] / 1e6, 2),
+                'Build Time (s)': round(info['build_seconds'], 2),
+                'Retired Generations': len(info['retired_generations'])
+            }
+            for name, info in footprint.items()
+        ]), use_container_width=True)
+    
+    with st.expander("🛡️ AI Provider Health"):
+        health = st.session_state.chat_engine.ai_service.health()
+        if health:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Provider': name,
+                    'Circuit': info['state'],
+                    'Trips': info['trips'],
+                    'Calls': info['calls'],
+                    'Error Rate': f"{info['error_rate']:.1%}",
+                    'Retries': info['retries'],
+                    'Failovers': info['failovers'],
+                    'p50 (s)': round(info['p50_latency'], 2),
+                    'p95 (s)': round(info['p95_latency'], 2),
+                    'p99 (s)': round(info['p99_latency'], 2)
+                }
+                for name, info in health.items()
+            ]), use_container_width=True)
+        else:
+            st.info("No AI provider configured.")
+
+    with st.expander("🎯 Churn Scoring Service"):
+        scoring = registry.get('churn_scoring').stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Requests", scoring['requests'])
+        col2.metric("Rejected", scoring['rejected'])
+        col3.metric("Queue Depth", f"{scoring['queue_depth']}/{scoring['max_queue']}")
+        col4.metric("Mean Batch Size", f"{scoring['mean_batch_size']:.1f}")
+        st.caption(f"Latency p50 {scoring['p50_latency'] * 1000:.1f} ms, p99 {scoring['p99_latency'] * 1000:.1f} ms")
+        if scoring['batch_sizes']:
+            fig = px.bar(x=list(scoring['batch_sizes'].keys()), y=list(scoring['batch_sizes'].values()),
+                         labels={'x': 'Batch size', 'y': 'Batches'}, title="Micro-batch Sizes",
+                         color_discrete_sequence=['#FFCC00'])
+            st.plotly_chart(fig, use_container_width=True)
+
     tab1, tab2, tab3 = st.tabs(["📚 FAQ Management", "🤖 Model Training", "📥 Data Upload"])
     
     with tab1:
@@ -523,7 +654,9 @@ elif page == "🔧 Admin Panel":
                 scraper = FAQScraper()
                 faqs = scraper.scrape_social_bundles_faq()
                 scraper.save_to_file(faqs)
-            st.success(f"Successfully scraped {len(faqs)} FAQs!")
+                changes = st.session_state.chat_engine.reload_faqs()
+            st.success(f"Successfully scraped {len(faqs)} FAQs! "
+                       f"({changes['added']} added, {changes['changed']} updated, {changes['removed']} removed)")
             st.rerun()
         
         # Display current FAQs
@@ -551,11 +684,19 @@ elif page == "🔧 Admin Panel":
         st.subheader("Churn Prediction Model Training")
         
         st.info("Train the churn prediction model using customer data")
-        
+
+        current = st.session_state.churn_predictor
+        if current.content_hash:
+            st.caption(f"Current model {current.content_hash[:12]}, trained "
+                       f"{current.metadata.get('trained_at', 'at an unknown time')} on "
+                       f"{current.metadata.get('training_rows', '?')} rows")
+
         if st.button("🎓 Train Model"):
             with st.spinner("Training churn prediction model..."):
                 try:
-                    metrics = st.session_state.churn_predictor.train()
+                    # Train a private copy; the shared predictor is swapped once the new files exist
+                    metrics = ChurnPredictor().train()
+                    registry.invalidate('churn_predictor')
                     
                     st.success("Model training completed!")
                     
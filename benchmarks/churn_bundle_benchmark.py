@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Cold-load time and memory of the churn model bundle vs the legacy pickle pair.
+
+Writes both formats for the same model into a temporary directory, then
+loads each one in a fresh Python process (sklearn already imported, so only
+the load is timed). It reports load time and the RSS growth during the load:
+- pickles: joblib.load of churn_model.pkl and scaler.pkl
+- bundle: load_bundle with memory mapping (this also brings the compiled
+  model's arrays, which the pickles don't have)
+- bundle (no mmap): the same file read into private memory
+- cached: a second ChurnPredictor.load_model in the same process, which is
+  served from the content-hash cache
+
+Use --trees/--depth to fit a larger synthetic model instead of the saved one.
+
+Examples:
+    python benchmarks/churn_bundle_benchmark.py
+    python benchmarks/churn_bundle_benchmark.py --trees 1000 --depth 6 --output bundle.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import joblib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.churn_model import ChurnPredictor, load_bundle
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def child(mode: str, directory: str) -> Dict:
+    """Load one format in this (fresh) process and report time and RSS growth"""
+    predictor = ChurnPredictor()
+    predictor.bundle_path = os.path.join(directory, 'churn_model.bundle')
+    predictor.model_path = os.path.join(directory, 'churn_model.pkl')
+    predictor.scaler_path = os.path.join(directory, 'scaler.pkl')
+    before = rss_bytes()
+    start = time.perf_counter()
+    if mode == 'pickles':
+        joblib.load(predictor.model_path)
+        joblib.load(predictor.scaler_path)
+    elif mode == 'bundle':
+        load_bundle(predictor.bundle_path)
+    elif mode == 'bundle-nommap':
+        load_bundle(predictor.bundle_path, mmap=False)
+    elif mode == 'cached':
+        predictor.load_model()
+        before = rss_bytes()
+        start = time.perf_counter()
+        again = ChurnPredictor()
+        again.bundle_path = predictor.bundle_path
+        again.load_model()
+    seconds = time.perf_counter() - start
+    return {'mode': mode, 'seconds': seconds, 'rss_bytes': rss_bytes() - before}
+
+
+def build_predictor(trees: int, depth: int) -> ChurnPredictor:
+    predictor = ChurnPredictor()
+    if not trees:
+        if not predictor.load_model():
+            print("No saved churn model; training one on data/customer_data.csv")
+            predictor.train()
+        return predictor
+    from sklearn.ensemble import GradientBoostingClassifier
+    from benchmarks.churn_scoring_benchmark import synthesize_customers
+    customers = synthesize_customers(20000, 0)
+    X = predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    churn = (customers['complaints'] * 3 - customers['tenure_months'] / 12
+             + np.random.default_rng(0).normal(0, 2, len(customers))) > 2
+    predictor.scaler.fit(X)
+    predictor.model = GradientBoostingClassifier(n_estimators=trees, max_depth=depth, random_state=42)
+    predictor.model.fit(predictor.scaler.transform(X), churn.to_numpy())
+    return predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold loads of the churn model bundle and the pickle pair")
+    parser.add_argument('--trees', type=int, default=0, help="fit a synthetic model with this many trees")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=5, help="fresh processes per format (best time is kept)")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    predictor = build_predictor(args.trees, args.depth)
+    with tempfile.TemporaryDirectory(prefix='churn-bundle-') as directory:
+        predictor.bundle_path = os.path.join(directory, 'churn_model.bundle')
+        predictor.save_model({'benchmark': True})
+        joblib.dump(predictor.model, os.path.join(directory, 'churn_model.pkl'))
+        joblib.dump(predictor.scaler, os.path.join(directory, 'scaler.pkl'))
+        sizes = {name: os.path.getsize(os.path.join(directory, name))
+                 for name in ('churn_model.bundle', 'churn_model.pkl', 'scaler.pkl')}
+        print(f"{predictor.model.n_estimators} trees of depth {predictor.model.max_depth}; bundle "
+              f"{sizes['churn_model.bundle'] / 1e3:.0f} KB, pickles "
+              f"{(sizes['churn_model.pkl'] + sizes['scaler.pkl']) / 1e3:.0f} KB")
+
+        results: List[Dict] = []
+        print(f"{'format':<16}{'load ms':>10}{'RSS MB':>9}")
+        for mode in ('pickles', 'bundle', 'bundle-nommap', 'cached'):
+            runs = []
+            for _ in range(args.repeats):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, directory],
+                                        capture_output=True, text=True, check=True, cwd=ROOT).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            result = {'mode': mode, 'seconds': min(run['seconds'] for run in runs),
+                      'rss_bytes': int(np.median([run['rss_bytes'] for run in runs]))}
+            results.append(result)
+            print(f"{mode:<16}{result['seconds'] * 1000:>10.2f}{result['rss_bytes'] / 1e6:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'config': {key: value for key, value in vars(args).items() if key != 'child'},
+                'file_bytes': sizes,
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Peak memory of churn feature preparation: pandas copies vs one preallocated matrix.
+
+The legacy path is the original pipeline: copy the DataFrame, add the four
+derived columns with pandas arithmetic, slice the model columns and run
+StandardScaler.transform. The new path is ChurnPredictor.prepare_features,
+which fills one matrix column by column. For each it measures the tracemalloc
+peak above the input DataFrame, once for feature preparation alone and once
+for scoring (features plus predict_proba). It also reports the best wall time
+and checks that the probabilities are identical.
+
+Examples:
+    python benchmarks/churn_feature_memory_benchmark.py
+    python benchmarks/churn_feature_memory_benchmark.py --rows 2000000 --dtype float64 --output features.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.churn_scoring_benchmark import synthesize_customers
+from models.churn_model import ChurnPredictor
+
+
+def legacy_features(predictor: ChurnPredictor, df: pd.DataFrame) -> np.ndarray:
+    """The pre-matrix pipeline (full copy, one derived column at a time, slice, transform)"""
+    df = df.copy()
+    df['spend_per_month'] = df['monthly_spend'] / (df['tenure_months'] + 1)
+    df['data_per_month'] = df['data_usage_gb'] / (df['tenure_months'] + 1)
+    df['complaint_rate'] = df['complaints'] / (df['tenure_months'] + 1)
+    df['recharge_frequency'] = df['tenure_months'] / (df['last_recharge_days'] + 1)
+    # to_numpy() is the conversion transform would make anyway, minus the feature-name check
+    return predictor.scaler.transform(df[predictor.all_features].to_numpy())
+
+
+def peak_bytes(fn) -> int:
+    """tracemalloc peak while fn runs, above what was allocated before it"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def best_seconds(fn, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of churn feature preparation")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float64'],
+                        help="matrix dtype for prepare_features")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    predictor = ChurnPredictor()
+    if not predictor.load_model():
+        print("No saved churn model; training one on data/customer_data.csv")
+        predictor.train()
+    customers = synthesize_customers(args.rows, args.seed)
+    dtype = np.dtype(args.dtype)
+
+    paths = {
+        'legacy': lambda: legacy_features(predictor, customers),
+        'matrix': lambda: predictor.prepare_features(customers, dtype=dtype)
+    }
+    identical = bool(np.array_equal(predictor.model.predict_proba(paths['legacy']()),
+                                    predictor.model.predict_proba(paths['matrix']())))
+
+    results: List[Dict] = []
+    print(f"{args.rows:,} customers, input DataFrame {customers.memory_usage(deep=True).sum() / 1e6:.0f} MB, "
+          f"matrix dtype {dtype}")
+    print(f"{'path':<8}{'features MB':>13}{'scoring MB':>12}{'features s':>12}")
+    for name, features in paths.items():
+        result = {
+            'path': name,
+            'features_peak_bytes': peak_bytes(features),
+            'scoring_peak_bytes': peak_bytes(lambda: predictor.model.predict_proba(features())),
+            'features_seconds': best_seconds(features, args.repeats)
+        }
+        results.append(result)
+        print(f"{name:<8}{result['features_peak_bytes'] / 1e6:>13.1f}{result['scoring_peak_bytes'] / 1e6:>12.1f}"
+              f"{result['features_seconds']:>12.3f}")
+    legacy, matrix = results
+    print(f"Peak memory: features {legacy['features_peak_bytes'] / matrix['features_peak_bytes']:.1f}x lower, "
+          f"scoring {legacy['scoring_peak_bytes'] / matrix['scoring_peak_bytes']:.1f}x lower"
+          f"{'' if identical else '  MISMATCH'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'config': vars(args),
+                'identical': identical,
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not identical:
+        print("\nMISMATCH: probabilities from the matrix differ from the legacy pipeline")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
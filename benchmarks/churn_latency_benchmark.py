@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Per-request churn scoring latency: sklearn vs the compiled NumPy evaluator.
+
+Scores batches of 1, 10, 100 and 1000 synthetic customers through the
+sklearn path (prepare_features, predict_proba) and
+through CompiledChurnModel (feature matrix, array walk). It reports p50/p99
+latency per call and per row, and fails if the probabilities are not
+bit-identical.
+
+Examples:
+    python benchmarks/churn_latency_benchmark.py
+    python benchmarks/churn_latency_benchmark.py --batches 1,8,64 --calls 2000 --output latency.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.churn_scoring_benchmark import synthesize_customers
+from models.churn_model import ChurnPredictor
+
+
+def latency(fn, calls: int) -> Dict:
+    fn()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    values = np.array(samples) * 1e6
+    return {'p50_us': float(np.percentile(values, 50)), 'p99_us': float(np.percentile(values, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request churn scoring latency, sklearn vs compiled")
+    parser.add_argument('--batches', default="1,10,100,1000", help="comma-separated rows per call")
+    parser.add_argument('--calls', type=int, default=1000, help="timed calls per batch size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    predictor = ChurnPredictor()
+    if not predictor.load_model():
+        print("No saved churn model; training one on data/customer_data.csv")
+        predictor.train()
+    compiled = predictor.export_compiled()
+
+    results: List[Dict] = []
+    print(f"{'rows':>6}{'sklearn p50 us':>16}{'compiled p50 us':>17}{'sklearn p99 us':>16}{'compiled p99 us':>17}"
+          f"{'speedup':>9}{'us/row':>9}")
+    for rows in (int(b) for b in args.batches.split(',')):
+        customers = synthesize_customers(rows, args.seed)
+
+        def sklearn_path():
+            return predictor.model.predict_proba(predictor.prepare_features(customers))
+
+        def compiled_path():
+            return compiled.predict_proba(compiled.feature_matrix(customers))
+
+        identical = bool(np.array_equal(sklearn_path(), compiled_path()))
+        baseline, fast = latency(sklearn_path, args.calls), latency(compiled_path, args.calls)
+        result = {'rows': rows, 'sklearn': baseline, 'compiled': fast, 'identical': identical,
+                  'speedup_p50': baseline['p50_us'] / fast['p50_us'],
+                  'compiled_us_per_row': fast['p50_us'] / rows}
+        results.append(result)
+        print(f"{rows:>6}{baseline['p50_us']:>16.1f}{fast['p50_us']:>17.1f}{baseline['p99_us']:>16.1f}"
+              f"{fast['p99_us']:>17.1f}{result['speedup_p50']:>9.1f}{result['compiled_us_per_row']:>9.2f}"
+              f"{'' if identical else '  MISMATCH'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'config': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not all(result['identical'] for result in results):
+        print("\nMISMATCH: compiled probabilities differ from sklearn")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Churn scoring throughput benchmark across worker processes.
+
+Synthesizes customers with the training schema and scores them with the
+saved churn model: first the old two-pass path (predict_proba then predict),
+then the single-pass scorer at 1, 2, 4, ... worker processes. It reports
+rows/s, speedup and parallel efficiency and checks that every configuration
+gives identical probabilities and labels. The process pool is warmed up
+before timing, so worker start-up and model loading are not counted.
+
+Examples:
+    python benchmarks/churn_scoring_benchmark.py
+    python benchmarks/churn_scoring_benchmark.py --rows 5000000 --jobs 1,2,4,8 --output scoring.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.churn_model import ChurnPredictor
+
+
+def synthesize_customers(n: int, seed: int = 0) -> pd.DataFrame:
+    """Customers with plausible ranges for every model input"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'customer_id': np.char.add('C', np.arange(n).astype(str)),
+        'tenure_months': rng.integers(1, 72, n, dtype=np.int32),
+        'monthly_spend': rng.integers(500, 12000, n).astype(np.float64),
+        'data_usage_gb': np.round(rng.gamma(2.0, 6.0, n), 1),
+        'call_minutes': rng.integers(0, 1200, n, dtype=np.int32),
+        'complaints': rng.poisson(1.5, n).astype(np.int32),
+        'last_recharge_days': rng.integers(0, 60, n, dtype=np.int32)
+    })
+
+
+def default_jobs() -> List[int]:
+    cores = os.cpu_count() or 1
+    jobs = [1]
+    while jobs[-1] * 2 <= cores:
+        jobs.append(jobs[-1] * 2)
+    if jobs[-1] != cores:
+        jobs.append(cores)
+    return jobs
+
+
+def time_best(fn, repeats: int):
+    """Best wall time over repeats, plus the last result"""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark churn scoring throughput across worker processes")
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--jobs', help="comma-separated worker counts (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+    jobs = [int(j) for j in args.jobs.split(',')] if args.jobs else default_jobs()
+
+    predictor = ChurnPredictor()
+    if not predictor.load_model():
+        print("No saved churn model; training one on data/customer_data.csv")
+        predictor.train()
+    customers = synthesize_customers(args.rows, args.seed)
+    X_scaled = predictor.prepare_features(customers)
+    print(f"{args.rows:,} customers, {os.cpu_count()} cores, "
+          f"{predictor.model.n_estimators} trees of depth {predictor.model.max_depth}")
+
+    two_pass_s, (reference_proba, reference_labels) = time_best(
+        lambda: (predictor.model.predict_proba(X_scaled)[:, 1], predictor.model.predict(X_scaled)), args.repeats)
+    results: List[Dict] = [{'config': 'two-pass', 'jobs': 1, 'seconds': two_pass_s,
+                            'rows_per_s': args.rows / two_pass_s, 'identical': True}]
+
+    print(f"{'config':<12}{'jobs':>5}{'seconds':>10}{'rows/s':>14}{'speedup':>9}{'efficiency':>12}")
+    baseline = None
+    for n_jobs in jobs:
+        if n_jobs > 1:
+            # Start the pool and memory-map the model in every worker before timing
+            joblib.Parallel(n_jobs=n_jobs)(joblib.delayed(os.getpid)() for _ in range(n_jobs))
+            predictor._score(X_scaled[:200000], n_jobs)
+        seconds, (proba, labels) = time_best(lambda: predictor._score(X_scaled, n_jobs), args.repeats)
+        baseline = baseline or seconds
+        results.append({
+            'config': 'single-pass', 'jobs': n_jobs, 'seconds': seconds, 'rows_per_s': args.rows / seconds,
+            'speedup': baseline / seconds, 'efficiency': baseline / seconds / n_jobs,
+            'identical': bool(np.array_equal(proba, reference_proba) and np.array_equal(labels, reference_labels))
+        })
+
+    for result in results:
+        speedup = f"{result['speedup']:>9.2f}" if 'speedup' in result else f"{'':>9}"
+        efficiency = f"{result['efficiency']:>12.0%}" if 'efficiency' in result else f"{'':>12}"
+        print(f"{result['config']:<12}{result['jobs']:>5}{result['seconds']:>10.2f}{result['rows_per_s']:>14,.0f}"
+              f"{speedup}{efficiency}{'' if result['identical'] else '  MISMATCH'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+                'config': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not all(result['identical'] for result in results):
+        print("\nMISMATCH: parallel scores differ from the single-process model")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""On-demand churn scoring under concurrent load, with and without micro-batching.
+
+Client threads each score synthetic customers one at a time through
+ChurnScoringService. The same load runs with max_batch=1 (every request
+scored on its own) and with micro-batching, and the benchmark reports
+throughput, p50/p99 request latency, mean batch size and rejections. Scores
+are checked against ChurnPredictor.predict on the same customers.
+
+Examples:
+    python benchmarks/churn_service_benchmark.py
+    python benchmarks/churn_service_benchmark.py --clients 64 --requests 20000 --max-batch 128 --output service.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.churn_scoring_benchmark import synthesize_customers
+from models.churn_model import ChurnPredictor
+from services.churn_scoring import ChurnScoringService, ScoringOverloaded
+
+
+def run_load(service: ChurnScoringService, records: List[Dict], clients: int) -> Dict:
+    """Score every record from `clients` threads; rejected requests are retried after a short pause"""
+    probabilities = [0.0] * len(records)
+
+    def client(offset: int):
+        for i in range(offset, len(records), clients):
+            while True:
+                try:
+                    probabilities[i] = service.score(records[i])['churn_probability']
+                    break
+                except ScoringOverloaded:
+                    time.sleep(0.001)
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    stats = service.stats()
+    return {
+        'seconds': seconds, 'requests_per_s': len(records) / seconds,
+        'p50_ms': stats['p50_latency'] * 1000, 'p99_ms': stats['p99_latency'] * 1000,
+        'mean_batch_size': stats['mean_batch_size'], 'rejected': stats['rejected'],
+        'probabilities': probabilities
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the micro-batching churn scoring service")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=32, help="concurrent client threads")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    predictor = ChurnPredictor()
+    if not predictor.load_model():
+        print("No saved churn model; training one on data/customer_data.csv")
+        predictor.train()
+    customers = synthesize_customers(args.requests, args.seed)
+    reference = predictor.predict(customers)['churn_probability'].to_numpy()
+    records = customers.to_dict('records')
+    predictor.compiled_model()
+
+    results: List[Dict] = []
+    print(f"{args.requests:,} requests from {args.clients} clients")
+    print(f"{'config':<14}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'batch':>8}{'rejected':>10}")
+    for config, max_batch in (('unbatched', 1), ('micro-batched', args.max_batch)):
+        service = ChurnScoringService(lambda: predictor, max_batch=max_batch, max_wait=args.max_wait_ms / 1000,
+                                      max_queue=args.max_queue)
+        result = run_load(service, records, args.clients)
+        service.close()
+        result['identical'] = bool(np.array_equal(result.pop('probabilities'), reference))
+        result.update(config=config, max_batch=max_batch)
+        results.append(result)
+        print(f"{config:<14}{result['requests_per_s']:>10,.0f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['mean_batch_size']:>8.1f}{result['rejected']:>10}{'' if result['identical'] else '  MISMATCH'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+                'config': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not all(result['identical'] for result in results):
+        print("\nMISMATCH: service scores differ from ChurnPredictor.predict")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""End-to-end load test for ChatEngine against the local stub provider.
+
+Replays customer messages through generate_response (threads) or
+agenerate_response (asyncio), either closed-loop at a fixed concurrency or
+open-loop at a target request rate, and reports throughput, latency
+percentiles per stage, cache hit rates and peak RSS.
+
+Examples:
+    python benchmarks/load_test.py --concurrency 16 --requests 500
+    python benchmarks/load_test.py --mode async --rate 50 --duration 30 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.intent_classifier import SEED_EXAMPLES
+from services.chat_engine import ChatEngine
+
+# Light rewording applied to corpus messages so near-duplicates show up as they do in real traffic
+VARIANTS = [
+    lambda m: m,
+    lambda m: m.lower(),
+    lambda m: m.rstrip('?') + " please",
+    lambda m: "hi, " + m,
+    lambda m: m.lower().rstrip('?') + " pls"
+]
+
+
+def build_corpus(faq_file: str, messages_file: Optional[str] = None) -> List[str]:
+    """Messages to replay: a text/JSON-lines file if given, else FAQ questions and seed phrases"""
+    if messages_file:
+        messages = []
+        with open(messages_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('{'):
+                    line = json.loads(line).get('message', '')
+                messages.append(line)
+        return [m for m in messages if m]
+
+    messages = []
+    try:
+        with open(faq_file, 'r', encoding='utf-8') as f:
+            messages.extend(faq['question'] for faq in json.load(f).get('faqs', []))
+    except (OSError, ValueError) as e:
+        print(f"Error reading {faq_file}: {e}")
+    for examples in SEED_EXAMPLES.values():
+        messages.extend(examples)
+    return messages
+
+
+def message_stream(corpus: List[str], seed: int, zipf: float = 1.1):
+    """Endless Zipf-distributed sample of reworded corpus messages (popular questions repeat)"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** zipf for rank in range(len(corpus))]
+    shuffled = corpus[:]
+    rng.shuffle(shuffled)
+    while True:
+        message = rng.choices(shuffled, weights)[0]
+        yield rng.choice(VARIANTS)(message)
+
+
+def percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {'count': 0}
+    values = np.array(samples) * 1000
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max())
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+class LoadTest:
+    """Drives one run and collects per-request results"""
+
+    def __init__(self, engine: ChatEngine, messages, requests: Optional[int], duration: Optional[float],
+                 concurrency: int, rate: Optional[float]):
+        self.engine = engine
+        self.messages = messages
+        self.requests = requests
+        self.duration = duration
+        self.concurrency = concurrency
+        self.rate = rate
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.intent_sources: Dict[str, int] = {}
+        self.stage_samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._deadline = None
+
+    def _next_message(self) -> Optional[str]:
+        """Next message to send, or None once the request/duration budget is spent"""
+        with self._lock:
+            if self.requests is not None and self._issued >= self.requests:
+                return None
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                return None
+            self._issued += 1
+            return next(self.messages)
+
+    def _record(self, latency: float, result: Optional[Dict]):
+        with self._lock:
+            self.latencies.append(latency)
+            # Per-stage timings come from the engine's request trace
+            for stage, ms in (result or {}).get('timings', {}).items():
+                if stage != 'total':
+                    self.stage_samples.setdefault(stage, []).append(ms / 1000)
+            if result is None or self.engine.ai_service.is_error_response(result.get('response')):
+                self.errors += 1
+            else:
+                source = result.get('intent_source') or 'unknown'
+                self.intent_sources[source] = self.intent_sources.get(source, 0) + 1
+
+    def _arrivals(self):
+        """Open-loop send times: Poisson arrivals at self.rate requests per second"""
+        rng = random.Random(0)
+        scheduled = time.perf_counter()
+        while True:
+            scheduled += rng.expovariate(self.rate)
+            yield scheduled
+
+    # Sync path: a thread pool around generate_response
+
+    def _sync_call(self, message: str, scheduled: float):
+        try:
+            result = self.engine.generate_response(message)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            result = None
+        # Latency from the intended send time, so queueing delay is not hidden
+        self._record(time.perf_counter() - scheduled, result)
+
+    def run_sync(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            if self.rate:
+                for scheduled in self._arrivals():
+                    message = self._next_message()
+                    if message is None:
+                        break
+                    time.sleep(max(0.0, scheduled - time.perf_counter()))
+                    pool.submit(self._sync_call, message, scheduled)
+            else:
+                def worker():
+                    while True:
+                        message = self._next_message()
+                        if message is None:
+                            return
+                        self._sync_call(message, time.perf_counter())
+                for _ in range(self.concurrency):
+                    pool.submit(worker)
+
+    # Async path: tasks around agenerate_response
+
+    async def _async_call(self, message: str, scheduled: float):
+        try:
+            result = await self.engine.agenerate_response(message)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            result = None
+        self._record(time.perf_counter() - scheduled, result)
+
+    async def run_async(self):
+        if self.rate:
+            tasks = []
+            for scheduled in self._arrivals():
+                message = self._next_message()
+                if message is None:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(self._async_call(message, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while True:
+                    message = self._next_message()
+                    if message is None:
+                        return
+                    await self._async_call(message, time.perf_counter())
+            await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+
+    def run(self, mode: str) -> float:
+        """Run to completion and return the elapsed wall time"""
+        start = time.perf_counter()
+        if self.duration is not None:
+            self._deadline = start + self.duration
+        if mode == 'async':
+            asyncio.run(self.run_async())
+        else:
+            self.run_sync()
+        return time.perf_counter() - start
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat pipeline against the stub LLM provider")
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--concurrency', type=int, default=8, help="workers (closed loop) or max in-flight")
+    parser.add_argument('--rate', type=float, help="target requests/second (open loop); default is closed loop")
+    parser.add_argument('--requests', type=int, help="total requests (default 200 unless --duration is set)")
+    parser.add_argument('--duration', type=float, help="seconds to run")
+    parser.add_argument('--messages', help="text or JSON-lines file of customer messages")
+    parser.add_argument('--faq-file', default='data/faqs.json')
+    parser.add_argument('--retrieval-mode', default='keyword')
+    parser.add_argument('--single-pass', action='store_true')
+    parser.add_argument('--no-cache', action='store_true', help="disable the exact and semantic reply caches")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=300, help="stub first-token latency (median)")
+    parser.add_argument('--tokens-per-second', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stub calls returning 429")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="fraction of stub calls that hang")
+    parser.add_argument('--timeout', type=float, default=30.0, help="per-call provider timeout")
+    parser.add_argument('--trace-log', help="append every request trace to this JSON-lines file")
+    parser.add_argument('--output', help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 200
+
+    os.environ.update({
+        'STUB_LATENCY_MS': str(args.latency_ms),
+        'STUB_TOKENS_PER_SECOND': str(args.tokens_per_second),
+        'STUB_ERROR_RATE': str(args.error_rate),
+        'STUB_TIMEOUT_RATE': str(args.timeout_rate),
+        'STUB_SEED': str(args.seed)
+    })
+    cache_size = 0 if args.no_cache else 1024
+    engine = ChatEngine(
+        faq_file=args.faq_file, retrieval_mode=args.retrieval_mode, single_pass=args.single_pass,
+        intent_log=None, cache_size=cache_size, semantic_cache_size=0 if args.no_cache else 512,
+        max_concurrency=args.concurrency, request_timeout=args.timeout, ai_provider='stub',
+        trace_log=args.trace_log
+    )
+    corpus = build_corpus(args.faq_file, args.messages)
+    test = LoadTest(engine, message_stream(corpus, args.seed), args.requests, args.duration,
+                    args.concurrency, args.rate)
+
+    print(f"Running {args.mode} load test: concurrency={args.concurrency} rate={args.rate or 'closed-loop'} "
+          f"requests={args.requests} duration={args.duration} corpus={len(corpus)} messages")
+    elapsed = test.run(args.mode)
+
+    completed = len(test.latencies)
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'elapsed_s': elapsed,
+        'completed': completed,
+        'errors': test.errors,
+        'error_rate': test.errors / completed if completed else 0,
+        'throughput_rps': completed / elapsed if elapsed else 0,
+        'latency': percentiles(test.latencies),
+        'stages': {stage: percentiles(samples) for stage, samples in sorted(test.stage_samples.items())},
+        'intent_sources': test.intent_sources,
+        'response_cache': engine.response_cache.stats() if engine.response_cache else None,
+        'semantic_cache': engine.semantic_cache.stats() if engine.semantic_cache else None,
+        'provider_health': engine.ai_service.health(),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+    print(f"\nCompleted {completed} requests in {elapsed:.1f}s "
+          f"({result['throughput_rps']:.1f} req/s, {result['error_rate']:.1%} errors)")
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in [('total', result['latency'])] + list(result['stages'].items()):
+        if stats['count']:
+            print(f"{stage:<16}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    for name in ('response_cache', 'semantic_cache'):
+        if result[name]:
+            print(f"{name.replace('_', ' ')} hit rate: {result[name]['hit_rate']:.1%}")
+    if result['peak_rss_mb'] is not None:
+        print(f"peak RSS: {result['peak_rss_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Result written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
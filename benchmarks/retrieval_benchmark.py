@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""FAQ retrieval scalability benchmark, from 10 to 1M synthetic FAQs.
+
+Synthesizes corpora with the FAQ schema (question/answer/keywords/category)
+and Zipf-distributed vocabulary, then measures index build time, memory and
+query latency for each retrieval mode. The run fails (exit code 1) when
+latency grows faster with corpus size than the allowed exponent, or the
+p95 latency budget at 100k FAQs (--budget-size) is exceeded.
+
+Examples:
+    python benchmarks/retrieval_benchmark.py
+    python benchmarks/retrieval_benchmark.py --sizes 10,1000,100000 --modes keyword --output retrieval.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.faq_corpus import FAQCorpus, RETRIEVAL_MODES
+from utils.text_processor import TextProcessor
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+# The vector matrix is dense (n x 4096 float32), so those modes stop earlier by default
+DEFAULT_VECTOR_LIMIT = 100000
+
+# Allowed log-log slope of p50 latency against corpus size (from 1k FAQs up) ...
+DEFAULT_MAX_EXPONENT = {'keyword': 0.8, 'vector': 1.2, 'hybrid': 1.2, 'build': 1.3}
+# ... and p95 latency budget in milliseconds at DEFAULT_BUDGET_SIZE FAQs (keyword: the ~1 ms
+# search target, with headroom for run-to-run noise)
+DEFAULT_P95_BUDGET_MS = {'keyword': 1.5, 'vector': 500.0, 'hybrid': 500.0}
+DEFAULT_BUDGET_SIZE = 100000
+
+# Common words shared by every category; topic words are drawn per category
+FUNCTION_WORDS = ["how", "do", "i", "my", "the", "to", "can", "what", "is", "a", "on", "for", "and", "of",
+                  "you", "your", "with", "in", "it", "me", "why", "when", "where", "get"]
+SYLLABLES = ["ba", "ko", "mi", "ta", "ne", "ru", "lo", "sa", "di", "fe", "gu", "ha", "ji", "ke", "mo", "ni",
+             "po", "ra", "si", "tu", "va", "we", "yo", "zu"]
+
+
+def load_base_faqs(paths: List[str]) -> List[Dict]:
+    faqs = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                faqs.extend(json.load(f).get('faqs', []))
+        except (OSError, ValueError):
+            continue
+    return faqs
+
+
+def synthetic_vocabulary(size: int, rng: np.random.Generator) -> List[str]:
+    """Pronounceable made-up words, used once the real vocabulary runs out"""
+    words = set()
+    while len(words) < size:
+        n = int(rng.integers(2, 5))
+        words.add("".join(SYLLABLES[i] for i in rng.integers(0, len(SYLLABLES), n)))
+    return sorted(words)
+
+
+def synthesize_faqs(n: int, base_faqs: List[Dict], seed: int = 0) -> List[Dict]:
+    """n FAQs shaped like the real ones, with a vocabulary that grows with the corpus (Heaps' law)"""
+    rng = np.random.default_rng(seed)
+    categories = sorted({faq.get('category', 'general') for faq in base_faqs}) or ['general']
+
+    real_words = sorted({
+        word for faq in base_faqs
+        for word in TextProcessor.tokenize(f"{faq.get('question', '')} {faq.get('answer', '')}")
+        if word.isalpha()
+    })
+    vocab_size = max(len(real_words), int(40 * (n * 30) ** 0.5))
+    vocabulary = np.array(real_words + synthetic_vocabulary(vocab_size - len(real_words), rng))
+    rng.shuffle(vocabulary)
+
+    # Each category ranks the vocabulary differently, so topics have their own frequent words
+    zipf = 1 / np.arange(1, len(vocabulary) + 1) ** 1.07
+    zipf /= zipf.sum()
+    orders = {category: rng.permutation(len(vocabulary)) for category in categories}
+
+    question_lengths = rng.integers(4, 9, n)
+    answer_lengths = rng.integers(15, 40, n)
+    topic_draws = rng.choice(len(vocabulary), int(question_lengths.sum() + answer_lengths.sum()), p=zipf)
+    function_draws = rng.integers(0, len(FUNCTION_WORDS), int(question_lengths.sum()))
+    category_draws = rng.integers(0, len(categories), n)
+
+    faqs = []
+    t = f = 0
+    for i in range(n):
+        category = categories[category_draws[i]]
+        order = orders[category]
+        q_len, a_len = int(question_lengths[i]), int(answer_lengths[i])
+        topic = vocabulary[order[topic_draws[t:t + q_len]]]
+        answer = vocabulary[order[topic_draws[t + q_len:t + q_len + a_len]]]
+        t += q_len + a_len
+        question = []
+        for j, word in enumerate(topic):
+            if j % 2 == 0:
+                question.append(FUNCTION_WORDS[function_draws[f + j]])
+            question.append(word)
+        f += q_len
+        faqs.append({
+            'id': i + 1,
+            'question': " ".join(question).capitalize() + "?",
+            'answer': " ".join(answer).capitalize() + ".",
+            'category': category,
+            'keywords': list(dict.fromkeys(topic[:4].tolist()))
+        })
+    return faqs
+
+
+def make_queries(faqs: List[Dict], count: int, seed: int = 0) -> List[str]:
+    """Customer-style queries: FAQ questions with words dropped and shuffled, plus some answer fragments"""
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for i in rng.integers(0, len(faqs), count):
+        faq = faqs[int(i)]
+        source = faq['question'] if rng.random() < 0.8 else faq['answer']
+        words = source.rstrip('?.').lower().split()
+        keep = max(2, int(len(words) * rng.uniform(0.5, 1.0)))
+        picked = rng.choice(len(words), min(keep, len(words)), replace=False)
+        queries.append(" ".join(words[j] for j in sorted(picked)))
+    return queries
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size (Linux only)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def latency_stats(samples: List[float]) -> Dict:
+    values = np.array(samples) * 1000
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'mean_ms': float(values.mean())
+    }
+
+
+def bench_size(n: int, modes: List[str], base_faqs: List[Dict], queries_per_size: int, top_k: int,
+               vector_limit: int, seed: int) -> Dict:
+    faqs = synthesize_faqs(n, base_faqs, seed)
+    queries = make_queries(faqs, queries_per_size, seed)
+    result = {'size': n, 'modes': {}}
+
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    corpus = FAQCorpus({'synthetic': faqs}, vector_cache_dir=None)
+    result['keyword_build_s'] = time.perf_counter() - start
+    after = rss_mb()
+    result['keyword_index_mb'] = after - before if before is not None else None
+
+    if any(mode != 'keyword' for mode in modes) and n <= vector_limit:
+        gc.collect()
+        before = rss_mb()
+        start = time.perf_counter()
+        corpus.get_vector_index()
+        result['vector_build_s'] = time.perf_counter() - start
+        after = rss_mb()
+        result['vector_index_mb'] = after - before if before is not None else None
+
+    for mode in modes:
+        if mode != 'keyword' and n > vector_limit:
+            continue
+        for query in queries[:5]:
+            corpus.search(query, top_k, mode)
+        timings = []
+        hits = 0
+        for query in queries:
+            start = time.perf_counter()
+            found = corpus.search(query, top_k, mode)
+            timings.append(time.perf_counter() - start)
+            hits += bool(found)
+        result['modes'][mode] = dict(latency_stats(timings), hit_rate=hits / len(queries))
+    return result
+
+
+def growth_exponent(sizes: List[int], values: List[float]) -> Optional[float]:
+    """Least-squares slope of log(value) against log(size)"""
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(np.maximum(values, 1e-9)), 1)[0])
+
+
+def check_regressions(results: List[Dict], max_exponent: Dict, p95_budget: Dict, min_fit_size: int,
+                      budget_size: int = DEFAULT_BUDGET_SIZE) -> List[str]:
+    failures = []
+    fitted = [r for r in results if r['size'] >= min_fit_size]
+    for mode in RETRIEVAL_MODES:
+        points = [(r['size'], r['modes'][mode]['p50_ms']) for r in fitted if mode in r['modes']]
+        exponent = growth_exponent([p[0] for p in points], [p[1] for p in points])
+        if exponent is not None and mode in max_exponent and exponent > max_exponent[mode]:
+            failures.append(f"{mode}: p50 latency grows as n^{exponent:.2f} (allowed n^{max_exponent[mode]})")
+        # Budgets hold at budget_size, or the largest size measured below it
+        measured = [r for r in results if mode in r['modes'] and r['size'] <= budget_size]
+        if measured and mode in p95_budget:
+            largest = measured[-1]
+            p95 = largest['modes'][mode]['p95_ms']
+            if p95 > p95_budget[mode]:
+                failures.append(f"{mode}: p95 {p95:.2f} ms at {largest['size']} FAQs exceeds {p95_budget[mode]} ms")
+    points = [(r['size'], r['keyword_build_s']) for r in fitted]
+    exponent = growth_exponent([p[0] for p in points], [p[1] for p in points])
+    if exponent is not None and exponent > max_exponent['build']:
+        failures.append(f"keyword index build grows as n^{exponent:.2f} (allowed n^{max_exponent['build']})")
+    return failures
+
+
+def parse_limits(values: List[str], defaults: Dict) -> Dict:
+    """Apply name=value overrides such as keyword=0.7"""
+    limits = dict(defaults)
+    for item in values or []:
+        name, _, value = item.partition('=')
+        limits[name] = float(value)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAQ retrieval from 10 to 1M FAQs")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--modes', default=",".join(RETRIEVAL_MODES))
+    parser.add_argument('--queries', type=int, default=200, help="queries per corpus size")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--vector-limit', type=int, default=DEFAULT_VECTOR_LIMIT,
+                        help="largest corpus to build the dense vector index for")
+    parser.add_argument('--max-exponent', action='append', metavar='MODE=EXP',
+                        help="allowed latency growth exponent, e.g. keyword=0.7 (also build=...)")
+    parser.add_argument('--p95-budget', action='append', metavar='MODE=MS',
+                        help="p95 latency budget at --budget-size, e.g. keyword=2")
+    parser.add_argument('--budget-size', type=int, default=DEFAULT_BUDGET_SIZE,
+                        help="corpus size the p95 budgets apply to (the largest measured size up to it)")
+    parser.add_argument('--min-fit-size', type=int, default=1000,
+                        help="smallest size used for growth fits (tiny corpora are all overhead)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--faq-files', default="data/faqs.json,data/scraped_faqs.json")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    modes = [m for m in args.modes.split(',') if m]
+    for mode in modes:
+        if mode not in RETRIEVAL_MODES:
+            parser.error(f"unknown mode {mode!r}; choose from {RETRIEVAL_MODES}")
+    base_faqs = load_base_faqs(args.faq_files.split(','))
+
+    results = []
+    print(f"{'size':>9} {'mode':<8}{'build s':>9}{'index MB':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'hit':>6}")
+    for n in sizes:
+        result = bench_size(n, modes, base_faqs, args.queries, args.top_k, args.vector_limit, args.seed)
+        results.append(result)
+        for mode, stats in result['modes'].items():
+            prefix = 'keyword' if mode == 'keyword' else 'vector'
+            build = result.get(f'{prefix}_build_s')
+            memory = result.get(f'{prefix}_index_mb')
+            print(f"{n:>9} {mode:<8}{build:>9.2f}{memory if memory is not None else float('nan'):>10.1f}"
+                  f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['hit_rate']:>6.0%}")
+
+    failures = check_regressions(results, parse_limits(args.max_exponent, DEFAULT_MAX_EXPONENT),
+                                 parse_limits(args.p95_budget, DEFAULT_P95_BUDGET_MS), args.min_fit_size,
+                                 args.budget_size)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'config': vars(args),
+                'results': results,
+                'failures': failures
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if failures:
+        print("\nREGRESSION:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll latency growth and budget checks passed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,172 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
+import sklearn
 import joblib
+import argparse
+import hashlib
+import io
+import itertools
 import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    from models.compiled_churn import DERIVED_FEATURES, MAX_COMPILED_ROWS, CompiledChurnModel, derive_feature
+except ImportError:
+    # Run as a script (python models/churn_model.py)
+    from compiled_churn import DERIVED_FEATURES, MAX_COMPILED_ROWS, CompiledChurnModel, derive_feature
+
+# Explicit dtypes for chunked CSV reads, so pandas neither infers per chunk nor widens to object.
+# Integer columns are nullable so an empty cell reads as missing instead of failing the whole file
+INPUT_DTYPES = {
+    'customer_id': str,
+    'tenure_months': 'Int32',
+    'monthly_spend': 'float64',
+    'data_usage_gb': 'float64',
+    'call_minutes': 'Int32',
+    'complaints': 'Int32',
+    'last_recharge_days': 'Int32',
+    'churn': 'Int8'
+}
+
+# Churn probability bands: (0, 0.3] Low, (0.3, 0.6] Medium, (0.6, 1] High
+RISK_BINS = [0, 0.3, 0.6, 1.0]
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+
+def risk_level(probability: float) -> str:
+    """Risk band of one churn probability (same bands as the pd.cut in predict)"""
+    for upper, level in zip(RISK_BINS[1:], RISK_LEVELS):
+        if probability <= upper:
+            return level
+    return RISK_LEVELS[-1]
+
+
+# Model bundle layout version; bump when the bundle dict changes shape
+# (2: model and scaler stored as the joblib bytes the content hash covers)
+BUNDLE_FORMAT = 2
+
+# Loaded bundles by content hash (newest last), and bundle files already seen -> their content hash
+_BUNDLES: Dict[str, Dict] = OrderedDict()
+_BUNDLE_FILES: Dict[tuple, str] = {}
+_BUNDLE_LOCK = threading.Lock()
+_BUNDLE_CACHE_SIZE = 4
+
+
+def _minor_version(version: str) -> tuple:
+    """(major, minor) of a version string such as '1.5.2'"""
+    return tuple(version.split('.')[:2])
+
+
+def save_bundle(path: str, model, scaler, features: list, compiled: CompiledChurnModel,
+                metadata: Optional[Dict] = None) -> Dict:
+    """Write model, scaler, feature schema, compiled arrays and metadata as one uncompressed joblib file.
+    
+    Model and scaler are stored as their joblib bytes, and the SHA-256 of
+    those bytes is the content hash, the identity of a trained model (pickling
+    the loaded objects again doesn't reproduce the bytes, so the hash has to
+    cover what is stored). The file is written next to path and renamed over
+    it, so readers (and processes that still map the old file) never see a
+    partial bundle.
+    """
+    buffer = io.BytesIO()
+    joblib.dump((model, scaler), buffer)
+    payload = buffer.getvalue()
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'content_hash': hashlib.sha256(payload).hexdigest(),
+        'sklearn_version': sklearn.__version__,
+        'features': list(features),
+        'metadata': dict(metadata or {}),
+        'payload': payload,
+        'compiled': compiled.arrays()
+    }
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(bundle, temp_path)
+    os.replace(temp_path, path)
+    del bundle['payload']
+    bundle.update(model=model, scaler=scaler)
+    return bundle
+
+
+def load_bundle(path: str, mmap: bool = True) -> Dict:
+    """Load a model bundle, sharing one copy per content hash across the process.
+    
+    An unchanged file (same path, mtime and size) is served from the cache
+    without reading it. Otherwise the compiled node arrays are memory-mapped,
+    the model and scaler bytes are checked against the content hash and
+    unpickled, and a bundle whose content hash is already cached is replaced
+    by the cached copy. A bundle saved with another scikit-learn major.minor
+    version, or whose bytes don't match the hash, raises ValueError.
+    
+    A cold load is not faster than the legacy pickle pair: the model and
+    scaler are still unpickled from bytes. Memory-mapping them would not
+    help, since sklearn trees copy their node arrays when unpickled; the
+    gain is the cache, which makes every later load nearly free.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _BUNDLE_LOCK:
+        cached = _BUNDLES.get(_BUNDLE_FILES.get(key))
+        if cached is not None:
+            return cached
+    bundle = joblib.load(path, mmap_mode='r' if mmap else None)
+    if not isinstance(bundle, dict) or 'format' not in bundle:
+        raise ValueError(f"{path} is not a churn model bundle")
+    if bundle['format'] != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is bundle format {bundle['format']}, expected {BUNDLE_FORMAT}; retrain the model")
+    if _minor_version(bundle['sklearn_version']) != _minor_version(sklearn.__version__):
+        raise ValueError(f"{path} was saved with scikit-learn {bundle['sklearn_version']}, "
+                         f"running {sklearn.__version__}; retrain the model")
+    payload = bundle.pop('payload')
+    if hashlib.sha256(payload).hexdigest() != bundle['content_hash']:
+        raise ValueError(f"{path} does not match its content hash; the bundle is corrupt")
+    bundle['model'], bundle['scaler'] = joblib.load(io.BytesIO(payload))
+    with _BUNDLE_LOCK:
+        # One entry per path: an earlier version of this file can no longer be served
+        for stale in [seen for seen in _BUNDLE_FILES if seen[0] == key[0]]:
+            del _BUNDLE_FILES[stale]
+        _BUNDLE_FILES[key] = bundle['content_hash']
+        bundle = _BUNDLES.setdefault(bundle['content_hash'], bundle)
+        _BUNDLES.move_to_end(bundle['content_hash'])
+        while len(_BUNDLES) > _BUNDLE_CACHE_SIZE:
+            evicted, _ = _BUNDLES.popitem(last=False)
+            for seen in [seen for seen, content_hash in _BUNDLE_FILES.items() if content_hash == evicted]:
+                del _BUNDLE_FILES[seen]
+    return bundle
+
+
+# Worker-process cache of memory-mapped models, keyed by artifact path. Every
+# artifact gets a fresh number, so a path never names two different models.
+_WORKER_MODELS = {}
+_ARTIFACT_NUMBERS = itertools.count()
+
+
+def _score_partition(model_path: str, features_path: str, proba_path: str, labels_path: str,
+                     start: int, stop: int):
+    """Score rows [start, stop) of the shared feature matrix, writing into the shared outputs"""
+    model = _WORKER_MODELS.get(model_path)
+    if model is None:
+        # Only the newest artifact is ever scored again
+        _WORKER_MODELS.clear()
+        model = _WORKER_MODELS[model_path] = joblib.load(model_path, mmap_mode='r')
+    X = np.load(features_path, mmap_mode='r')
+    proba = model.predict_proba(X[start:stop])
+    churn_proba = np.load(proba_path, mmap_mode='r+')
+    labels = np.load(labels_path, mmap_mode='r+')
+    churn_proba[start:stop] = proba[:, 1]
+    labels[start:stop] = np.argmax(proba, axis=1)
+    churn_proba.flush()
+    labels.flush()
+
 
 class ChurnPredictor:
     """Churn prediction model using Gradient Boosting"""
@@ -17,43 +181,67 @@ class ChurnPredictor:
             'tenure_months', 'monthly_spend', 'data_usage_gb',
             'call_minutes', 'complaints', 'last_recharge_days'
         ]
+        self.all_features = self.feature_columns + DERIVED_FEATURES
+        # Scaled features go to the trees as float32 anyway, so float32 loses nothing
+        self.feature_dtype = np.float32
+        self.bundle_path = 'models/churn_model.bundle'
+        # Pre-bundle artifacts, still loaded when no bundle exists
         self.model_path = 'models/churn_model.pkl'
         self.scaler_path = 'models/scaler.pkl'
+        self.compiled_path = 'models/churn_model_compiled.npz'
+        self.content_hash = None
+        self.metadata = {}
+        self._compiled = None
+        # Scoring counters for the metrics endpoint
+        self.scoring_stats = {'calls': 0, 'rows': 0, 'seconds': 0.0}
+        self._stats_lock = threading.Lock()
+        self._artifact_dir = None
+        self._artifact_model = None
+        self._artifact_path = None
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Prepare features for modeling"""
-        # Create derived features
-        df = df.copy()
-        df['spend_per_month'] = df['monthly_spend'] / (df['tenure_months'] + 1)
-        df['data_per_month'] = df['data_usage_gb'] / (df['tenure_months'] + 1)
-        df['complaint_rate'] = df['complaints'] / (df['tenure_months'] + 1)
-        df['recharge_frequency'] = df['tenure_months'] / (df['last_recharge_days'] + 1)
+    def prepare_features(self, df: pd.DataFrame, scaled: bool = True, dtype=None) -> np.ndarray:
+        """Model inputs (raw plus derived, in all_features order) as one preallocated C-contiguous matrix.
         
-        return df
+        Each column is computed in float64, standardized in place with the
+        fitted scaler (same operations as StandardScaler.transform) and cast
+        into its slot, so only one column-sized temporary is live at a time
+        and the DataFrame is never copied. dtype defaults to feature_dtype;
+        with float32 the trees score the matrix without converting it, and
+        results are identical to the float64 path.
+        """
+        X = np.empty((len(df), len(self.all_features)), dtype=dtype or self.feature_dtype)
+        # Nullable columns (INPUT_DTYPES) become float64 with NaN for missing values
+        raw = {column: (df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                        if isinstance(df[column].dtype, pd.api.extensions.ExtensionDtype) else df[column].to_numpy())
+               for column in self.feature_columns}
+        mean = self.scaler.mean_ if scaled and self.scaler.with_mean else None
+        scale = self.scaler.scale_ if scaled and self.scaler.with_std else None
+        column = np.empty(len(df))
+        for j, name in enumerate(self.all_features):
+            column[:] = raw[name] if name in raw else derive_feature(name, raw)
+            if mean is not None:
+                column -= mean[j]
+            if scale is not None:
+                column /= scale[j]
+            X[:, j] = column
+        return X
     
     def train(self, data_file: str = 'data/customer_data.csv'):
         """Train the churn prediction model"""
         # Load data
         df = pd.read_csv(data_file)
         
-        # Prepare features
-        df = self.prepare_features(df)
-        
-        # Define feature columns including derived features
-        all_features = self.feature_columns + [
-            'spend_per_month', 'data_per_month', 
-            'complaint_rate', 'recharge_frequency'
-        ]
-        
-        X = df[all_features]
-        y = df['churn']
+        # Prepare features (unscaled float64, so the scaler is fitted on exact values)
+        X = self.prepare_features(df, scaled=False, dtype=np.float64)
+        y = df['churn'].to_numpy()
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=y
         )
         
-        # Scale features
+        # Scale features (a fresh scaler: a loaded one may be shared through the bundle cache)
+        self.scaler = StandardScaler()
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
@@ -77,34 +265,30 @@ class ChurnPredictor:
             'auc': auc_score,
             'classification_report': classification_report(y_test, y_pred),
             'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
-            'feature_importance': dict(zip(all_features, self.model.feature_importances_))
+            'feature_importance': dict(zip(self.all_features, self.model.feature_importances_))
         }
         
         # Save model
-        self.save_model()
+        self.save_model({
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'data_file': data_file,
+            'training_rows': len(X_train),
+            'auc': float(auc_score)
+        })
         
         return metrics
     
-    def predict(self, customer_data: pd.DataFrame) -> pd.DataFrame:
-        """Predict churn probability for customers"""
+    def predict(self, customer_data: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+        """Predict churn probability for customers (n_jobs > 1 or -1 scores in worker processes)"""
         if self.model is None:
             self.load_model()
+        start = time.perf_counter()
         
-        # Prepare features
-        df = self.prepare_features(customer_data)
-        
-        # Get all features
-        all_features = self.feature_columns + [
-            'spend_per_month', 'data_per_month',
-            'complaint_rate', 'recharge_frequency'
-        ]
-        
-        X = df[all_features]
-        X_scaled = self.scaler.transform(X)
+        # Scaled model inputs straight into one float32 matrix
+        X_scaled = self.prepare_features(customer_data)
         
         # Predict
-        churn_proba = self.model.predict_proba(X_scaled)[:, 1]
-        churn_pred = self.model.predict(X_scaled)
+        churn_proba, churn_pred = self._score_complete(X_scaled, n_jobs)
         
         # Add predictions to dataframe
         result = customer_data.copy()
@@ -112,23 +296,207 @@ class ChurnPredictor:
         result['churn_prediction'] = churn_pred
         result['risk_level'] = pd.cut(
             churn_proba,
-            bins=[0, 0.3, 0.6, 1.0],
-            labels=['Low', 'Medium', 'High']
+            bins=RISK_BINS,
+            labels=RISK_LEVELS
         )
         
+        with self._stats_lock:
+            self.scoring_stats['calls'] += 1
+            self.scoring_stats['rows'] += len(result)
+            self.scoring_stats['seconds'] += time.perf_counter() - start
         return result
     
-    def save_model(self):
-        """Save trained model and scaler"""
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
+    def _score_complete(self, X_scaled: np.ndarray, n_jobs: int = 1):
+        """_score over the rows with every input present.
+        
+        Rows with a missing input are not scored (the model has no missing
+        value handling and imputing would invent a risk): they get a NaN
+        probability and a missing prediction, and fall in no risk level.
+        """
+        complete = ~np.isnan(X_scaled).any(axis=1)
+        # No rows (a header-only CSV yields one empty chunk) falls through: sklearn refuses empty input
+        if len(X_scaled) and complete.all():
+            return self._score(X_scaled, n_jobs)
+        churn_proba = np.full(len(X_scaled), np.nan)
+        churn_pred = pd.array(np.zeros(len(X_scaled), dtype=np.int64), dtype='Int64')
+        churn_pred[~complete] = pd.NA
+        if complete.any():
+            churn_proba[complete], churn_pred[complete] = self._score(X_scaled[complete], n_jobs)
+        return churn_proba, churn_pred
+    
+    def _score(self, X_scaled: np.ndarray, n_jobs: int = 1, min_partition_rows: int = 50000):
+        """(churn probability, predicted label) per row, walking the ensemble once per row.
+        
+        The label is the class with the higher probability, which is exactly
+        what model.predict would return. With several jobs the rows are split
+        into partitions scored by a joblib process pool; the model and the
+        feature matrix are shared as memory-mapped files instead of being
+        pickled into every task. Inputs under two partitions stay in process,
+        since dumping the features and dispatching costs more than it saves
+        there. Speedup from the pool depends on the machine and is not
+        guaranteed; measure with benchmarks/churn_scoring_benchmark.py.
+        """
+        workers = joblib.effective_n_jobs(n_jobs)
+        if workers == 1 or len(X_scaled) < 2 * min_partition_rows:
+            proba = self.model.predict_proba(X_scaled)
+            return proba[:, 1], self.model.classes_[np.argmax(proba, axis=1)]
+        # Two partitions per worker evens out stragglers
+        partition_rows = max(min_partition_rows, -(-len(X_scaled) // (2 * workers)))
+        
+        model_path = self._model_artifact()
+        run = os.path.join(self._artifact_dir, uuid.uuid4().hex)
+        features_path, proba_path, labels_path = (f"{run}.{name}.npy" for name in ('features', 'proba', 'labels'))
+        try:
+            # Same float32 cast the trees apply internally, so results match the in-process path
+            features = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float32, shape=X_scaled.shape)
+            features[:] = X_scaled
+            features.flush()
+            del features
+            np.lib.format.open_memmap(proba_path, mode='w+', dtype=np.float64, shape=(len(X_scaled),)).flush()
+            np.lib.format.open_memmap(labels_path, mode='w+', dtype=np.int8, shape=(len(X_scaled),)).flush()
+            joblib.Parallel(n_jobs=n_jobs)(
+                joblib.delayed(_score_partition)(model_path, features_path, proba_path, labels_path,
+                                                 start, min(start + partition_rows, len(X_scaled)))
+                for start in range(0, len(X_scaled), partition_rows)
+            )
+            churn_proba = np.array(np.load(proba_path, mmap_mode='r'))
+            labels = self.model.classes_[np.load(labels_path, mmap_mode='r')]
+        finally:
+            for path in (features_path, proba_path, labels_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        return churn_proba, labels
+    
+    def _model_artifact(self) -> str:
+        """Uncompressed joblib dump of the current model that workers memory-map, written once per model"""
+        if self._artifact_dir is None:
+            self._artifact_dir = tempfile.mkdtemp(prefix='churn-scoring-')
+            weakref.finalize(self, shutil.rmtree, self._artifact_dir, True)
+        if self._artifact_model is not self.model:
+            # A new name per model: workers cache by path, and id() of a replaced model can be reused
+            model_path = os.path.join(self._artifact_dir, f"model-{next(_ARTIFACT_NUMBERS)}.joblib")
+            joblib.dump(self.model, model_path)
+            if self._artifact_path is not None and os.path.exists(self._artifact_path):
+                os.remove(self._artifact_path)
+            self._artifact_model, self._artifact_path = self.model, model_path
+        return self._artifact_path
+    
+    def score_chunk(self, chunk: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+        """Add churn_probability, churn_prediction and risk_level to chunk in place"""
+        X_scaled = self.prepare_features(chunk)
+        churn_proba, churn_pred = self._score_complete(X_scaled, n_jobs)
+        chunk['churn_probability'] = churn_proba
+        chunk['churn_prediction'] = churn_pred
+        chunk['risk_level'] = pd.cut(
+            churn_proba,
+            bins=RISK_BINS,
+            labels=RISK_LEVELS
+        )
+        return chunk
+    
+    def predict_file(self, input_path: str, output_path: str, chunksize: int = 100000, n_jobs: int = 1) -> dict:
+        """Score a CSV chunk by chunk, appending scored rows to output_path.
+        
+        Peak memory depends on chunksize, not on the file size. The output is
+        written to a temporary file and renamed at the end, so a failed run
+        never leaves a half-written result behind. Rows with a missing input
+        are written unscored and counted in summary['incomplete_rows'].
+        """
+        if self.model is None and not self.load_model():
+            raise RuntimeError("No trained churn model found; run `python models/churn_model.py` first")
+        start = time.perf_counter()
+        summary = {'rows': 0, 'chunks': 0, 'incomplete_rows': 0, 'risk_levels': {'Low': 0, 'Medium': 0, 'High': 0}}
+        temp_path = output_path + '.tmp'
+        try:
+            reader = pd.read_csv(input_path, dtype=INPUT_DTYPES, chunksize=chunksize)
+            for i, chunk in enumerate(reader):
+                chunk_start = time.perf_counter()
+                scored = self.score_chunk(chunk, n_jobs)
+                scored.to_csv(temp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+                for level, count in scored['risk_level'].value_counts().items():
+                    summary['risk_levels'][level] += int(count)
+                summary['rows'] += len(scored)
+                summary['incomplete_rows'] += int(scored['churn_probability'].isna().sum())
+                summary['chunks'] += 1
+                with self._stats_lock:
+                    self.scoring_stats['calls'] += 1
+                    self.scoring_stats['rows'] += len(scored)
+                    self.scoring_stats['seconds'] += time.perf_counter() - chunk_start
+            if summary['chunks'] == 0:
+                # Header-only input still gets a header-only output
+                pd.read_csv(input_path, nrows=0).to_csv(temp_path, index=False)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+    
+    def save_model(self, metadata: Optional[Dict] = None):
+        """Save model, scaler, feature schema and compiled model as one versioned bundle"""
+        os.makedirs(os.path.dirname(self.bundle_path) or '.', exist_ok=True)
+        self._compiled = CompiledChurnModel.from_sklearn(self.model, self.scaler, self.all_features)
+        bundle = save_bundle(self.bundle_path, self.model, self.scaler, self.all_features, self._compiled,
+                             metadata)
+        self.content_hash = bundle['content_hash']
+        self.metadata = bundle['metadata']
+    
+    def export_compiled(self, path: str = None) -> CompiledChurnModel:
+        """Flatten model and scaler into a CompiledChurnModel (saved as .npz) for sklearn-free scoring"""
+        if self.model is None and not self.load_model():
+            raise RuntimeError("No trained churn model to export")
+        compiled = CompiledChurnModel.from_sklearn(self.model, self.scaler, self.all_features)
+        compiled.save(path or self.compiled_path)
+        self._compiled = compiled
+        return compiled
+    
+    def compiled_model(self) -> CompiledChurnModel:
+        """Compiled copy of the loaded model (from the bundle, or built from the legacy pickles)"""
+        if self._compiled is None:
+            if self.model is None and not self.load_model():
+                raise RuntimeError("No trained churn model to compile")
+            if self._compiled is None:
+                self._compiled = CompiledChurnModel.from_sklearn(self.model, self.scaler, self.all_features)
+        return self._compiled
+    
+    def score_rows(self, columns: Dict[str, np.ndarray]):
+        """(churn probability, predicted label) per customer, from raw input columns of equal length.
+        
+        Up to MAX_COMPILED_ROWS rows are scored by the compiled model, which
+        is faster for small batches; larger ones go through sklearn. Both
+        give the same probabilities bit for bit.
+        """
+        compiled = self.compiled_model()
+        rows = len(next(iter(columns.values())))
+        if rows <= MAX_COMPILED_ROWS:
+            proba = compiled.predict_proba(compiled.feature_matrix(columns))
+            return proba[:, 1], compiled.classes[np.argmax(proba, axis=1)]
+        return self._score(self.prepare_features(pd.DataFrame(columns)))
     
     def load_model(self):
-        """Load trained model and scaler"""
+        """Load the model bundle (or the legacy model and scaler pickles)"""
+        if os.path.exists(self.bundle_path):
+            try:
+                bundle = load_bundle(self.bundle_path)
+            except Exception as e:
+                print(f"Error loading churn model bundle {self.bundle_path}: {e}")
+                return False
+            if bundle['features'] != self.all_features:
+                print(f"Error: {self.bundle_path} was trained on features {bundle['features']}, "
+                      f"expected {self.all_features}")
+                return False
+            self.model = bundle['model']
+            self.scaler = bundle['scaler']
+            self.content_hash = bundle['content_hash']
+            self.metadata = bundle['metadata']
+            self._compiled = CompiledChurnModel.from_arrays(bundle['compiled'])
+            return True
         if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
             self.model = joblib.load(self.model_path)
             self.scaler = joblib.load(self.scaler_path)
+            self.content_hash = None
+            self.metadata = {}
+            self._compiled = None
             return True
         return False
     
@@ -137,15 +505,10 @@ class ChurnPredictor:
         if self.model is None:
             return {}
         
-        all_features = self.feature_columns + [
-            'spend_per_month', 'data_per_month',
-            'complaint_rate', 'recharge_frequency'
-        ]
-        
-        importance = dict(zip(all_features, self.model.feature_importances_))
+        importance = dict(zip(self.all_features, self.model.feature_importances_))
         return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
 
-if __name__ == "__main__":
+def _train_cli():
     predictor = ChurnPredictor()
     print("Training churn prediction model...")
     metrics = predictor.train()
@@ -155,3 +518,31 @@ if __name__ == "__main__":
     print(f"\nFeature Importance:")
     for feature, importance in sorted(metrics['feature_importance'].items(), key=lambda x: x[1], reverse=True):
         print(f"  {feature}: {importance:.4f}")
+
+
+def _score_cli(args):
+    predictor = ChurnPredictor()
+    summary = predictor.predict_file(args.input, args.output, chunksize=args.chunksize, n_jobs=args.jobs)
+    rate = summary['rows'] / summary['seconds'] if summary['seconds'] else 0
+    print(f"Scored {summary['rows']:,} customers in {summary['chunks']} chunks "
+          f"({summary['seconds']:.1f}s, {rate:,.0f} rows/s) -> {args.output}")
+    for level, count in summary['risk_levels'].items():
+        print(f"  {level}: {count:,}")
+    if summary['incomplete_rows']:
+        print(f"  Not scored (missing inputs): {summary['incomplete_rows']:,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the churn model (default) or score a customer CSV")
+    subcommands = parser.add_subparsers(dest='command')
+    subcommands.add_parser('train', help="train on data/customer_data.csv and save the model")
+    score = subcommands.add_parser('score', help="score a CSV in chunks, writing rows as they are scored")
+    score.add_argument('input', help="customer CSV with the training feature columns")
+    score.add_argument('output', help="CSV to write with churn_probability, churn_prediction and risk_level")
+    score.add_argument('--chunksize', type=int, default=100000, help="rows per chunk (bounds peak memory)")
+    score.add_argument('--jobs', type=int, default=1, help="worker processes per chunk (-1 = all cores)")
+    args = parser.parse_args()
+    if args.command == 'score':
+        _score_cli(args)
+    else:
+        _train_cli()
@@ -0,0 +1,206 @@
+import numpy as np
+from scipy.special import expit, logit
+from typing import Dict, List, Mapping
+
+DERIVED_FEATURES = ['spend_per_month', 'data_per_month', 'complaint_rate', 'recharge_frequency']
+
+# Rows scored per pass; bounds the (rows x trees) index arrays
+BATCH_ROWS = 65536
+
+# Largest batch worth scoring compiled. The walk costs ~6 us per row against
+# sklearn's ~1.5, so its lower fixed overhead only wins for small batches:
+# benchmarks/churn_latency_benchmark.py measured it ~2-3x faster at 1-64
+# rows, about even between 100 and 200 and ~4x slower at 1000 rows
+MAX_COMPILED_ROWS = 128
+
+
+# Derived feature -> (numerator column, denominator column); each is numerator / (denominator + 1)
+_DERIVATIONS = {
+    'spend_per_month': ('monthly_spend', 'tenure_months'),
+    'data_per_month': ('data_usage_gb', 'tenure_months'),
+    'complaint_rate': ('complaints', 'tenure_months'),
+    'recharge_frequency': ('tenure_months', 'last_recharge_days')
+}
+
+
+def derive_feature(name: str, columns: Mapping):
+    """One derived model input from the raw customer columns (arrays or pandas Series)"""
+    numerator, denominator = _DERIVATIONS[name]
+    return columns[numerator] / (columns[denominator] + 1)
+
+
+def derive_features(columns: Mapping) -> Dict:
+    """All derived model inputs from the raw customer columns"""
+    return {name: derive_feature(name, columns) for name in DERIVED_FEATURES}
+
+
+def _ordered(x: float) -> int:
+    """Map a float64 to an int64 with the same ordering (so bisection can walk adjacent doubles)"""
+    bits = int(np.float64(x).view(np.int64))
+    return bits if bits >= 0 else -(bits & 0x7FFFFFFFFFFFFFFF)
+
+
+def _from_ordered(i: int) -> float:
+    bits = i if i >= 0 else (-i) | -0x8000000000000000
+    return float(np.int64(bits).view(np.float64))
+
+
+def fold_threshold(threshold: float, mean: float, scale: float) -> float:
+    """Largest raw float64 x that sklearn sends left at this split.
+
+    sklearn standardizes in float64, casts to float32, then tests
+    x32 <= threshold. Every step is monotone in x, so the test on raw inputs
+    is exactly `x <= folded` for the folded value found by bisection over
+    adjacent doubles (-inf/+inf when no or every finite x goes left).
+    """
+    mean, scale, threshold = np.float64(mean), np.float64(scale), np.float64(threshold)
+
+    def goes_left(x: float) -> bool:
+        with np.errstate(over='ignore', invalid='ignore'):
+            return bool(np.float32((np.float64(x) - mean) / scale) <= threshold)
+
+    lo, hi = _ordered(-np.finfo(np.float64).max), _ordered(np.finfo(np.float64).max)
+    if not goes_left(_from_ordered(lo)):
+        return -np.inf
+    if goes_left(_from_ordered(hi)):
+        return np.inf
+    # Invariant: goes_left(lo) and not goes_left(hi)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if goes_left(_from_ordered(mid)):
+            lo = mid
+        else:
+            hi = mid
+    return _from_ordered(lo)
+
+
+class CompiledChurnModel:
+    """A fitted binary GradientBoostingClassifier plus StandardScaler as flat NumPy arrays.
+
+    All trees share one node table (feature, threshold, left, right, value).
+    The scaler is folded into the thresholds, and leaves point to themselves,
+    so scoring walks every tree at once for max_depth steps over raw
+    features. Leaf values are pre-multiplied by the learning rate and summed
+    in tree order from the init score, as sklearn does, and expit gives the
+    probability. Results match sklearn bit for bit.
+    """
+
+    def __init__(self, feature_names: List[str], feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray, init_score: float, depth: int,
+                 classes: np.ndarray):
+        self.feature_names = list(feature_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.init_score = float(init_score)
+        self.depth = int(depth)
+        self.classes = classes
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, feature_names: List[str]) -> 'CompiledChurnModel':
+        """Flatten a fitted binary GradientBoostingClassifier and the StandardScaler in front of it"""
+        if model.n_trees_per_iteration_ != 1 or model.loss != 'log_loss':
+            raise ValueError("Only binary log-loss GradientBoostingClassifier models can be compiled")
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(feature_names))
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(feature_names))
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            count = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + count)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.array([
+                np.inf if leaf else fold_threshold(t, mean[f], scale[f])
+                for leaf, t, f in zip(is_leaf, tree.threshold, tree.feature)
+            ]))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+            # Same double product sklearn adds per tree: learning_rate * leaf value
+            values.append(model.learning_rate * tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += count
+            depth = max(depth, tree.max_depth)
+        # Every row shares the init estimator's constant score: the log-odds of its
+        # positive-class probability, clipped as sklearn does ('zero' starts from 0)
+        if isinstance(model.init_, str):
+            init_score = 0.0
+        else:
+            prior = model.init_.predict_proba(np.zeros((1, len(feature_names))))[0, 1]
+            eps = np.finfo(np.float64).eps
+            init_score = logit(np.clip(prior, eps, 1 - eps))
+        return cls(
+            feature_names,
+            np.concatenate(features).astype(np.intp),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(lefts).astype(np.intp),
+            np.concatenate(rights).astype(np.intp),
+            np.concatenate(values).astype(np.float64),
+            np.array(roots, dtype=np.intp),
+            init_score,
+            depth,
+            np.asarray(model.classes_)
+        )
+
+    def feature_matrix(self, columns: Mapping) -> np.ndarray:
+        """Raw float64 model inputs from customer columns (dict of arrays or a DataFrame)"""
+        # Plain arrays first: pandas Series arithmetic costs more than the whole tree walk for a few rows
+        features = {name: np.asarray(columns[name]) for name in self.feature_names if name not in DERIVED_FEATURES}
+        features.update(derive_features(features))
+        return np.column_stack([np.asarray(features[name], dtype=np.float64) for name in self.feature_names])
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Raw log-odds for a (rows x features) float64 matrix of unscaled inputs"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        raw = np.empty(len(X))
+        for start in range(0, len(X), BATCH_ROWS):
+            raw[start:start + BATCH_ROWS] = self._raw(X[start:start + BATCH_ROWS])
+        return raw
+
+    def _raw(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        scores = np.empty((len(X), len(self.roots) + 1))
+        scores[:, 0] = self.init_score
+        scores[:, 1:] = self.value[nodes]
+        # cumsum adds left to right, i.e. in tree order like sklearn (np.sum would pair up terms)
+        return np.cumsum(scores, axis=1)[:, -1]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """(rows x 2) class probabilities, as GradientBoostingClassifier.predict_proba"""
+        proba = np.empty((len(X), 2))
+        proba[:, 1] = expit(self.decision_function(X))
+        proba[:, 0] = 1 - proba[:, 1]
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Everything needed to rebuild the model, as plain arrays (for .npz files and model bundles)"""
+        return {'feature_names': np.array(self.feature_names), 'feature': self.feature,
+                'threshold': self.threshold, 'left': self.left, 'right': self.right, 'value': self.value,
+                'roots': self.roots, 'init_score': np.array(self.init_score), 'depth': np.array(self.depth),
+                'classes': self.classes}
+
+    @classmethod
+    def from_arrays(cls, data: Mapping) -> 'CompiledChurnModel':
+        """Inverse of arrays(); the node arrays are used as given, so memory-mapped ones stay mapped"""
+        return cls(data['feature_names'].tolist(), data['feature'], data['threshold'], data['left'],
+                   data['right'], data['value'], data['roots'], data['init_score'].item(),
+                   data['depth'].item(), data['classes'])
+
+    def save(self, path: str):
+        np.savez(path, **self.arrays())
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledChurnModel':
+        with np.load(path) as data:
+            return cls.from_arrays(data)
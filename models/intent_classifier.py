@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.text_processor import TextProcessor
+
+# FAQ category -> chat intent, used to turn the FAQ corpus into training data
+CATEGORY_INTENTS = {
+    'data_plans': 'data_inquiry',
+    'social_bundles': 'data_inquiry',
+    'recharge': 'recharge_issue',
+    'network': 'network_complaint',
+    'roaming': 'roaming_inquiry',
+    'porting': 'porting_request',
+    'tariff_plans': 'tariff_inquiry',
+    'security': 'security_issue'
+}
+
+# Typical customer phrasings, so every intent has data before any traffic is logged
+SEED_EXAMPLES = {
+    'data_inquiry': ["my data finishes fast", "buy data bundle", "how many gb do i have left",
+                     "data plan prices", "check my data balance"],
+    'recharge_issue': ["my recharge failed", "airtime not credited", "how do i top up",
+                       "recharge card not working", "load airtime"],
+    'network_complaint': ["no network signal", "poor connection in my area", "calls keep dropping",
+                          "internet is very slow", "network is bad"],
+    'roaming_inquiry': ["i am travelling abroad", "activate international roaming",
+                        "roaming charges in ghana", "use my line outside nigeria"],
+    'porting_request': ["port my number to mtn", "switch from glo to mtn", "transfer my number",
+                        "how to migrate my line"],
+    'tariff_inquiry': ["what tariff plan am i on", "call rates per second", "migrate to mtn pulse",
+                       "cheapest tariff for calls"],
+    'security_issue': ["my phone was stolen", "block my sim", "lost my sim card",
+                       "someone is using my line", "fraud on my account"],
+    'general_inquiry': ["hello", "good morning", "thank you", "i want to speak to an agent",
+                        "what services do you offer", "where is the nearest office"]
+}
+
+# The traffic log holds raw customer messages, so it is opt-in and bounded: past
+# TRAFFIC_LOG_MAX_BYTES it is rotated to "<log>.1" (replacing the previous one),
+# and training uses at most the TRAFFIC_SAMPLE most recent messages
+TRAFFIC_LOG_MAX_BYTES = 1 << 20
+TRAFFIC_SAMPLE = 2000
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over hashed word and character n-gram features"""
+
+    def __init__(self, intents: List[str], n_features: int = 2 ** 14, alpha: float = 0.1):
+        self.intents = list(intents)
+        self.n_features = n_features
+        self.alpha = alpha
+        self.temperature = 1.0
+        self._class_counts = np.zeros(len(self.intents))
+        self._feature_counts = np.zeros((len(self.intents), n_features))
+        self._lock = threading.Lock()
+        # Most recent learned (message, intent) pairs, carried over when the model is rebuilt
+        self.traffic: deque = deque(maxlen=TRAFFIC_SAMPLE)
+        self._refresh()
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        return TextProcessor.hashed_features(text, self.n_features)
+
+    def _refresh(self):
+        """Recompute log-probabilities.
+
+        Both arrays are built first and published as one tuple, so readers
+        (which don't take the lock) never pair new feature probabilities
+        with an old prior.
+        """
+        smoothed = self._feature_counts + self.alpha
+        feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log((self._class_counts + 1) / (self._class_counts.sum() + len(self.intents)))
+        # (feature log-probabilities, class log-priors)
+        self._log_probs = (feature_log_prob, class_log_prior)
+
+    def partial_fit(self, texts: List[str], labels: List[str]):
+        """Add labelled examples to the model"""
+        with self._lock:
+            for text, label in zip(texts, labels):
+                if label not in self.intents:
+                    continue
+                row = self.intents.index(label)
+                indices, counts = self._features(text)
+                self._class_counts[row] += 1
+                self._feature_counts[row, indices] += counts
+            self._refresh()
+
+    def learn(self, text: str, label: str):
+        """Train on one labelled message from live traffic and remember it for retraining"""
+        self.partial_fit([text], [label])
+        self.traffic.append((text, label))
+
+    def _log_likelihoods(self, features: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        indices, counts = features
+        feature_log_prob, class_log_prior = self._log_probs
+        return class_log_prior + feature_log_prob[:, indices] @ counts
+
+    def _softmax(self, scores: np.ndarray) -> np.ndarray:
+        scores = scores / self.temperature
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Calibrated probability for each intent"""
+        probs = self._softmax(self._log_likelihoods(self._features(text)))
+        return dict(zip(self.intents, probs.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely intent and its calibrated confidence"""
+        probs = self._softmax(self._log_likelihoods(self._features(text)))
+        best = int(np.argmax(probs))
+        return self.intents[best], float(probs[best])
+
+    def calibrate(self, texts: List[str], labels: List[str],
+                  temperatures: Optional[np.ndarray] = None) -> float:
+        """Fit the softmax temperature by leave-one-out negative log-likelihood.
+
+        Naive Bayes is badly over-confident on its own; scaling the
+        log-likelihoods makes the reported confidence usable as a threshold.
+        """
+        if temperatures is None:
+            temperatures = np.geomspace(0.5, 200, 60)
+        feature_log_prob = self._log_probs[0]
+        rows = []
+        scores = []
+        for text, label in zip(texts, labels):
+            if label not in self.intents:
+                continue
+            row = self.intents.index(label)
+            indices, counts = self._features(text)
+            # Score each example as if it had not been trained on
+            class_counts = self._class_counts.copy()
+            class_counts[row] -= 1
+            prior = np.log((np.maximum(class_counts, 0) + 1) / (class_counts.sum() + len(self.intents)))
+            log_prob = feature_log_prob[:, indices]
+            held_out = self._feature_counts[row] + self.alpha
+            held_out_total = held_out.sum() - counts.sum()
+            log_prob[row] = np.log((held_out[indices] - counts) / held_out_total)
+            scores.append(prior + log_prob @ counts)
+            rows.append(row)
+        if not scores:
+            return self.temperature
+
+        scores = np.array(scores)
+        rows = np.array(rows)
+        best_temperature, best_nll = self.temperature, np.inf
+        for temperature in temperatures:
+            scaled = scores / temperature
+            scaled -= scaled.max(axis=1, keepdims=True)
+            log_probs = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+            nll = -log_probs[np.arange(len(rows)), rows].mean()
+            if nll < best_nll:
+                best_temperature, best_nll = float(temperature), nll
+        self.temperature = best_temperature
+        return best_temperature
+
+    @staticmethod
+    def load_traffic(log_file: str, limit: int = TRAFFIC_SAMPLE) -> Tuple[List[str], List[str]]:
+        """Read the `limit` most recent (message, intent) pairs from a JSON-lines traffic log and its rotation"""
+        records = deque(maxlen=limit)
+        if not log_file:
+            return [], []
+        for path in (log_file + '.1', log_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        records.append((record['message'], record['intent']))
+                    except (ValueError, KeyError):
+                        continue
+        return [text for text, _ in records], [label for _, label in records]
+
+    @staticmethod
+    def log_traffic(log_file: str, message: str, intent: str, confidence: float,
+                    max_bytes: int = TRAFFIC_LOG_MAX_BYTES):
+        """Append a confidently classified message to the traffic log, rotating it past max_bytes"""
+        try:
+            if os.path.exists(log_file) and os.path.getsize(log_file) >= max_bytes:
+                os.replace(log_file, log_file + '.1')
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'message': message, 'intent': intent, 'confidence': confidence}) + "\n")
+        except OSError as e:
+            print(f"Error writing intent log {log_file}: {e}")
+
+    @classmethod
+    def from_faqs(cls, faqs: List[Dict], intents: List[str], traffic_log: Optional[str] = None,
+                  traffic: Optional[List[Tuple[str, str]]] = None) -> 'IntentClassifier':
+        """Train on FAQ questions/keywords (labelled by category), seed phrases and recent traffic.
+
+        Traffic comes from `traffic` when given (e.g. a previous model's
+        .traffic, so a rebuild doesn't re-read the log), else from the most
+        recent entries of traffic_log.
+        """
+        texts, labels = [], []
+        for faq in faqs:
+            intent = CATEGORY_INTENTS.get(faq.get('category'))
+            if intent in intents:
+                texts.append(faq['question'])
+                labels.append(intent)
+                if faq.get('keywords'):
+                    texts.append(' '.join(faq['keywords']))
+                    labels.append(intent)
+        for intent, examples in SEED_EXAMPLES.items():
+            texts.extend(examples)
+            labels.extend([intent] * len(examples))
+        if traffic is None:
+            traffic = list(zip(*cls.load_traffic(traffic_log)))
+        traffic = list(traffic)[-TRAFFIC_SAMPLE:]
+        texts.extend(text for text, _ in traffic)
+        labels.extend(label for _, label in traffic)
+
+        classifier = cls(intents)
+        classifier.partial_fit(texts, labels)
+        classifier.traffic.extend(traffic)
+        classifier.calibrate(texts, labels)
+        return classifier
@@ -1,55 +1,204 @@
+import asyncio
 import os
-from typing import Optional, Dict, List
+import time
+import weakref
+from typing import Any, Callable, Optional, Dict, Iterator, List
 import json
 
+from services.resilience import CircuitBreaker, ProviderStats, RetryPolicy
+from utils.tracing import span
+
+INTENT_SYSTEM_PROMPT = "You are an intent classification system. Always respond with valid JSON only."
+
 class AIService:
-    """Handles AI provider integration (OpenAI/Claude)"""
+    """Handles AI provider integration (OpenAI/Claude)
     
-    def __init__(self):
+    Every configured provider is kept, in priority order. Calls are retried
+    with backoff on transient errors and fail over to the next provider when
+    one keeps failing; a per-provider circuit breaker skips a backend that is
+    down until it has had time to recover. Each attempt is given up after
+    timeout seconds, so a hung provider is retried or failed over instead of
+    blocking for the SDK's default timeout.
+    """
+    
+    def __init__(self, max_retries: int = 3, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 ai_provider: Optional[str] = None, timeout: float = 30.0):
         # Try Streamlit secrets first (for cloud deployment), then environment variables (for local)
         try:
             import streamlit as st
             self.openai_key = st.secrets.get("OPENAI_API_KEY", "")
             self.anthropic_key = st.secrets.get("ANTHROPIC_API_KEY", "")
+            self.provider_setting = st.secrets.get("AI_PROVIDER", "")
         except:
             # Fallback to environment variables for local development
             from dotenv import load_dotenv
             load_dotenv()
             self.openai_key = os.getenv('OPENAI_API_KEY')
             self.anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-        self.provider = None
-        self.client = None
+            self.provider_setting = os.getenv('AI_PROVIDER', '')
+        # provider name -> client, in failover order
+        self.clients: Dict[str, Any] = {}
+        self.retry_policy = RetryPolicy(max_retries)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.provider_stats: Dict[str, ProviderStats] = {}
+        
+        # An explicit ai_provider (e.g. "stub" in benchmarks) wins over configuration
+        if ai_provider is not None:
+            self.provider_setting = ai_provider
         
-        # Initialize available provider - try OpenAI first
+        # AI_PROVIDER=stub swaps in the local stub model (services/stub_provider.py) for offline runs
+        if (self.provider_setting or '').lower() == 'stub':
+            from services.stub_provider import StubClient, StubLLM
+            self.stub_llm = StubLLM.from_env()
+            self.clients['stub'] = StubClient(self.stub_llm)
+            print(f"✅ AI Service initialized with local stub provider")
+            return
+        
+        # Initialize every available provider - OpenAI first, Anthropic as failover.
+        # The SDKs' own retries are disabled so retry_policy is the only one in charge.
         if self.openai_key and self.openai_key.startswith('sk-'):
             try:
                 import openai
-                self.client = openai.OpenAI(api_key=self.openai_key)
-                self.provider = 'openai'
+                self.clients['openai'] = openai.OpenAI(api_key=self.openai_key, max_retries=0)
                 print(f"✅ AI Service initialized with OpenAI")
             except Exception as e:
                 print(f"⚠️ OpenAI initialization failed: {e}")
-                self.client = None
-                self.provider = None
         
-        # Try Anthropic only if OpenAI failed
-        if not self.provider and self.anthropic_key and self.anthropic_key.startswith('sk-ant-'):
+        if self.anthropic_key and self.anthropic_key.startswith('sk-ant-'):
             try:
                 import anthropic
-                self.client = anthropic.Anthropic(api_key=self.anthropic_key)
-                self.provider = 'anthropic'
+                self.clients['anthropic'] = anthropic.Anthropic(api_key=self.anthropic_key, max_retries=0)
                 print(f"✅ AI Service initialized with Anthropic")
             except Exception as e:
                 print(f"⚠️ Anthropic initialization failed: {e}")
-                self.client = None
-                self.provider = None
         
-        if not self.provider:
+        if not self.clients:
             print("⚠️ No AI provider configured. Please add a valid API key to .env file.")
     
+    @property
+    def provider(self) -> Optional[str]:
+        """Preferred provider: the first one whose circuit breaker isn't open"""
+        for name in self.clients:
+            if self._breaker(name).state != CircuitBreaker.OPEN:
+                return name
+        return next(iter(self.clients), None)
+    
+    @property
+    def client(self):
+        return self.clients.get(self.provider)
+    
     def is_available(self) -> bool:
         """Check if AI service is configured"""
-        return self.provider is not None
+        return bool(self.clients)
+    
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[name]
+    
+    def _stats(self, name: str) -> ProviderStats:
+        if name not in self.provider_stats:
+            self.provider_stats[name] = ProviderStats()
+        return self.provider_stats[name]
+    
+    def health(self) -> Dict[str, Dict]:
+        """Breaker state, error rate and latency percentiles for each provider"""
+        report = {}
+        for name in self.clients:
+            breaker = self._breaker(name)
+            report[name] = {'state': breaker.state, 'trips': breaker.trips}
+            report[name].update(self._stats(name).summary())
+        return report
+    
+    @staticmethod
+    def is_error_response(text: str) -> bool:
+        """True for the warning/error messages generate_response returns instead of raising"""
+        return not isinstance(text, str) or text.startswith(("⚠️", "❌"))
+    
+    def _with_retries(self, call: Callable[[str, Any], Any]):
+        """Run call(provider, client) with retries and failover, raising the last error if all fail"""
+        last_error = None
+        for name, client in list(self.clients.items()):
+            breaker, stats = self._breaker(name), self._stats(name)
+            if last_error is not None:
+                stats.failovers += 1
+            for attempt in range(self.retry_policy.max_retries + 1):
+                if not breaker.allow():
+                    last_error = last_error or RuntimeError(f"{name} circuit breaker is open")
+                    break
+                start = time.perf_counter()
+                error = None
+                with span("provider_call", provider=name, attempt=attempt) as call_span:
+                    try:
+                        result = call(name, client)
+                    except Exception as e:
+                        error = e
+                        call_span.set(error=type(e).__name__)
+                if error is not None:
+                    stats.record(time.perf_counter() - start, error=True)
+                    self._record_error(breaker, error)
+                    last_error = error
+                    delay = self._retry_delay(error, attempt)
+                    if delay is None:
+                        break
+                    stats.retries += 1
+                    with span("retry_wait", provider=name, delay=delay):
+                        time.sleep(delay)
+                    continue
+                stats.record(time.perf_counter() - start)
+                breaker.record_success()
+                return result
+        raise last_error
+    
+    @staticmethod
+    def _record_error(breaker: CircuitBreaker, error: Exception):
+        """Only transient errors count toward opening the breaker.
+
+        A 400/401/403 means the provider answered; the request (or key) is
+        at fault, so tripping the breaker would only block good requests.
+        """
+        if RetryPolicy.is_retryable(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before retrying the same provider, or None to move on to the next one"""
+        if attempt >= self.retry_policy.max_retries or not RetryPolicy.is_retryable(error):
+            return None
+        return self.retry_policy.delay(attempt, RetryPolicy.retry_after(error))
+    
+    @staticmethod
+    def _complete(provider: str, client, prompt: str, system_prompt: str, max_tokens: int,
+                  temperature: float, timeout: float) -> str:
+        """One completion request; anything that isn't Anthropic speaks the OpenAI API"""
+        if provider == 'anthropic':
+            response = client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system_prompt if system_prompt else "You are a helpful assistant.",
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
+            )
+            return response.content[0].text
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout
+        )
+        return response.choices[0].message.content
     
     def generate_response(self, prompt: str, system_prompt: str = "", max_tokens: int = 500, temperature: float = 0.7) -> str:
         """Generate AI response"""
@@ -57,65 +206,164 @@ class AIService:
             return "⚠️ AI service not configured. Please add a valid API key to .env file.\n\nGet API keys:\n- OpenAI: https://platform.openai.com/api-keys\n- Anthropic: https://console.anthropic.com/"
         
         try:
-            if self.provider == 'openai':
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
-                
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                )
-                return response.choices[0].message.content
-            
-            elif self.provider == 'anthropic':
-                response = self.client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    system=system_prompt if system_prompt else "You are a helpful assistant.",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text
+            return self._with_retries(
+                lambda provider, client: self._complete(provider, client, prompt, system_prompt,
+                                                        max_tokens, temperature, self.timeout)
+            )
+        except Exception as e:
+            return self._error_message(e)
+    
+    @staticmethod
+    def _open_stream(provider: str, client, prompt: str, system_prompt: str, max_tokens: int,
+                     temperature: float, timeout: float) -> Iterator[str]:
+        """Stream a completion; timeout bounds connecting and each wait for the next chunk"""
+        if provider == 'anthropic':
+            with client.messages.stream(
+                model="claude-3-haiku-20240307",
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system_prompt if system_prompt else "You are a helpful assistant.",
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
+            ) as stream:
+                for text in stream.text_stream:
+                    if text:
+                        yield text
+            return
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            timeout=timeout
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def generate_response_stream(self, prompt: str, system_prompt: str = "", max_tokens: int = 500,
+                                 temperature: float = 0.7) -> Iterator[str]:
+        """Generate AI response, yielding text chunks as the provider sends them.
+        
+        Retries and failover only happen before the first chunk; once text has
+        been shown, a failure ends the stream.
+        """
+        if not self.is_available():
+            yield self.generate_response(prompt, system_prompt, max_tokens, temperature)
+            return
+        
+        def first_chunk(provider, client):
+            chunks = self._open_stream(provider, client, prompt, system_prompt, max_tokens, temperature,
+                                       self.timeout)
+            return provider, chunks, next(chunks, None)
         
+        try:
+            provider, chunks, chunk = self._with_retries(first_chunk)
+            if chunk is None:
+                return
+            yield chunk
+            start = time.perf_counter()
+            try:
+                for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                self._stats(provider).record(time.perf_counter() - start, error=True)
+                self._record_error(self._breaker(provider), e)
+                raise
         except Exception as e:
-            error_msg = str(e)
-            if "authentication" in error_msg.lower() or "401" in error_msg:
-                return f"❌ Authentication Error: Your API key is invalid or expired.\n\nPlease:\n1. Check your API key in .env file\n2. Ensure it's active in your provider dashboard\n3. Get a new key if needed:\n   - OpenAI: https://platform.openai.com/api-keys\n   - Anthropic: https://console.anthropic.com/\n\nError details: {error_msg}"
-            elif "rate_limit" in error_msg.lower() or "429" in error_msg:
-                return f"⚠️ Rate Limit: You've exceeded your API usage limit.\n\nPlease:\n1. Wait a few minutes and try again\n2. Check your usage at your provider dashboard\n3. Consider upgrading your API tier\n\nError details: {error_msg}"
-            else:
-                return f"❌ Error: {error_msg}\n\nPlease check:\n1. Your internet connection\n2. API key is valid\n3. Service is not down"
-    
-    def classify_intent(self, user_message: str, intents: List[str]) -> Dict:
-        """Classify user intent"""
-        prompt = f"""Classify the following customer message into one of these intents: {', '.join(intents)}
+            # Errors are reported in-band, as the last chunk, like generate_response does
+            yield self._error_message(e)
+    
+    @staticmethod
+    def _error_message(e: Exception) -> str:
+        """User-facing message for a provider error"""
+        error_msg = str(e)
+        # The SDKs' APITimeoutError subclasses neither
+        if isinstance(e, (TimeoutError, asyncio.TimeoutError)) or 'Timeout' in type(e).__name__:
+            return "⚠️ Timeout: The AI service did not respond in time.\n\nPlease try again in a moment."
+        elif "authentication" in error_msg.lower() or "401" in error_msg:
+            return f"❌ Authentication Error: Your API key is invalid or expired.\n\nPlease:\n1. Check your API key in .env file\n2. Ensure it's active in your provider dashboard\n3. Get a new key if needed:\n   - OpenAI: https://platform.openai.com/api-keys\n   - Anthropic: https://console.anthropic.com/\n\nError details: {error_msg}"
+        elif "rate_limit" in error_msg.lower() or "429" in error_msg:
+            return f"⚠️ Rate Limit: You've exceeded your API usage limit.\n\nPlease:\n1. Wait a few minutes and try again\n2. Check your usage at your provider dashboard\n3. Consider upgrading your API tier\n\nError details: {error_msg}"
+        else:
+            return f"❌ Error: {error_msg}\n\nPlease check:\n1. Your internet connection\n2. API key is valid\n3. Service is not down"
+    
+    @staticmethod
+    def parse_json_response(text: str) -> Optional[Dict]:
+        """Extract a JSON object from a model reply, tolerating code fences and surrounding prose"""
+        if not isinstance(text, str):
+            return None
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.lower().startswith("json"):
+                text = text[4:]
+        try:
+            result = json.loads(text)
+        except ValueError:
+            start, end = text.find("{"), text.rfind("}")
+            if start == -1 or end <= start:
+                return None
+            try:
+                result = json.loads(text[start:end + 1])
+            except ValueError:
+                return None
+        return result if isinstance(result, dict) else None
+    
+    def classify_intent(self, user_message: str, intents: List[str], local_classifier=None,
+                        confidence_threshold: float = 0.8) -> Dict:
+        """Classify user intent, skipping the LLM when the local classifier is confident"""
+        local_result = self._local_intent(user_message, local_classifier)
+        if local_result is not None and local_result["confidence"] >= confidence_threshold:
+            return local_result
+        
+        response = self.generate_response(self._intent_prompt(user_message, intents), INTENT_SYSTEM_PROMPT,
+                                          max_tokens=150, temperature=0.3)
+        return self._parse_intent(response, user_message, local_result)
+    
+    @staticmethod
+    def _local_intent(user_message: str, local_classifier) -> Optional[Dict]:
+        if local_classifier is None:
+            return None
+        intent, confidence = local_classifier.predict(user_message)
+        return {"intent": intent, "confidence": confidence, "entities": {}, "source": "local"}
+    
+    @staticmethod
+    def _intent_prompt(user_message: str, intents: List[str]) -> str:
+        return f"""Classify the following customer message into one of these intents: {', '.join(intents)}
 
 Customer message: "{user_message}"
 
 Respond with JSON format:
 {{"intent": "intent_name", "confidence": 0.95, "entities": {{}}"}}"""
-        
-        system_prompt = "You are an intent classification system. Always respond with valid JSON only."
-        
-        response = self.generate_response(prompt, system_prompt, max_tokens=150, temperature=0.3)
-        
-        try:
-            return json.loads(response)
-        except:
-            # Fallback intent detection
-            message_lower = user_message.lower()
-            if any(word in message_lower for word in ['data', 'bundle', 'plan', 'gb', 'mb']):
-                return {"intent": "data_inquiry", "confidence": 0.8, "entities": {}}
-            elif any(word in message_lower for word in ['recharge', 'airtime', 'top up']):
-                return {"intent": "recharge_issue", "confidence": 0.8, "entities": {}}
-            elif any(word in message_lower for word in ['network', 'signal', 'connection']):
-                return {"intent": "network_complaint", "confidence": 0.8, "entities": {}}
-            else:
-                return {"intent": "general_inquiry", "confidence": 0.6, "entities": {}}
+    
+    def _parse_intent(self, response: str, user_message: str, local_result: Optional[Dict]) -> Dict:
+        """Intent from the LLM reply, else the local guess, else keyword rules"""
+        result = self.parse_json_response(response)
+        if result is not None and result.get("intent"):
+            result["source"] = "llm"
+            return result
+        if local_result is not None:
+            # The LLM was asked but gave nothing usable, so this is not an avoided call
+            local_result["source"] = "fallback"
+            return local_result
+        # Fallback intent detection
+        message_lower = user_message.lower()
+        if any(word in message_lower for word in ['data', 'bundle', 'plan', 'gb', 'mb']):
+            return {"intent": "data_inquiry", "confidence": 0.8, "entities": {}, "source": "fallback"}
+        elif any(word in message_lower for word in ['recharge', 'airtime', 'top up']):
+            return {"intent": "recharge_issue", "confidence": 0.8, "entities": {}, "source": "fallback"}
+        elif any(word in message_lower for word in ['network', 'signal', 'connection']):
+            return {"intent": "network_complaint", "confidence": 0.8, "entities": {}, "source": "fallback"}
+        else:
+            return {"intent": "general_inquiry", "confidence": 0.6, "entities": {}, "source": "fallback"}
     
     def summarize_conversation(self, conversation: List[Dict]) -> str:
         """Summarize a conversation for CRM notes"""
@@ -130,3 +378,132 @@ Summary:"""
         system_prompt = "You are a customer service analyst. Create brief, professional summaries."
         
         return self.generate_response(prompt, system_prompt, max_tokens=150, temperature=0.5)
+
+
+class AsyncAIService(AIService):
+    """AIService with asyncio-native variants backed by the providers' async clients.
+    
+    At most max_concurrency requests are in flight per event loop, and each
+    attempt is abandoned after timeout seconds. Retries, failover and circuit
+    breakers are shared with the synchronous methods, which keep working.
+    """
+    
+    def __init__(self, max_concurrency: int = 8, timeout: float = 30.0, **kwargs):
+        super().__init__(timeout=timeout, **kwargs)
+        self.max_concurrency = max_concurrency
+        # asyncio primitives belong to one loop, so keep a semaphore per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # provider name -> async client, same order as self.clients
+        self.async_clients: Dict[str, Any] = {}
+        for name in self.clients:
+            try:
+                if name == 'stub':
+                    from services.stub_provider import AsyncStubClient
+                    self.async_clients[name] = AsyncStubClient(self.stub_llm)
+                elif name == 'openai':
+                    import openai
+                    self.async_clients[name] = openai.AsyncOpenAI(api_key=self.openai_key, max_retries=0)
+                elif name == 'anthropic':
+                    import anthropic
+                    self.async_clients[name] = anthropic.AsyncAnthropic(api_key=self.anthropic_key, max_retries=0)
+            except Exception as e:
+                print(f"⚠️ Async {name} client initialization failed: {e}")
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+    
+    @staticmethod
+    async def _acomplete(provider: str, client, prompt: str, system_prompt: str, max_tokens: int,
+                         temperature: float) -> str:
+        if provider == 'anthropic':
+            response = await client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system_prompt if system_prompt else "You are a helpful assistant.",
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return response.content[0].text
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        response = await client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+    
+    async def _awith_retries(self, call, timeout: float):
+        """Async _with_retries; each attempt is bounded by timeout"""
+        last_error = None
+        for name, client in list(self.async_clients.items()):
+            breaker, stats = self._breaker(name), self._stats(name)
+            if last_error is not None:
+                stats.failovers += 1
+            for attempt in range(self.retry_policy.max_retries + 1):
+                if not breaker.allow():
+                    last_error = last_error or RuntimeError(f"{name} circuit breaker is open")
+                    break
+                start = time.perf_counter()
+                error = None
+                with span("provider_call", provider=name, attempt=attempt) as call_span:
+                    try:
+                        result = await asyncio.wait_for(call(name, client), timeout)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        error = e
+                        call_span.set(error=type(e).__name__)
+                if error is not None:
+                    stats.record(time.perf_counter() - start, error=True)
+                    self._record_error(breaker, error)
+                    last_error = error
+                    delay = self._retry_delay(error, attempt)
+                    if delay is None:
+                        break
+                    stats.retries += 1
+                    with span("retry_wait", provider=name, delay=delay):
+                        await asyncio.sleep(delay)
+                    continue
+                stats.record(time.perf_counter() - start)
+                breaker.record_success()
+                return result
+        raise last_error
+    
+    async def agenerate_response(self, prompt: str, system_prompt: str = "", max_tokens: int = 500,
+                                 temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Async generate_response; waits for a free slot, and cancelling the task aborts the request"""
+        if not self.async_clients:
+            return self.generate_response(prompt, system_prompt, max_tokens, temperature)
+        
+        try:
+            async with self._semaphore():
+                return await self._awith_retries(
+                    lambda provider, client: self._acomplete(provider, client, prompt, system_prompt,
+                                                             max_tokens, temperature),
+                    self.timeout if timeout is None else timeout
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return self._error_message(e)
+    
+    async def aclassify_intent(self, user_message: str, intents: List[str], local_classifier=None,
+                               confidence_threshold: float = 0.8) -> Dict:
+        """Async classify_intent"""
+        local_result = self._local_intent(user_message, local_classifier)
+        if local_result is not None and local_result["confidence"] >= confidence_threshold:
+            return local_result
+        
+        response = await self.agenerate_response(self._intent_prompt(user_message, intents), INTENT_SYSTEM_PROMPT,
+                                                 max_tokens=150, temperature=0.3)
+        return self._parse_intent(response, user_message, local_result)
@@ -1,15 +1,108 @@
+import asyncio
+import contextvars
+import hashlib
 import json
-from typing import List, Dict, Optional
-from services.ai_service import AIService
+import os
+import threading
+import time
+from typing import Dict, Generator, Iterator, List, Optional, Tuple
+from services.ai_service import AIService, AsyncAIService
+from services.faq_corpus import FAQCorpus, RETRIEVAL_MODES
+from services.faq_index import FAQIndex
+from services.faq_vectors import FAQVectorIndex
+from services.response_cache import ResponseCache, SemanticCache
+from models.intent_classifier import IntentClassifier
+from utils.tracing import Tracer, span
+
+SYSTEM_PROMPT = """You are MTN SmartAssist, an AI customer service assistant for MTN Nigeria.
+
+Your personality:
+- Friendly, professional, and empathetic
+- Use MTN brand voice: warm, helpful, and solution-oriented
+- Keep responses concise but complete
+- Always try to resolve issues or provide clear next steps
+
+Guidelines:
+- Use the FAQ context provided to give accurate information
+- If you don't know something, direct customers to dial 180 or visit an MTN service center
+- Be proactive in suggesting related services
+- Show empathy for customer issues
+- Use Nigerian English and local context"""
+
+class ResponseStream:
+    """Iterable over reply chunks; result holds the response metadata once it is exhausted.
+    
+    The generator always runs in its own copy of the caller's context, so the
+    trace it holds open between chunks never becomes the consumer's current
+    trace, and an abandoned stream unwinds it (on close() or when collected)
+    in the context that started it.
+    """
+    
+    def __init__(self, chunks: Generator[str, None, Dict]):
+        self._chunks = chunks
+        self._context = contextvars.copy_context()
+        self._start = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+        self.result: Optional[Dict] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            try:
+                chunk = self._context.run(next, self._chunks)
+            except StopIteration as stop:
+                self.result = stop.value
+                self.result['time_to_first_token'] = self.time_to_first_token
+                return
+            if self.time_to_first_token is None and chunk:
+                self.time_to_first_token = time.perf_counter() - self._start
+            yield chunk
+    
+    def close(self):
+        """Stop generating; the trace of an unfinished stream ends here"""
+        self._context.run(self._chunks.close)
+    
+    def __del__(self):
+        self.close()
 
 class ChatEngine:
     """Main chat engine for MTN SmartAssist"""
     
-    def __init__(self, faq_file: str = "data/faqs.json", scraped_faq_file: str = "data/scraped_faqs.json"):
-        self.ai_service = AIService()
-        self.faqs = self._load_faqs(faq_file)
-        self.scraped_faqs = self._load_faqs(scraped_faq_file)
-        self.all_faqs = self.faqs + self.scraped_faqs
+    def __init__(self, faq_file: str = "data/faqs.json", scraped_faq_file: str = "data/scraped_faqs.json",
+                 retrieval_mode: str = "keyword", hybrid_alpha: float = 0.5,
+                 intent_threshold: float = 0.8, intent_log: Optional[str] = None,
+                 single_pass: bool = False, cache_size: int = 1024, cache_ttl: float = 3600,
+                 cache_db: Optional[str] = None, semantic_cache_size: int = 512,
+                 semantic_threshold: float = 0.7, max_concurrency: int = 8, request_timeout: float = 30.0,
+                 ai_provider: Optional[str] = None, tracing: bool = True, trace_log: Optional[str] = None):
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"retrieval_mode must be one of {RETRIEVAL_MODES}, got {retrieval_mode!r}")
+        # Per-stage timings for every response; trace_log also appends each trace as a JSON line
+        self.tracer = Tracer(tracing, trace_log)
+        # Serves both the sync and async paths; max_concurrency caps in-flight async requests
+        self.ai_service = AsyncAIService(max_concurrency, request_timeout, ai_provider=ai_provider)
+        self.faq_file = faq_file
+        self.scraped_faq_file = scraped_faq_file
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_alpha = hybrid_alpha
+        # Ask for intent and reply in a single provider call
+        self.single_pass = single_pass
+        # Replies keyed on message, intent and FAQ context; cache_size=0 disables caching
+        self.response_cache = ResponseCache(cache_size, cache_ttl, cache_db) if cache_size > 0 else None
+        # Second tier for near-duplicate wording; semantic_cache_size=0 disables it
+        self.semantic_cache = (SemanticCache(semantic_cache_size, semantic_threshold, cache_ttl)
+                               if semantic_cache_size > 0 else None)
+        
+        # path -> (mtime_ns, size, sha1 of contents) as of the last load
+        self._source_state = {}
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watcher = threading.Event()
+        
+        # Vector index lives next to the FAQ file and is only built when a mode needs it
+        sources = {path: self._load_faqs(path) for path in (faq_file, scraped_faq_file)}
+        self._corpus = FAQCorpus(sources, vector_cache_dir=os.path.dirname(faq_file) or ".")
+        if retrieval_mode != "keyword":
+            self.get_vector_index()
         
         self.intents = [
             "data_inquiry",
@@ -21,102 +114,431 @@ class ChatEngine:
             "security_issue",
             "general_inquiry"
         ]
+        
+        # Local intent model; the LLM is only asked when its confidence is below intent_threshold.
+        # intent_log (off by default, it stores raw messages) persists learned examples across restarts
+        self.intent_threshold = intent_threshold
+        self.intent_log = intent_log
+        self.intent_classifier = IntentClassifier.from_faqs(self.all_faqs, self.intents, intent_log)
+    
+    @property
+    def faqs(self) -> List[Dict]:
+        return self._corpus.sources[self.faq_file]
+    
+    @property
+    def scraped_faqs(self) -> List[Dict]:
+        return self._corpus.sources[self.scraped_faq_file]
+    
+    @property
+    def all_faqs(self) -> List[Dict]:
+        return self._corpus.all_faqs
+    
+    @property
+    def faq_index(self) -> FAQIndex:
+        return self._corpus.faq_index
     
     def _load_faqs(self, filename: str) -> List[Dict]:
         """Load FAQs from JSON file"""
+        faqs = self._read_faqs(filename)
+        return faqs if faqs is not None else []
+    
+    def _read_faqs(self, filename: str) -> Optional[List[Dict]]:
+        """Load FAQs and remember the file state, None if the file can't be parsed"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('faqs', [])
+            stat = os.stat(filename)
+            with open(filename, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw.decode('utf-8'))
+            self._source_state[filename] = (stat.st_mtime_ns, stat.st_size, hashlib.sha1(raw).hexdigest())
+            return data.get('faqs', [])
         except FileNotFoundError:
+            self._source_state[filename] = None
             return []
         except Exception as e:
             print(f"Error loading FAQs from {filename}: {e}")
-            return []
+            return None
     
-    def search_faqs(self, query: str, top_k: int = 3) -> List[Dict]:
-        """Search FAQs based on keyword matching"""
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-        
-        scored_faqs = []
-        for faq in self.all_faqs:
-            score = 0
-            
-            # Check keywords
-            if 'keywords' in faq:
-                keywords = [k.lower() for k in faq['keywords']]
-                score += sum(2 for word in query_words if any(word in k for k in keywords))
-            
-            # Check question and answer
-            question_lower = faq['question'].lower()
-            answer_lower = faq['answer'].lower()
-            
-            score += sum(1 for word in query_words if word in question_lower)
-            score += sum(0.5 for word in query_words if word in answer_lower)
-            
-            if score > 0:
-                scored_faqs.append((score, faq))
-        
-        # Sort by score and return top_k
-        scored_faqs.sort(reverse=True, key=lambda x: x[0])
-        return [faq for score, faq in scored_faqs[:top_k]]
+    def _source_changed(self, filename: str) -> bool:
+        """Cheap mtime/size check, confirmed by a content hash"""
+        previous = self._source_state.get(filename)
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return previous is not None
+        if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+            return False
+        try:
+            with open(filename, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return False
+        if previous and previous[2] == digest:
+            # Touched but not modified
+            self._source_state[filename] = (stat.st_mtime_ns, stat.st_size, digest)
+            return False
+        return True
     
-    def generate_response(self, user_message: str, conversation_history: List[Dict] = None) -> Dict:
-        """Generate response to user message"""
-        
-        # Classify intent
-        intent_result = self.ai_service.classify_intent(user_message, self.intents)
+    def reload_faqs(self) -> Dict:
+        """Apply added, changed or removed FAQs from modified source files.
         
-        # Search relevant FAQs
-        relevant_faqs = self.search_faqs(user_message)
+        The new corpus is fully built before it replaces the current one, so
+        requests already in flight keep searching the snapshot they started with.
+        'skipped' counts modified files that couldn't be parsed; they are
+        retried on the next call.
+        """
+        changes = {'added': 0, 'changed': 0, 'removed': 0, 'skipped': 0}
+        with self._reload_lock:
+            corpus = self._corpus
+            for path in (self.faq_file, self.scraped_faq_file):
+                if not self._source_changed(path):
+                    continue
+                faqs = self._read_faqs(path)
+                if faqs is None:
+                    # Likely a half-written file, keep serving the old FAQs and retry later
+                    changes['skipped'] += 1
+                    continue
+                corpus, file_changes = corpus.apply(path, faqs)
+                for key, count in file_changes.items():
+                    changes[key] += count
+            if corpus is not self._corpus:
+                if self.retrieval_mode != "keyword":
+                    corpus.get_vector_index()
+                # Retrain on the new FAQs, keeping the traffic learned so far rather than re-reading the log
+                self.intent_classifier = IntentClassifier.from_faqs(corpus.all_faqs, self.intents,
+                                                                    traffic=self.intent_classifier.traffic)
+                self._corpus = corpus
+        return changes
+    
+    def start_faq_watcher(self, interval: float = 5.0):
+        """Poll the FAQ files in a background thread and reload them when they change"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_watcher.clear()
         
-        # Build context for AI
-        faq_context = "\n\n".join([
-            f"FAQ: {faq['question']}\nAnswer: {faq['answer']}"
-            for faq in relevant_faqs
-        ]) if relevant_faqs else "No specific FAQs found."
+        def watch():
+            while not self._stop_watcher.wait(interval):
+                try:
+                    self.reload_faqs()
+                except Exception as e:
+                    print(f"Error reloading FAQs: {e}")
         
-        # Build system prompt
-        system_prompt = """You are MTN SmartAssist, an AI customer service assistant for MTN Nigeria.
-
-Your personality:
-- Friendly, professional, and empathetic
-- Use MTN brand voice: warm, helpful, and solution-oriented
-- Keep responses concise but complete
-- Always try to resolve issues or provide clear next steps
+        self._watcher = threading.Thread(target=watch, name="faq-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_faq_watcher(self):
+        """Stop the background FAQ watcher"""
+        self._stop_watcher.set()
+    
+    def get_vector_index(self) -> FAQVectorIndex:
+        """Vector index over all FAQs, loaded from disk unless the FAQs changed"""
+        return self._corpus.get_vector_index()
+    
+    def search_faqs(self, query: str, top_k: int = 3, mode: Optional[str] = None) -> List[Dict]:
+        """Search FAQs with the keyword (BM25), vector (TF-IDF) or hybrid ranker"""
+        # Read the snapshot once so a concurrent reload can't mix two corpora
+        with span("faq_search"):
+            return self._corpus.search(query, top_k, mode or self.retrieval_mode, self.hybrid_alpha)
+    
+    def classify_intent(self, user_message: str) -> Dict:
+        """Classify intent locally, escalating to the LLM when unsure"""
+        with span("intent"):
+            intent_result = self.ai_service.classify_intent(
+                user_message, self.intents,
+                local_classifier=self.intent_classifier,
+                confidence_threshold=self.intent_threshold
+            )
+        self._learn_intent(user_message, intent_result)
+        return intent_result
+    
+    async def aclassify_intent(self, user_message: str) -> Dict:
+        """Async classify_intent"""
+        with span("intent"):
+            intent_result = await self.ai_service.aclassify_intent(
+                user_message, self.intents,
+                local_classifier=self.intent_classifier,
+                confidence_threshold=self.intent_threshold
+            )
+        self._learn_intent(user_message, intent_result)
+        return intent_result
+    
+    def _learn_intent(self, user_message: str, intent_result: Dict):
+        """Confident LLM answers become training data for the local model"""
+        if (intent_result.get('source') == 'llm' and intent_result.get('intent') in self.intents
+                and intent_result.get('confidence', 0) >= self.intent_threshold):
+            self.intent_classifier.learn(user_message, intent_result['intent'])
+            if self.intent_log:
+                IntentClassifier.log_traffic(self.intent_log, user_message,
+                                             intent_result['intent'], intent_result['confidence'])
+    
+    def _faq_context(self, relevant_faqs: List[Dict]) -> str:
+        """FAQ context block for the prompt"""
+        with span("prompt_build"):
+            return "\n\n".join([
+                f"FAQ: {faq['question']}\nAnswer: {faq['answer']}"
+                for faq in relevant_faqs
+            ]) if relevant_faqs else "No specific FAQs found."
+    
+    def _user_prompt(self, user_message: str, intent: str, faq_context: str) -> str:
+        with span("prompt_build"):
+            return f"""Customer message: {user_message}
 
-Guidelines:
-- Use the FAQ context provided to give accurate information
-- If you don't know something, direct customers to dial 180 or visit an MTN service center
-- Be proactive in suggesting related services
-- Show empathy for customer issues
-- Use Nigerian English and local context"""
+Detected intent: {intent}
 
-        # Build user prompt
-        user_prompt = f"""Customer message: {user_message}
+Relevant FAQ context:
+{faq_context}
 
-Detected intent: {intent_result.get('intent', 'unknown')}
+Provide a helpful, friendly response that addresses the customer's needs. If the FAQ context is relevant, use it to inform your answer."""
+    
+    def _single_pass_prompt(self, user_message: str, faq_context: str) -> str:
+        with span("prompt_build"):
+            return f"""Customer message: {user_message}
 
 Relevant FAQ context:
 {faq_context}
 
-Provide a helpful, friendly response that addresses the customer's needs. If the FAQ context is relevant, use it to inform your answer."""
+First classify the customer message into one of these intents: {', '.join(self.intents)}
+Then write a helpful, friendly response that addresses the customer's needs. If the FAQ context is relevant, use it to inform your answer.
 
-        # Generate AI response
-        ai_response = self.ai_service.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=500,
-            temperature=0.7
-        )
+Respond with JSON only, in this format:
+{{"intent": "intent_name", "confidence": 0.95, "response": "your reply to the customer"}}"""
+    
+    def _single_pass(self, user_message: str, faq_context: str) -> Optional[Dict]:
+        """Ask for intent and reply in one call, None if the result can't be parsed"""
+        prompt = self._single_pass_prompt(user_message, faq_context)
+        with span("generation", single_pass=True):
+            raw = self.ai_service.generate_response(
+                prompt=prompt,
+                system_prompt=SYSTEM_PROMPT,
+                max_tokens=650,
+                temperature=0.7
+            )
+        return self._parse_single_pass(raw)
+    
+    def _parse_single_pass(self, raw: str) -> Optional[Dict]:
+        result = AIService.parse_json_response(raw)
+        if not result or not isinstance(result.get('response'), str) or not result['response'].strip():
+            return None
+        intent = result.get('intent')
+        try:
+            confidence = min(max(float(result.get('confidence', 0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return {
+            "intent": intent if intent in self.intents else "general_inquiry",
+            "confidence": confidence if intent in self.intents else 0.0,
+            "entities": {},
+            "source": "llm",
+            "response": result['response'].strip()
+        }
+    
+    @staticmethod
+    def _semantic_scope(intent: Optional[str], relevant_faqs: List[Dict]) -> str:
+        """Near-duplicates only share a reply if they agree on intent and best FAQ (by content)"""
+        top_faq = FAQCorpus.faq_hash(relevant_faqs[0]) if relevant_faqs else ""
+        return f"{intent}:{top_faq}"
+    
+    def _cached(self, user_message: str, intent: Optional[str], faq_context: str,
+                relevant_faqs: List[Dict]) -> Tuple[Optional[Dict], Optional[str]]:
+        """Cached reply and the tier it came from ('exact' or 'semantic')"""
+        with span("cache_lookup") as lookup:
+            if self.response_cache is not None:
+                hit = self.response_cache.get(ResponseCache.make_key(user_message, intent, faq_context))
+                if hit is not None:
+                    lookup.set(tier="exact")
+                    return hit, "exact"
+            if self.semantic_cache is not None:
+                hit = self.semantic_cache.get(user_message, self._semantic_scope(intent, relevant_faqs))
+                if hit is not None:
+                    lookup.set(tier="semantic")
+                    return hit, "semantic"
+            return None, None
+    
+    def _cache(self, user_message: str, intent: Optional[str], faq_context: str,
+               relevant_faqs: List[Dict], value: Dict):
+        if AIService.is_error_response(value.get('response')):
+            return
+        with span("cache_store"):
+            if self.response_cache is not None:
+                self.response_cache.set(ResponseCache.make_key(user_message, intent, faq_context), value)
+            if self.semantic_cache is not None:
+                self.semantic_cache.set(user_message, self._semantic_scope(intent, relevant_faqs), value)
+    
+    def generate_response(self, user_message: str, conversation_history: List[Dict] = None) -> Dict:
+        """Generate response to user message; per-stage milliseconds are under 'timings'"""
+        with self.tracer.trace("generate_response") as trace:
+            response = self._generate_response(user_message)
+        response["timings"] = trace.timings() if trace else {}
+        return response
+    
+    def _generate_response(self, user_message: str) -> Dict:
+        # Search relevant FAQs
+        relevant_faqs = self.search_faqs(user_message)
+        faq_context = self._faq_context(relevant_faqs)
+        
+        intent_result = None
+        ai_response = None
+        cache_tier = None
+        if self.single_pass:
+            # One provider call for intent and reply, unless the local model is already sure
+            with span("intent", local=True):
+                intent, confidence = self.intent_classifier.predict(user_message)
+            if confidence >= self.intent_threshold:
+                intent_result = {"intent": intent, "confidence": confidence, "entities": {}, "source": "local"}
+            else:
+                # Intent isn't known before the call, so the whole result is cached under a wildcard intent
+                hit, cache_tier = self._cached(user_message, "*", faq_context, relevant_faqs)
+                if hit is not None:
+                    intent_result = {"intent": hit['intent'], "confidence": hit['confidence'],
+                                     "entities": {}, "source": "cache"}
+                    ai_response = hit['response']
+                else:
+                    intent_result = self._single_pass(user_message, faq_context)
+                    if intent_result is not None:
+                        ai_response = intent_result.pop('response')
+                        self._learn_intent(user_message, intent_result)
+                        self._cache(user_message, "*", faq_context, relevant_faqs, {
+                            "response": ai_response,
+                            "intent": intent_result['intent'],
+                            "confidence": intent_result['confidence']
+                        })
+        
+        if ai_response is None:
+            # Two-call path: classify, then generate
+            if intent_result is None:
+                intent_result = self.classify_intent(user_message)
+            intent = intent_result.get('intent', 'unknown')
+            hit, cache_tier = self._cached(user_message, intent, faq_context, relevant_faqs)
+            if hit is not None:
+                ai_response = hit['response']
+            else:
+                prompt = self._user_prompt(user_message, intent, faq_context)
+                with span("generation"):
+                    ai_response = self.ai_service.generate_response(
+                        prompt=prompt,
+                        system_prompt=SYSTEM_PROMPT,
+                        max_tokens=500,
+                        temperature=0.7
+                    )
+                self._cache(user_message, intent, faq_context, relevant_faqs, {"response": ai_response})
         
+        return self._response_data(ai_response, intent_result, relevant_faqs, cache_tier)
+    
+    async def agenerate_response(self, user_message: str, conversation_history: List[Dict] = None) -> Dict:
+        """Async generate_response; FAQ search runs in a worker thread while the intent is classified"""
+        with self.tracer.trace("agenerate_response") as trace:
+            response = await self._agenerate_response(user_message)
+        response["timings"] = trace.timings() if trace else {}
+        return response
+    
+    async def _agenerate_response(self, user_message: str) -> Dict:
+        search = asyncio.to_thread(self.search_faqs, user_message)
+        if self.single_pass:
+            with span("intent", local=True):
+                intent, confidence = self.intent_classifier.predict(user_message)
+            if confidence < self.intent_threshold:
+                # The combined prompt needs the FAQ context, so there is nothing to overlap
+                relevant_faqs = await search
+                faq_context = self._faq_context(relevant_faqs)
+                hit, cache_tier = self._cached(user_message, "*", faq_context, relevant_faqs)
+                if hit is not None:
+                    intent_result = {"intent": hit['intent'], "confidence": hit['confidence'],
+                                     "entities": {}, "source": "cache"}
+                    return self._response_data(hit['response'], intent_result, relevant_faqs, cache_tier)
+                prompt = self._single_pass_prompt(user_message, faq_context)
+                with span("generation", single_pass=True):
+                    raw = await self.ai_service.agenerate_response(
+                        prompt=prompt,
+                        system_prompt=SYSTEM_PROMPT,
+                        max_tokens=650,
+                        temperature=0.7
+                    )
+                intent_result = self._parse_single_pass(raw)
+                if intent_result is not None:
+                    ai_response = intent_result.pop('response')
+                    self._learn_intent(user_message, intent_result)
+                    self._cache(user_message, "*", faq_context, relevant_faqs, {
+                        "response": ai_response,
+                        "intent": intent_result['intent'],
+                        "confidence": intent_result['confidence']
+                    })
+                    return self._response_data(ai_response, intent_result, relevant_faqs, None)
+                intent_result = await self.aclassify_intent(user_message)
+            else:
+                relevant_faqs = await search
+                intent_result = {"intent": intent, "confidence": confidence, "entities": {}, "source": "local"}
+        else:
+            relevant_faqs, intent_result = await asyncio.gather(search, self.aclassify_intent(user_message))
+        
+        faq_context = self._faq_context(relevant_faqs)
+        intent = intent_result.get('intent', 'unknown')
+        hit, cache_tier = self._cached(user_message, intent, faq_context, relevant_faqs)
+        if hit is not None:
+            return self._response_data(hit['response'], intent_result, relevant_faqs, cache_tier)
+        prompt = self._user_prompt(user_message, intent, faq_context)
+        with span("generation"):
+            ai_response = await self.ai_service.agenerate_response(
+                prompt=prompt,
+                system_prompt=SYSTEM_PROMPT,
+                max_tokens=500,
+                temperature=0.7
+            )
+        self._cache(user_message, intent, faq_context, relevant_faqs, {"response": ai_response})
+        return self._response_data(ai_response, intent_result, relevant_faqs, None)
+    
+    def generate_response_stream(self, user_message: str, conversation_history: List[Dict] = None) -> ResponseStream:
+        """Stream the reply as it is generated; intent/FAQ metadata is on the stream's result afterwards.
+        
+        Always uses the two-call path, since a single-pass JSON reply can't be shown until it is complete.
+        """
+        return ResponseStream(self._stream_response(user_message))
+    
+    def _stream_response(self, user_message: str) -> Generator[str, None, Dict]:
+        with self.tracer.trace("generate_response_stream") as trace:
+            response = yield from self._stream_stages(user_message)
+        response["timings"] = trace.timings() if trace else {}
+        return response
+    
+    def _stream_stages(self, user_message: str) -> Generator[str, None, Dict]:
+        relevant_faqs = self.search_faqs(user_message)
+        faq_context = self._faq_context(relevant_faqs)
+        intent_result = self.classify_intent(user_message)
+        intent = intent_result.get('intent', 'unknown')
+        
+        hit, cache_tier = self._cached(user_message, intent, faq_context, relevant_faqs)
+        if hit is not None:
+            ai_response = hit['response']
+            yield ai_response
+        else:
+            chunks = []
+            prompt = self._user_prompt(user_message, intent, faq_context)
+            with span("generation", streamed=True):
+                for chunk in self.ai_service.generate_response_stream(
+                    prompt=prompt,
+                    system_prompt=SYSTEM_PROMPT,
+                    max_tokens=500,
+                    temperature=0.7
+                ):
+                    chunks.append(chunk)
+                    yield chunk
+            ai_response = "".join(chunks)
+            # A provider error arrives as the last chunk, possibly after partial text
+            if chunks and not AIService.is_error_response(chunks[-1]):
+                self._cache(user_message, intent, faq_context, relevant_faqs, {"response": ai_response})
+        
+        return self._response_data(ai_response, intent_result, relevant_faqs, cache_tier)
+    
+    @staticmethod
+    def _response_data(ai_response: str, intent_result: Dict, relevant_faqs: List[Dict],
+                       cache_tier: Optional[str]) -> Dict:
         return {
             "response": ai_response,
             "intent": intent_result.get('intent'),
             "confidence": intent_result.get('confidence', 0),
+            "intent_source": intent_result.get('source'),
             "relevant_faqs": relevant_faqs,
-            "faq_count": len(relevant_faqs)
+            "faq_count": len(relevant_faqs),
+            "cached": cache_tier is not None,
+            "cache_tier": cache_tier
         }
     
     def get_conversation_summary(self, conversation: List[Dict]) -> str:
@@ -0,0 +1,177 @@
+import asyncio
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.churn_model import risk_level
+from utils.metrics import QuantileSketch, RunningStat
+
+# Raw inputs each request must carry; derived features are computed per batch
+INPUT_COLUMNS = ['tenure_months', 'monthly_spend', 'data_usage_gb', 'call_minutes', 'complaints',
+                 'last_recharge_days']
+
+_STOP = object()
+
+
+class ScoringOverloaded(Exception):
+    """The scoring queue is full; the caller should back off or shed the request"""
+
+
+class ChurnScoringService:
+    """On-demand churn scoring for single customers, coalesced into micro-batches.
+
+    score()/submit() validate the request and enqueue it. One worker thread
+    blocks for a request, then keeps collecting until max_batch requests or
+    max_wait seconds have passed, and scores the whole batch in one call to
+    ChurnPredictor.score_rows (the compiled model up to MAX_COMPILED_ROWS,
+    see models/compiled_churn.py, and sklearn above it).
+    The queue is bounded: when it is full, submit() waits up to `block`
+    seconds and then raises ScoringOverloaded instead of queueing without
+    limit. `predictor` is a callable returning the current ChurnPredictor, so
+    a retrained model is picked up on the next batch.
+    """
+
+    def __init__(self, predictor: Callable, max_batch: int = 64, max_wait: float = 0.002, max_queue: int = 1024):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'rejected': 0, 'batches': 0, 'errors': 0}
+        self._batch_sizes: Dict[int, int] = {}
+        self._latency = QuantileSketch()
+        self._latency_stat = RunningStat()
+        self._worker = threading.Thread(target=self._run, name="churn-scoring", daemon=True)
+        self._worker.start()
+
+    # Requests
+
+    def submit(self, customer: Dict, block: float = 0) -> Future:
+        """Queue one customer (a mapping with INPUT_COLUMNS) and return a Future of its score"""
+        row = []
+        try:
+            for column in INPUT_COLUMNS:
+                row.append(float(customer[column]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Customer record needs a number for {column!r}") from e
+        # NaN would score as an arbitrary branch and inf overflows the derived features
+        for column, value in zip(INPUT_COLUMNS, row):
+            if not math.isfinite(value):
+                raise ValueError(f"Customer record has a non-finite {column!r}: {value}")
+        row = tuple(row)
+        future = Future()
+        request = (row, customer.get('customer_id'), future, time.perf_counter())
+        try:
+            if block > 0:
+                self._queue.put(request, timeout=block)
+            else:
+                self._queue.put_nowait(request)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise ScoringOverloaded(f"Churn scoring queue is full ({self.max_queue} requests)")
+        return future
+
+    def score(self, customer: Dict, timeout: Optional[float] = 5.0, block: float = 0) -> Dict:
+        """Score one customer: customer_id, churn_probability, churn_prediction and risk_level"""
+        return self.submit(customer, block).result(timeout)
+
+    async def ascore(self, customer: Dict, block: float = 0) -> Dict:
+        """score() for asyncio callers; waits without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(customer, block))
+
+    def close(self):
+        """Score what is queued and stop the worker thread"""
+        if self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join(timeout=10)
+
+    # Worker
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._score_batch(batch)
+            if stop:
+                return
+
+    def _next_batch(self) -> Tuple[List[Tuple], bool]:
+        """Block for one request, then gather more until max_batch or max_wait"""
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch:
+                return batch, False
+            try:
+                # Past the deadline, still take whatever is already waiting
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+
+    def _score_batch(self, batch: List[Tuple]):
+        # Skip requests whose caller already gave up
+        batch = [request for request in batch if request[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            rows = np.array([request[0] for request in batch])
+            columns = {column: rows[:, i] for i, column in enumerate(INPUT_COLUMNS)}
+            probabilities, labels = self.predictor().score_rows(columns)
+        except Exception as e:
+            print(f"Error scoring churn batch: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+            for request in batch:
+                request[2].set_exception(e)
+            return
+
+        done = time.perf_counter()
+        for (_, customer_id, future, _), probability, label in zip(batch, probabilities, labels):
+            future.set_result({
+                'customer_id': customer_id,
+                'churn_probability': float(probability),
+                'churn_prediction': int(label),
+                'risk_level': risk_level(probability)
+            })
+        with self._lock:
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            for request in batch:
+                self._latency.add(done - request[3])
+                self._latency_stat.add(done - request[3])
+
+    # Monitoring
+
+    def stats(self) -> Dict:
+        """Counters, current queue depth, batch-size histogram and request latency (seconds, queueing included)"""
+        with self._lock:
+            return dict(
+                self._stats,
+                queue_depth=self._queue.qsize(),
+                max_queue=self.max_queue,
+                batch_sizes=dict(sorted(self._batch_sizes.items())),
+                mean_batch_size=self._stats['requests'] / self._stats['batches'] if self._stats['batches'] else 0,
+                p50_latency=self._latency.quantile(0.5),
+                p99_latency=self._latency.quantile(0.99)
+            )
+
+    def latency(self) -> Tuple[QuantileSketch, RunningStat]:
+        """Copies of the request latency sketch and running stat, for histogram export"""
+        sketch, stat = QuantileSketch(self._latency.relative_accuracy), RunningStat()
+        with self._lock:
+            sketch.merge(self._latency)
+            stat.merge(self._latency_stat)
+        return sketch, stat
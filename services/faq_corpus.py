@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.faq_index import FAQIndex
+from services.faq_vectors import FAQVectorIndex, MIN_SIMILARITY
+
+RETRIEVAL_MODES = ("keyword", "vector", "hybrid")
+
+
+class FAQCorpus:
+    """Snapshot of the loaded FAQ sources and their search indexes.
+
+    A corpus is never modified once built; apply() returns a new corpus so
+    readers holding the old one keep a consistent view.
+    """
+
+    def __init__(self, sources: Dict[str, List[Dict]], vector_cache_dir: Optional[str] = "data",
+                 faq_index: Optional[FAQIndex] = None,
+                 entries: Optional[Dict[Tuple[str, str], Tuple[str, int]]] = None):
+        self.sources = sources
+        self.all_faqs = [faq for faqs in sources.values() for faq in faqs]
+        self.vector_cache_dir = vector_cache_dir
+
+        if faq_index is None:
+            faq_index = FAQIndex(self.all_faqs)
+            entries = {}
+            slot = 0
+            for path, faqs in sources.items():
+                for key, faq in self._keyed(faqs).items():
+                    entries[(path, key)] = (self.faq_hash(faq), slot)
+                    slot += 1
+        self.faq_index = faq_index
+        # (source path, faq key) -> (content hash, index slot)
+        self._entries = entries
+
+        self._vector_index = None
+        self._vector_lock = threading.Lock()
+
+    @staticmethod
+    def faq_hash(faq: Dict) -> str:
+        """Content hash of a single FAQ"""
+        return hashlib.sha1(json.dumps(faq, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _keyed(faqs: List[Dict]) -> Dict[str, Dict]:
+        """Stable key per FAQ: its id, else its question, de-duplicated by position"""
+        keyed = {}
+        for faq in faqs:
+            base = str(faq.get('id', faq.get('question', '')))
+            key = base
+            n = 1
+            while key in keyed:
+                n += 1
+                key = f"{base}#{n}"
+            keyed[key] = faq
+        return keyed
+
+    def get_vector_index(self) -> FAQVectorIndex:
+        """Vector index over this corpus, loaded from disk unless the FAQs changed.
+
+        Unlike the keyword index this is not patched by apply(): idf and
+        every row's normalization depend on the whole corpus, so a changed
+        corpus rebuilds the matrix (lazily, on the first vector or hybrid
+        search).
+        """
+        if self._vector_index is None:
+            with self._vector_lock:
+                if self._vector_index is None:
+                    self._vector_index = FAQVectorIndex(self.all_faqs, cache_dir=self.vector_cache_dir)
+        return self._vector_index
+
+    def search(self, query: str, top_k: int = 3, mode: str = "keyword", hybrid_alpha: float = 0.5) -> List[Dict]:
+        """Search with the keyword (BM25), vector (TF-IDF) or hybrid ranker"""
+        if mode == "keyword":
+            return [faq for score, faq in self.faq_index.search(query, top_k)]
+        if mode == "vector":
+            return [faq for score, faq in self.get_vector_index().search(query, top_k)]
+        if mode == "hybrid":
+            return self._hybrid_search(query, top_k, hybrid_alpha)
+        raise ValueError(f"mode must be one of {RETRIEVAL_MODES}, got {mode!r}")
+    
+    def _hybrid_search(self, query: str, top_k: int, alpha: float) -> List[Dict]:
+        """Fuse max-normalized BM25 and cosine scores"""
+        vector_index = self.get_vector_index()
+        vector_scores = vector_index.scores(query)
+        if len(vector_scores) == 0 or top_k <= 0:
+            return []
+        
+        vector_scores = np.where(vector_scores > MIN_SIMILARITY, vector_scores, 0)
+        fused = alpha * vector_scores / max(float(vector_scores.max()), 1e-9)
+        keyword_hits = self.faq_index.search(query, top_k * 5)
+        if keyword_hits:
+            best_keyword = keyword_hits[0][0]
+            for score, faq in keyword_hits:
+                row = vector_index.rows.get(id(faq))
+                if row is not None:
+                    fused[row] += (1 - alpha) * score / best_keyword
+        
+        k = min(top_k, len(fused))
+        ranked = np.argpartition(-fused, k - 1)[:k]
+        ranked = ranked[np.argsort(-fused[ranked], kind='stable')]
+        return [vector_index.faqs[row] for row in ranked if fused[row] > 0]
+
+    def apply(self, path: str, faqs: List[Dict]) -> Tuple['FAQCorpus', Dict]:
+        """Return a new corpus with one source replaced, re-indexing only the FAQs that differ"""
+        old = {key: entry for (p, key), entry in self._entries.items() if p == path}
+        old_faqs = self._keyed(self.sources.get(path, []))
+        new_faqs = self._keyed(faqs)
+
+        index = self.faq_index.copy()
+        entries = dict(self._entries)
+        changes = {'added': 0, 'changed': 0, 'removed': 0}
+
+        for key in old.keys() - new_faqs.keys():
+            index.remove(old[key][1], refresh=False)
+            del entries[(path, key)]
+            changes['removed'] += 1
+
+        merged = []
+        for key, faq in new_faqs.items():
+            digest = self.faq_hash(faq)
+            if key in old and old[key][0] == digest:
+                # Unchanged: keep the object the index already points at
+                merged.append(old_faqs[key])
+                continue
+            if key in old:
+                index.remove(old[key][1], refresh=False)
+                changes['changed'] += 1
+            else:
+                changes['added'] += 1
+            entries[(path, key)] = (digest, index.add(faq, refresh=False))
+            merged.append(faq)
+        if any(changes.values()):
+            # Rescore once for the new average lengths, so results match a fresh build
+            index.refresh()
+
+        sources = dict(self.sources)
+        sources[path] = merged
+        return FAQCorpus(sources, self.vector_cache_dir, index, entries), changes
@@ -0,0 +1,326 @@
+import heapq
+import math
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.text_processor import TextProcessor
+
+# Relative importance of each FAQ field, same weights the original
+# keyword scorer used (keywords 2, question 1, answer 0.5)
+FIELD_WEIGHTS = {
+    'keywords': 2.0,
+    'question': 1.0,
+    'answer': 0.5
+}
+
+# Above this many candidates top-k selection switches from a heap to argpartition
+HEAP_SELECT_LIMIT = 64
+
+# Queries touching more postings than this first try the highest-impact
+# PRUNED_DEPTH postings of each term and only fall back to a full scan when
+# the pruned result cannot be proven exact
+FULL_SCAN_LIMIT = 4096
+PRUNED_DEPTH = 256
+# Pruning costs about len(terms)**2 * PRUNED_DEPTH lookups and often fails on
+# long queries, while a full scan is linear in the postings touched; prune only
+# when the postings outnumber that by this factor
+PRUNE_COST_RATIO = 4
+
+# Postings scored per batch during build, to bound temporary memory on large corpora
+BUILD_BATCH = 1 << 20
+
+# Minimum row capacity added when the field-length array grows
+LENGTHS_CHUNK = 1024
+
+
+class FAQIndex:
+    """Inverted index over FAQs with field-weighted BM25 (BM25F) scoring"""
+
+    def __init__(self, faqs: Optional[List[Dict]] = None, k1: float = 1.2, b: float = 0.75,
+                 field_weights: Optional[Dict[str, float]] = None):
+        self.k1 = k1
+        self.b = b
+        self.field_weights = dict(field_weights or FIELD_WEIGHTS)
+        self.fields = list(self.field_weights)
+        self._weights = np.array([self.field_weights[f] for f in self.fields])
+
+        self._docs: List[Optional[Dict]] = []
+        self._free_slots: List[int] = []
+        self._field_lengths = np.zeros((0, len(self.fields)))
+        self._avg_lengths = np.ones(len(self.fields))
+        self._doc_count = 0
+
+        # token -> (slots in ascending order, per-field term frequencies,
+        #           BM25 impact without idf, posting positions by descending impact)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+        if faqs:
+            self.build(faqs)
+
+    def __len__(self) -> int:
+        return self._doc_count
+
+    def _field_terms(self, faq: Dict) -> List[Counter]:
+        """Term frequencies for each indexed field of a FAQ"""
+        terms = []
+        for field in self.fields:
+            value = faq.get(field) or ''
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            terms.append(Counter(TextProcessor.tokenize(value)))
+        return terms
+
+    def _token_tfs(self, faq: Dict) -> Tuple[List[int], Dict[str, List[int]]]:
+        """Field lengths of a FAQ and, per token, its term frequency in each field"""
+        terms = self._field_terms(faq)
+        per_token: Dict[str, List[int]] = {}
+        for i, field_terms in enumerate(terms):
+            for token, tf in field_terms.items():
+                per_token.setdefault(token, [0] * len(self.fields))[i] = tf
+        return [sum(t.values()) for t in terms], per_token
+
+    def _impacts(self, slots: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        """BM25F saturation for a posting list, idf is applied at query time"""
+        norms = 1 - self.b + self.b * self._field_lengths[slots] / self._avg_lengths
+        weighted_tf = (tfs / norms) @ self._weights
+        return (weighted_tf * (self.k1 + 1) / (self.k1 + weighted_tf)).astype(np.float32)
+
+    def _posting(self, slots: np.ndarray, tfs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        impacts = self._impacts(slots, tfs)
+        return slots, tfs, impacts, np.argsort(-impacts, kind='stable')
+
+    def build(self, faqs: List[Dict]):
+        """(Re)build the whole index from a list of FAQs"""
+        self._docs = list(faqs)
+        self._free_slots = []
+        self._doc_count = len(self._docs)
+        self._field_lengths = np.zeros((self._doc_count, len(self.fields)))
+
+        # Postings are collected as flat columns (one row per token and FAQ) and
+        # split per token at the end; per-posting Python lists cost several times
+        # more memory than the finished index on large corpora
+        token_ids: Dict[str, int] = {}
+        token_column, slot_column, tf_column = array('i'), array('i'), array('f')
+        for slot, faq in enumerate(self._docs):
+            self._field_lengths[slot], per_token = self._token_tfs(faq)
+            for token, tf_row in per_token.items():
+                token_column.append(token_ids.setdefault(token, len(token_ids)))
+                slot_column.append(slot)
+                tf_column.extend(tf_row)
+
+        self._refresh_avg_lengths()
+        self._postings = {}
+        if not token_ids:
+            return
+
+        # Stable sort by token keeps each posting's slots ascending
+        tokens = np.frombuffer(token_column, dtype=np.intc)
+        order = np.argsort(tokens, kind='stable')
+        tokens = tokens[order]
+        slots = np.frombuffer(slot_column, dtype=np.intc)[order].astype(np.int32)
+        tfs = np.frombuffer(tf_column, dtype=np.float32).reshape(-1, len(self.fields))[order]
+        del order, token_column, slot_column, tf_column
+
+        self._set_postings(list(token_ids), tokens, slots, tfs)
+
+    def _set_postings(self, token_list: List[str], token_ids: np.ndarray, slots: np.ndarray, tfs: np.ndarray):
+        """Score flat posting columns (sorted by token id, then slot) and split them per token"""
+        impacts = np.empty(len(slots), dtype=np.float32)
+        for start in range(0, len(slots), BUILD_BATCH):
+            end = start + BUILD_BATCH
+            impacts[start:end] = self._impacts(slots[start:end], tfs[start:end])
+        bounds = np.searchsorted(token_ids, np.arange(len(token_list) + 1))
+        # Positions within each posting by descending impact, ties in slot order
+        by_impact = np.lexsort((-impacts, token_ids)) - np.repeat(bounds[:-1], np.diff(bounds))
+
+        for token_id, token in enumerate(token_list):
+            lo, hi = bounds[token_id], bounds[token_id + 1]
+            self._postings[token] = (slots[lo:hi], tfs[lo:hi], impacts[lo:hi], by_impact[lo:hi])
+
+    def _refresh_avg_lengths(self):
+        # Free slots and spare capacity hold zero lengths, so the column sums cover live FAQs only
+        if self._doc_count:
+            avg = self._field_lengths.sum(axis=0) / self._doc_count
+            self._avg_lengths = np.where(avg > 0, avg, 1.0)
+
+    def refresh(self):
+        """Recompute average field lengths and every posting's impact after add()/remove() calls.
+
+        Impacts depend on the corpus-wide average lengths, so after any
+        change they must all be rescored for results (and the pruning
+        bounds) to match a fresh build. This reuses the stored term
+        frequencies, so it costs a fraction of build().
+        """
+        self._refresh_avg_lengths()
+        if not self._postings:
+            return
+        token_list = list(self._postings)
+        postings = [self._postings[token] for token in token_list]
+        lengths = np.array([len(posting[0]) for posting in postings])
+        token_ids = np.repeat(np.arange(len(token_list)), lengths)
+        slots = np.concatenate([posting[0] for posting in postings])
+        tfs = np.concatenate([posting[1] for posting in postings])
+        # A new dict, so a copy() taken before the refresh keeps its own postings
+        self._postings = {}
+        self._set_postings(token_list, token_ids, slots, tfs)
+
+    def add(self, faq: Dict, refresh: bool = True) -> int:
+        """Index a single FAQ and return its slot.
+
+        With refresh=False the other postings keep impacts computed for the
+        old average lengths until refresh() is called; use it for batches.
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._docs[slot] = faq
+        else:
+            slot = len(self._docs)
+            self._docs.append(faq)
+            if slot >= len(self._field_lengths):
+                # Grow geometrically so a run of adds stays linear
+                grown = np.zeros((max(2 * len(self._field_lengths), slot + LENGTHS_CHUNK), len(self.fields)))
+                grown[:len(self._field_lengths)] = self._field_lengths
+                self._field_lengths = grown
+        self._doc_count += 1
+
+        self._field_lengths[slot], per_token = self._token_tfs(faq)
+
+        # Arrays are replaced rather than mutated so copies made by copy() stay intact.
+        # Existing entries are not rescored here (refresh() does that), so a
+        # run of adds costs one array copy per posting rather than a sort.
+        for token, tf_row in per_token.items():
+            if token in self._postings:
+                slots, tfs, impacts, by_impact = self._postings[token]
+                pos = int(np.searchsorted(slots, slot))
+                tf_row = np.array([tf_row], dtype=np.float32)
+                impact = self._impacts(np.array([slot]), tf_row)[0]
+                rank = int(np.searchsorted(-impacts[by_impact], -impact, side='right'))
+                self._postings[token] = (
+                    np.insert(slots, pos, slot),
+                    np.insert(tfs, pos, tf_row, axis=0),
+                    np.insert(impacts, pos, impact),
+                    np.insert(by_impact + (by_impact >= pos), rank, pos)
+                )
+            else:
+                self._postings[token] = self._posting(
+                    np.array([slot], dtype=np.int32),
+                    np.array([tf_row], dtype=np.float32)
+                )
+        if refresh:
+            self.refresh()
+        return slot
+
+    def remove(self, slot: int, refresh: bool = True):
+        """Drop the FAQ stored in a slot from the index (see add() for refresh)"""
+        faq = self._docs[slot]
+        if faq is None:
+            return
+        tokens = set()
+        for field_terms in self._field_terms(faq):
+            tokens.update(field_terms)
+        for token in tokens:
+            slots, tfs, impacts, by_impact = self._postings[token]
+            if len(slots) > 1:
+                pos = int(np.searchsorted(slots, slot))
+                keep = slots != slot
+                by_impact = by_impact[by_impact != pos]
+                self._postings[token] = (slots[keep], tfs[keep], impacts[keep], by_impact - (by_impact > pos))
+            else:
+                del self._postings[token]
+        self._docs[slot] = None
+        self._field_lengths[slot] = 0
+        self._free_slots.append(slot)
+        self._doc_count -= 1
+        if refresh:
+            self.refresh()
+
+    def copy(self) -> 'FAQIndex':
+        """Cheap copy that shares posting arrays until they are replaced"""
+        clone = FAQIndex.__new__(FAQIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.field_weights = dict(self.field_weights)
+        clone._docs = list(self._docs)
+        clone._free_slots = list(self._free_slots)
+        clone._field_lengths = self._field_lengths.copy()
+        clone._postings = dict(self._postings)
+        return clone
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, Dict]]:
+        """Return up to top_k (score, faq) pairs, best match first"""
+        tokens = set(TextProcessor.tokenize(query))
+        if not tokens or self._doc_count == 0 or top_k <= 0:
+            return []
+
+        n = self._doc_count
+        terms = []
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                df = len(posting[0])
+                terms.append((math.log(1 + (n - df + 0.5) / (df + 0.5)), posting))
+        if not terms:
+            return []
+
+        touched = sum(len(posting[0]) for _, posting in terms)
+        if touched > FULL_SCAN_LIMIT and touched > PRUNE_COST_RATIO * len(terms) ** 2 * PRUNED_DEPTH:
+            result = self._pruned_scores(terms, top_k)
+            if result is not None:
+                return self._select(*result, top_k)
+        return self._select(*self._full_scores(terms), top_k)
+
+    def _full_scores(self, terms: List[Tuple[float, Tuple]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every document that contains at least one query term"""
+        if len(terms) == 1:
+            idf, (slots, _, impacts, _) = terms[0]
+            return slots, impacts * idf
+        # float64 weights spare bincount a conversion pass
+        slots = np.concatenate([posting[0] for _, posting in terms])
+        weights = np.concatenate([posting[2] * np.float64(idf) for idf, posting in terms])
+        if len(slots) * 8 < len(self._docs):
+            # Few postings: sum per distinct slot rather than over a corpus-sized array
+            candidates, inverse = np.unique(slots, return_inverse=True)
+            return candidates, np.bincount(inverse, weights=weights)
+        totals = np.bincount(slots, weights=weights)
+        # A boolean mask makes flatnonzero several times faster than on the float totals
+        candidates = np.flatnonzero(totals > 0)
+        return candidates, totals[candidates]
+
+    def _pruned_scores(self, terms: List[Tuple[float, Tuple]], top_k: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Exactly score the union of each term's top-impact postings.
+
+        Returns None when a document outside that union could still beat
+        the k-th best candidate, in which case a full scan is required.
+        """
+        candidates = np.unique(np.concatenate([
+            posting[0][posting[3][:PRUNED_DEPTH]] for _, posting in terms
+        ]))
+        scores = np.zeros(len(candidates))
+        unseen_bound = 0.0
+        for idf, (slots, _, impacts, order) in terms:
+            pos = np.minimum(np.searchsorted(slots, candidates), len(slots) - 1)
+            hit = slots[pos] == candidates
+            scores[hit] += impacts[pos[hit]] * idf
+            if len(order) > PRUNED_DEPTH:
+                unseen_bound += float(impacts[order[PRUNED_DEPTH]]) * idf
+
+        if len(candidates) < top_k:
+            return None
+        kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        if kth < unseen_bound:
+            return None
+        return candidates, scores
+
+    def _select(self, candidates: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[float, Dict]]:
+        """Top-k selection, ties broken by FAQ order"""
+        if len(candidates) <= HEAP_SELECT_LIMIT:
+            best = heapq.nlargest(top_k, range(len(candidates)), key=scores.__getitem__)
+        else:
+            k = min(top_k, len(candidates))
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            # Everything tied with the k-th score competes on FAQ order
+            part = np.flatnonzero(scores >= kth)
+            best = part[np.lexsort((candidates[part], -scores[part]))][:k]
+        return [(float(scores[i]), self._docs[candidates[i]]) for i in best]
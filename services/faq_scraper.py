@@ -1,6 +1,7 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
 import re
 
 class FAQScraper:
@@ -110,8 +111,11 @@ class FAQScraper:
     def save_to_file(self, faqs, filename="data/scraped_faqs.json"):
         """Save scraped FAQs to JSON file"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            # Write then rename so a running ChatEngine never reloads a half-written file
+            tmp_filename = f"{filename}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
                 json.dump({"faqs": faqs, "source": "mtn.ng", "scraped": True}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_filename, filename)
             return True
         except Exception as e:
             print(f"Error saving FAQs: {e}")
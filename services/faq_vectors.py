@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.faq_index import FIELD_WEIGHTS
+from utils.text_processor import TextProcessor
+
+# Cosine similarity below which a FAQ is not considered a match
+MIN_SIMILARITY = 0.1
+
+
+class FAQVectorIndex:
+    """Hashed n-gram TF-IDF vectors for FAQs, persisted as a memory-mapped .npy"""
+
+    VERSION = 1
+
+    def __init__(self, faqs: List[Dict], cache_dir: Optional[str] = "data", n_features: int = 4096,
+                 name: str = "faq_vectors"):
+        self.faqs = list(faqs)
+        # id(faq) -> row, for fusing with rankers that return FAQ objects
+        self.rows = {id(faq): row for row, faq in enumerate(self.faqs)}
+        self.n_features = n_features
+        self.corpus_hash = self.compute_hash(self.faqs, n_features)
+        self.matrix = None
+        self.idf = None
+
+        if cache_dir:
+            self.matrix_path = os.path.join(cache_dir, f"{name}.npy")
+            self.idf_path = os.path.join(cache_dir, f"{name}.idf.npy")
+            self.meta_path = os.path.join(cache_dir, f"{name}.json")
+        else:
+            self.matrix_path = self.idf_path = self.meta_path = None
+
+        if not self._load():
+            self._build()
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    @classmethod
+    def compute_hash(cls, faqs: List[Dict], n_features: int) -> str:
+        """Content hash of the corpus, used to decide when to rebuild"""
+        digest = hashlib.sha1(f"v{cls.VERSION}:{n_features}:".encode('utf-8'))
+        digest.update(json.dumps(faqs, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def faq_counts(self, faq: Dict) -> np.ndarray:
+        """Field-weighted hashed n-gram counts for one FAQ"""
+        counts = np.zeros(self.n_features, dtype=np.float32)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = faq.get(field) or ''
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            counts += weight * TextProcessor.hashed_vector(value, self.n_features)
+        return counts
+
+    def _build(self):
+        """Compute the TF-IDF matrix from scratch"""
+        counts = np.zeros((len(self.faqs), self.n_features), dtype=np.float32)
+        for row, faq in enumerate(self.faqs):
+            counts[row] = self.faq_counts(faq)
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(self.faqs)) / (1 + df)) + 1).astype(np.float32)
+        self.matrix = self._normalize(np.log1p(counts, out=counts) * self.idf)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        matrix /= norms
+        return matrix
+
+    def _load(self) -> bool:
+        """Memory-map a previously saved matrix if it matches the current corpus"""
+        if not self.meta_path or not os.path.exists(self.meta_path):
+            return False
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('corpus_hash') != self.corpus_hash:
+                return False
+            self.matrix = np.load(self.matrix_path, mmap_mode='r')
+            self.idf = np.load(self.idf_path)
+            return self.matrix.shape == (len(self.faqs), self.n_features)
+        except Exception as e:
+            print(f"Error loading FAQ vectors from {self.matrix_path}: {e}")
+            return False
+
+    def _save(self):
+        """Write the matrix atomically, then reopen it memory-mapped"""
+        if not self.meta_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.matrix_path) or '.', exist_ok=True)
+            for path, array in ((self.matrix_path, self.matrix), (self.idf_path, self.idf)):
+                tmp_path = f"{path}.tmp.npy"
+                np.save(tmp_path, array)
+                os.replace(tmp_path, path)
+            tmp_meta = f"{self.meta_path}.tmp"
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'corpus_hash': self.corpus_hash,
+                    'n_features': self.n_features,
+                    'n_faqs': len(self.faqs),
+                    'version': self.VERSION
+                }, f)
+            os.replace(tmp_meta, self.meta_path)
+            self.matrix = np.load(self.matrix_path, mmap_mode='r')
+        except Exception as e:
+            print(f"Error saving FAQ vectors to {self.matrix_path}: {e}")
+
+    def query_vector(self, query: str) -> np.ndarray:
+        """TF-IDF vector for a query in the same space as the FAQ rows"""
+        vector = np.log1p(TextProcessor.hashed_vector(query, self.n_features)) * self.idf
+        return self._normalize(vector)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query against every FAQ"""
+        if not self.faqs:
+            return np.zeros(0, dtype=np.float32)
+        return self.matrix @ self.query_vector(query)
+
+    def search(self, query: str, top_k: int = 3, min_score: float = MIN_SIMILARITY) -> List[Tuple[float, Dict]]:
+        """Return up to top_k (score, faq) pairs above min_score, best match first"""
+        scores = self.scores(query)
+        if len(scores) == 0 or top_k <= 0:
+            return []
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(float(scores[i]), self.faqs[i]) for i in best if scores[i] > min_score]
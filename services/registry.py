@@ -0,0 +1,310 @@
+import gc
+import os
+import sys
+import threading
+import time
+import types
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _Entry:
+    """One built generation of a registered resource"""
+
+    def __init__(self, value: Any, generation: int, fingerprint: Tuple, build_seconds: float):
+        self.value = value
+        self.generation = generation
+        self.fingerprint = fingerprint
+        self.build_seconds = build_seconds
+        self.refs = 0
+        self.retired = False
+
+
+class Lease:
+    """A session's hold on a shared resource; follows the newest generation on get()"""
+
+    def __init__(self, registry: 'ResourceRegistry', name: str):
+        self._registry = registry
+        self.name = name
+        self._holder = [registry._checkout(name)]
+        # Give the reference back if the session is dropped without release()
+        self._finalizer = weakref.finalize(self, registry._checkin_holder, name, self._holder)
+
+    def get(self) -> Any:
+        """Current shared object, swapping to a newer generation if one was built"""
+        entry = self._holder[0]
+        if entry is None:
+            raise RuntimeError(f"Lease on {self.name!r} was released")
+        current = self._registry._current(self.name)
+        if current is not entry:
+            self._holder[0] = self._registry._checkout(self.name)
+            self._registry._checkin(self.name, entry)
+        return self._holder[0].value
+
+    def release(self):
+        """Give the reference back to the registry"""
+        self._finalizer()
+
+
+class ResourceRegistry:
+    """Thread-safe, process-wide cache of heavy shared objects.
+
+    Each resource is built once and handed out as a shared read-only
+    reference. When one of its watched files changes, the next lookup either
+    refreshes the object in place (if a refresh hook was registered) or
+    builds a new generation; the old generation is dropped once the last
+    lease on it is released.
+
+    The registry lock only guards bookkeeping. Builds and refreshes run
+    outside it under a per-resource guard, so a slow FAQ reload doesn't
+    stall lookups of other resources, and readers of the same resource keep
+    getting the current generation while it is refreshed.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Tuple[Callable[[], Any], List[str], Optional[Callable[[Any], Any]]]] = {}
+        self._current_entries: Dict[str, _Entry] = {}
+        self._retired: Dict[str, List[_Entry]] = {}
+        self._last_check: Dict[str, float] = {}
+        self._generations: Dict[str, int] = {}
+        # name -> lock held while that resource is built, checked or refreshed
+        self._guards: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], watch_files: Optional[List[str]] = None,
+                 refresh: Optional[Callable[[Any], Any]] = None):
+        """Register how to build a resource and which files invalidate it.
+
+        refresh, if given, updates the object in place when a watched file
+        changes and returns whether it applied the change; until it does,
+        the files are treated as changed and the refresh is retried.
+        """
+        with self._lock:
+            self._factories[name] = (factory, list(watch_files or []), refresh)
+
+    @staticmethod
+    def _fingerprint(paths: List[str]) -> Tuple:
+        state = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                state.append((path, None, None))
+        return tuple(state)
+
+    def _build(self, name: str) -> _Entry:
+        """Run the factory; called without the registry lock, under the resource's guard"""
+        factory, watch_files, _ = self._factories[name]
+        fingerprint = self._fingerprint(watch_files)
+        start = time.perf_counter()
+        value = factory()
+        return _Entry(value, 0, fingerprint, time.perf_counter() - start)
+
+    def _guard(self, name: str) -> threading.Lock:
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown resource: {name}")
+            return self._guards.setdefault(name, threading.Lock())
+
+    def _current(self, name: str) -> _Entry:
+        """Newest generation of a resource, building or refreshing it if needed"""
+        # Decide under the registry lock ...
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown resource: {name}")
+            entry = self._current_entries.get(name)
+            if entry is not None:
+                now = time.monotonic()
+                if now - self._last_check.get(name, 0) < self.check_interval:
+                    return entry
+                # Other callers keep getting this entry while we check it
+                self._last_check[name] = now
+            guard = self._guards.setdefault(name, threading.Lock())
+
+        # ... then build or refresh outside it, one thread per resource
+        if entry is None:
+            with guard:
+                with self._lock:
+                    entry = self._current_entries.get(name)
+                if entry is None:
+                    # Not built by a thread we waited on
+                    entry = self._build(name)
+                    with self._lock:
+                        self._install(name, entry)
+                return entry
+
+        if not guard.acquire(blocking=False):
+            # Another thread is already checking or refreshing this resource
+            return entry
+        try:
+            with self._lock:
+                # invalidate() may have installed a newer generation meanwhile
+                entry = self._current_entries[name]
+            _, watch_files, refresh = self._factories[name]
+            fingerprint = self._fingerprint(watch_files)
+            if fingerprint == entry.fingerprint:
+                return entry
+            if refresh is not None:
+                if refresh(entry.value):
+                    with self._lock:
+                        entry.fingerprint = fingerprint
+                        entry.generation = self._generations[name] = self._generations[name] + 1
+                return entry
+            entry = self._build(name)
+            with self._lock:
+                self._install(name, entry)
+            return entry
+        finally:
+            guard.release()
+
+    def _install(self, name: str, entry: _Entry):
+        """Make a built entry current and retire the previous one; caller holds the registry lock"""
+        entry.generation = self._generations[name] = self._generations.get(name, 0) + 1
+        old = self._current_entries.get(name)
+        self._current_entries[name] = entry
+        self._last_check[name] = time.monotonic()
+        if old is not None:
+            old.retired = True
+            if old.refs > 0:
+                self._retired.setdefault(name, []).append(old)
+
+    def _checkout(self, name: str) -> _Entry:
+        while True:
+            entry = self._current(name)
+            with self._lock:
+                # A generation replaced since _current() returned is retried rather than leased
+                if not entry.retired:
+                    entry.refs += 1
+                    return entry
+
+    def _checkin(self, name: str, entry: _Entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.retired and entry.refs <= 0:
+                retired = self._retired.get(name, [])
+                if entry in retired:
+                    retired.remove(entry)
+
+    def _checkin_holder(self, name: str, holder: List[Optional[_Entry]]):
+        entry = holder[0]
+        if entry is not None:
+            holder[0] = None
+            self._checkin(name, entry)
+
+    def lease(self, name: str) -> Lease:
+        """Take a reference-counted hold on a shared resource"""
+        return Lease(self, name)
+
+    def get(self, name: str) -> Any:
+        """Current shared object without holding a lease"""
+        return self._current(name).value
+
+    def invalidate(self, name: str):
+        """Build a new generation now (e.g. after retraining a model), if the resource was built"""
+        with self._guard(name):
+            with self._lock:
+                if name not in self._current_entries:
+                    return
+            entry = self._build(name)
+            with self._lock:
+                self._install(name, entry)
+
+    def footprint(self) -> Dict[str, Dict]:
+        """Approximate memory held by each live generation of each resource"""
+        with self._lock:
+            report = {}
+            for name, entry in self._current_entries.items():
+                report[name] = self._describe(entry)
+                report[name]['retired_generations'] = [
+                    self._describe(old) for old in self._retired.get(name, [])
+                ]
+            return report
+
+    @staticmethod
+    def _describe(entry: _Entry) -> Dict:
+        return {
+            'generation': entry.generation,
+            'refs': entry.refs,
+            'bytes': deep_sizeof(entry.value),
+            'build_seconds': entry.build_seconds
+        }
+
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, weakref.ReferenceType)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Recursive sys.getsizeof over everything reachable from obj (modules, classes and functions excluded)"""
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        stack.extend(gc.get_referents(current))
+    return total
+
+
+def _build_chat_engine():
+    from services.chat_engine import ChatEngine
+    return ChatEngine(cache_db='data/response_cache.db')
+
+
+def _build_churn_predictor():
+    from models.churn_model import ChurnPredictor
+    predictor = ChurnPredictor()
+    predictor.load_model()
+    return predictor
+
+
+def _build_churn_scoring():
+    from services.churn_scoring import ChurnScoringService
+    # Follows retrains: each batch asks the registry for the current predictor
+    return ChurnScoringService(lambda: registry.get('churn_predictor'))
+
+
+def _build_metrics_store():
+    from utils.metrics_store import MetricsStore
+    return MetricsStore('data/metrics.db')
+
+
+def _build_metrics_aggregator():
+    from utils.metrics import MetricsAggregator
+    aggregator = MetricsAggregator(snapshot_dir='data/metrics_snapshots')
+    aggregator.start_publisher()
+    return aggregator
+
+
+def _build_metrics_exporter():
+    from utils.metrics_exporter import MetricsExporter
+    exporter = MetricsExporter(registry.get('metrics_aggregator'),
+                               chat_engine=lambda: registry.get('chat_engine'),
+                               churn_predictor=lambda: registry.get('churn_predictor'),
+                               churn_scoring=lambda: registry.get('churn_scoring'))
+    exporter.start(port=int(os.getenv('METRICS_PORT', '9464')))
+    return exporter
+
+
+registry = ResourceRegistry()
+registry.register(
+    'chat_engine', _build_chat_engine,
+    watch_files=['data/faqs.json', 'data/scraped_faqs.json'],
+    refresh=lambda engine: engine.reload_faqs()['skipped'] == 0
+)
+registry.register(
+    'churn_predictor', _build_churn_predictor,
+    watch_files=['models/churn_model.bundle', 'models/churn_model.pkl', 'models/scaler.pkl']
+)
+registry.register('churn_scoring', _build_churn_scoring)
+registry.register('metrics_store', _build_metrics_store)
+registry.register('metrics_aggregator', _build_metrics_aggregator)
+registry.register('metrics_exporter', _build_metrics_exporter)
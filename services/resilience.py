@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors, overload
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for rate limits and transient errors"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number attempt+1, or None if waiting isn't worth it"""
+        if retry_after is not None:
+            # The server said how long to back off; beyond max_delay another provider is a better bet
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Rate limits, timeouts, dropped connections and 5xx responses"""
+        status = getattr(error, 'status_code', None)
+        if status is not None:
+            return status in RETRYABLE_STATUS
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        name = type(error).__name__
+        message = str(error).lower()
+        return ('Timeout' in name or 'Connection' in name or 'rate_limit' in message
+                or '429' in message or 'overloaded' in message)
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """Retry-After header of a provider error, if it sent one"""
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures.
+
+    After failure_threshold consecutive failures the breaker opens and
+    rejects calls for reset_timeout seconds. It then lets a single probe
+    through (half-open): success closes it again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if now - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN:
+                # One probe at a time; a probe that never reported back is given up on
+                if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                    self._probe_started = now
+                    return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self._failures += 1
+            state = self._state(now)
+            if state == self.HALF_OPEN or (state == self.CLOSED and self._failures >= self.failure_threshold):
+                if state == self.CLOSED:
+                    self.trips += 1
+                self._opened_at = now
+                self._probe_started = None
+
+
+class ProviderStats:
+    """Call counts, errors and recent latencies for one provider"""
+
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.failovers = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, error: bool = False):
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            self._latencies.append(latency)
+
+    def summary(self) -> Dict:
+        """Error rate and latency percentiles over the recent window"""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            summary = {
+                'calls': self.calls,
+                'errors': self.errors,
+                'error_rate': self.errors / self.calls if self.calls else 0,
+                'retries': self.retries,
+                'failovers': self.failovers
+            }
+        for q in (50, 95, 99):
+            summary[f'p{q}_latency'] = float(np.percentile(latencies, q)) if len(latencies) else 0
+        return summary
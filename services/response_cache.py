@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.text_processor import TextProcessor
+
+# set() overwrites a live entry in the same scope at least this similar (and
+# passing the word check) instead of taking a second row for the same message
+DUPLICATE_SIMILARITY = 0.98
+
+
+class ResponseCache:
+    """Bounded LRU cache with a TTL for generated replies, optionally backed by SQLite.
+
+    Keys combine the normalized message, the detected intent and a hash of
+    the FAQ context sent to the model, so editing a FAQ changes the key and
+    stale answers simply stop being hit.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        self._disk_writes = 0
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS response_cache_created ON response_cache (created)")
+                self._db.execute("DELETE FROM response_cache WHERE created < ?", (time.time() - ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error opening response cache {db_path}: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(message: str, intent: Optional[str], faq_context: str) -> str:
+        """Cache key from the normalized message, intent and retrieved FAQ context"""
+        normalized = " ".join(TextProcessor.tokenize(message, drop_stop_words=False))
+        context_hash = hashlib.sha1(faq_context.encode('utf-8')).hexdigest()
+        return hashlib.sha1(f"{normalized}\x00{intent}\x00{context_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached value for a key, or None on a miss or expiry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self._stats['disk_hits'] += 1
+                    return value
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key: str, value: Dict):
+        """Store a value in memory and, if configured, on disk"""
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, value, created) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), now)
+                    )
+                    self._disk_writes += 1
+                    if self._disk_writes % 256 == 0:
+                        # Trim the disk tier now and then rather than on every write
+                        self._db.execute("DELETE FROM response_cache WHERE created < ?", (now - self.ttl,))
+                        self._db.execute(
+                            "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache "
+                            "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+                        )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing response cache: {e}")
+
+    def _store(self, key: str, value: Dict, created: float):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every cached entry, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0
+        return stats
+
+
+class SemanticCache:
+    """Near-duplicate reply cache over hashed character n-gram vectors.
+
+    Vectors live in one preallocated float32 matrix so a lookup is a single
+    matrix-vector product; eviction picks the least recently used row.
+    Entries only match within the same scope (e.g. intent plus best FAQ), and
+    the best candidate must also pass a word-level check so that messages
+    like "activate roaming" and "deactivate roaming" are not merged.
+    """
+
+    def __init__(self, capacity: int = 512, threshold: float = 0.7, ttl: float = 3600,
+                 n_features: int = 1024):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.n_features = n_features
+        self._vectors = np.zeros((capacity, n_features), dtype=np.float32)
+        self._scopes = np.zeros(capacity, dtype=np.int64)
+        self._created = np.full(capacity, -np.inf)
+        self._last_used = np.full(capacity, -np.inf)
+        self._values: List[Optional[Dict]] = [None] * capacity
+        self._words: List[Optional[List[str]]] = [None] * capacity
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0}
+
+    def _vector(self, message: str) -> np.ndarray:
+        vector = TextProcessor.hashed_vector(message, self.n_features)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        return int.from_bytes(hashlib.sha1(scope.encode('utf-8')).digest()[:8], 'little', signed=True)
+
+    @staticmethod
+    def _same_words(a: List[str], b: List[str]) -> bool:
+        """Every longer word in one message has a counterpart sharing its stem in the other"""
+        def covered(word, others):
+            return any(len(os.path.commonprefix([word, o])) >= min(4, len(word), len(o)) for o in others)
+        return (all(len(w) <= 3 or covered(w, b) for w in a) and
+                all(len(w) <= 3 or covered(w, a) for w in b))
+
+    def get(self, message: str, scope: str) -> Optional[Dict]:
+        """Reply cached for a near-duplicate message in the same scope"""
+        vector = self._vector(message)
+        now = time.time()
+        with self._lock:
+            similarity = self._vectors @ vector
+            live = (self._scopes == self._scope_id(scope)) & (now - self._created <= self.ttl)
+            similarity[~live] = -1
+            row = int(np.argmax(similarity))
+            if similarity[row] < self.threshold:
+                self._stats['misses'] += 1
+                return None
+            if not self._same_words(TextProcessor.tokenize(message), self._words[row]):
+                self._stats['rejected'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._last_used[row] = now
+            self._stats['hits'] += 1
+            return self._values[row]
+
+    def set(self, message: str, scope: str, value: Dict):
+        """Remember a reply, evicting the least recently used entry when full.
+
+        Re-caching the same (or a near-identical) message in the same scope
+        updates its existing row, so concurrent misses on one message don't
+        fill the cache with copies.
+        """
+        vector = self._vector(message)
+        words = TextProcessor.tokenize(message)
+        scope_id = self._scope_id(scope)
+        now = time.time()
+        with self._lock:
+            expired = now - self._created > self.ttl
+            similarity = self._vectors @ vector
+            similarity[(self._scopes != scope_id) | expired] = -1
+            row = int(np.argmax(similarity))
+            if similarity[row] < DUPLICATE_SIMILARITY or not self._same_words(words, self._words[row]):
+                if expired.any():
+                    row = int(np.argmax(expired))
+                else:
+                    row = int(np.argmin(self._last_used))
+                    self._stats['evictions'] += 1
+            self._vectors[row] = vector
+            self._scopes[row] = scope_id
+            self._created[row] = now
+            self._last_used[row] = now
+            self._values[row] = value
+            self._words[row] = words
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._created[:] = -np.inf
+            self._last_used[:] = -np.inf
+            self._values = [None] * self.capacity
+            self._words = [None] * self.capacity
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = int(np.count_nonzero(time.time() - self._created <= self.ttl))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0
+        return stats
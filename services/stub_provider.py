@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Words that point the stub at an intent, checked in order
+INTENT_KEYWORDS = [
+    ('roaming_inquiry', ['roam', 'abroad', 'travel', 'international']),
+    ('porting_request', ['port', 'switch', 'transfer', 'migrate my line']),
+    ('security_issue', ['stolen', 'lost', 'block', 'fraud', 'hack', 'puk']),
+    ('recharge_issue', ['recharge', 'airtime', 'top up', 'credit', 'load']),
+    ('network_complaint', ['network', 'signal', 'connection', 'slow', 'drop']),
+    ('tariff_inquiry', ['tariff', 'rate', 'pulse', 'per second']),
+    ('data_inquiry', ['data', 'bundle', 'gb', 'mb', 'plan', 'internet'])
+]
+
+
+class StubAPIError(Exception):
+    """Provider-style error carrying an HTTP status (and headers, like the SDK errors)"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        headers = {'retry-after': str(retry_after)} if retry_after is not None else {}
+        self.response = types.SimpleNamespace(headers=headers)
+
+
+class StubTimeoutError(TimeoutError):
+    """The stub 'hung' for timeout_seconds"""
+
+
+class StubLLM:
+    """Deterministic stand-in for a chat completion model.
+
+    Replies depend only on the prompt: intent prompts get intent JSON,
+    single-pass prompts get intent plus reply, anything else gets an answer
+    built from the FAQ context. Latency is first-token delay (log-normal
+    around latency_ms) plus output tokens at tokens_per_second; a fraction of
+    calls fail with 429s or hang until timeout_seconds. The random stream is
+    seeded, so a single-threaded run is reproducible.
+    """
+
+    def __init__(self, latency_ms: float = 300, latency_sigma: float = 0.3, tokens_per_second: float = 50,
+                 error_rate: float = 0.0, timeout_rate: float = 0.0, timeout_seconds: float = 5.0,
+                 retry_after: Optional[float] = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.retry_after = retry_after
+        self.seed = seed
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'StubLLM':
+        """Configure from STUB_* environment variables"""
+        def number(name, default):
+            value = os.getenv(name)
+            return float(value) if value not in (None, '') else default
+        retry_after = os.getenv('STUB_RETRY_AFTER')
+        return cls(
+            latency_ms=number('STUB_LATENCY_MS', 300),
+            latency_sigma=number('STUB_LATENCY_SIGMA', 0.3),
+            tokens_per_second=number('STUB_TOKENS_PER_SECOND', 50),
+            error_rate=number('STUB_ERROR_RATE', 0.0),
+            timeout_rate=number('STUB_TIMEOUT_RATE', 0.0),
+            timeout_seconds=number('STUB_TIMEOUT_SECONDS', 5.0),
+            retry_after=float(retry_after) if retry_after else None,
+            seed=int(number('STUB_SEED', 0))
+        )
+
+    # Content
+
+    @staticmethod
+    def _pick_intent(message: str, intents: List[str]) -> Tuple[str, float]:
+        lowered = message.lower()
+        for intent, words in INTENT_KEYWORDS:
+            if intent in intents and any(word in lowered for word in words):
+                return intent, 0.92
+        if 'general_inquiry' in intents:
+            return 'general_inquiry', 0.7
+        # Unknown label set: stable choice from the message hash
+        digest = int(hashlib.sha1(lowered.encode('utf-8')).hexdigest(), 16)
+        return intents[digest % len(intents)], 0.6
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        match = re.search(r"^Answer: (.+)$", prompt, re.MULTILINE)
+        if match:
+            return f"Thanks for reaching out! {match.group(1).strip()} If you need more help, dial 180."
+        return ("Thanks for reaching out! I don't have the exact details for that, but our team can help - "
+                "please dial 180 or visit any MTN service center.")
+
+    def reply(self, messages: List[Dict]) -> str:
+        """Deterministic reply to a chat completion request"""
+        prompt = messages[-1]['content'] if messages else ''
+        intents_match = re.search(r"one of these intents: ([^\n]+)", prompt)
+        message_match = re.search(r'Customer message: "?(.+?)"?$', prompt, re.MULTILINE)
+        message = message_match.group(1) if message_match else prompt
+        if intents_match:
+            intents = [intent.strip() for intent in intents_match.group(1).split(',') if intent.strip()]
+            intent, confidence = self._pick_intent(message, intents)
+            if '"response"' in prompt:
+                return json.dumps({"intent": intent, "confidence": confidence, "response": self._answer(prompt)})
+            return json.dumps({"intent": intent, "confidence": confidence, "entities": {}})
+        if prompt.startswith("Summarize"):
+            return "Customer contacted MTN support and received guidance on their request."
+        return self._answer(prompt)
+
+    # Timing and failures
+
+    def plan(self, messages: List[Dict], max_tokens: int = 500) -> Tuple[List[str], float, float, Optional[str]]:
+        """(chunks, first-token delay, per-chunk delay, failure) for one request.
+
+        failure is None, '429' or 'timeout'.
+        """
+        text = self.reply(messages)
+        chunks = re.findall(r"\S+\s*", text)[:max_tokens] or [text]
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            first_token = self.latency_ms / 1000 * self._random.lognormvariate(0, self.latency_sigma)
+        failure = None
+        if roll < self.error_rate:
+            failure = '429'
+        elif roll < self.error_rate + self.timeout_rate:
+            failure = 'timeout'
+        per_chunk = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        return chunks, first_token, per_chunk, failure
+
+    def _error(self, failure: str) -> Exception:
+        if failure == '429':
+            return StubAPIError(429, "rate_limit_exceeded (stub)", self.retry_after)
+        return StubTimeoutError(f"Stub request timed out after {self.timeout_seconds}s")
+
+
+def _completion(text: str) -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(role='assistant', content=text),
+                                       finish_reason='stop')],
+        usage=types.SimpleNamespace(completion_tokens=len(text.split()))
+    )
+
+
+def _chunk(text: str) -> types.SimpleNamespace:
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text))])
+
+
+class StubClient:
+    """In-process client with the openai.OpenAI interface (chat.completions.create)"""
+
+    def __init__(self, llm: Optional[StubLLM] = None):
+        self.llm = llm or StubLLM.from_env()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, messages: List[Dict], max_tokens: int = 500, stream: bool = False,
+                timeout: Optional[float] = None, **kwargs):
+        chunks, first_token, per_chunk, failure = self.llm.plan(messages, max_tokens)
+        if failure == 'timeout':
+            # Like the SDKs, a per-request timeout gives up on a hung call early
+            time.sleep(min(self.llm.timeout_seconds, timeout or self.llm.timeout_seconds))
+            raise self.llm._error(failure)
+        time.sleep(first_token)
+        if failure:
+            raise self.llm._error(failure)
+        if stream:
+            return self._stream(chunks, per_chunk)
+        time.sleep(per_chunk * len(chunks))
+        return _completion("".join(chunks))
+
+    @staticmethod
+    def _stream(chunks: List[str], per_chunk: float) -> Iterator[types.SimpleNamespace]:
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(per_chunk)
+            yield _chunk(text)
+
+
+class AsyncStubClient:
+    """In-process client with the openai.AsyncOpenAI interface"""
+
+    def __init__(self, llm: Optional[StubLLM] = None):
+        self.llm = llm or StubLLM.from_env()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    async def _create(self, messages: List[Dict], max_tokens: int = 500, **kwargs):
+        chunks, first_token, per_chunk, failure = self.llm.plan(messages, max_tokens)
+        if failure == 'timeout':
+            await asyncio.sleep(self.llm.timeout_seconds)
+            raise self.llm._error(failure)
+        await asyncio.sleep(first_token)
+        if failure:
+            raise self.llm._error(failure)
+        await asyncio.sleep(per_chunk * len(chunks))
+        return _completion("".join(chunks))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions in the OpenAI wire format, including SSE streaming"""
+
+    llm: StubLLM = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        chunks, first_token, per_chunk, failure = self.llm.plan(request.get('messages', []),
+                                                                request.get('max_tokens', 500))
+        if failure == 'timeout':
+            time.sleep(self.llm.timeout_seconds)
+            self._json(504, {'error': {'message': 'Stub request timed out', 'type': 'timeout'}})
+            return
+        time.sleep(first_token)
+        if failure:
+            headers = {'retry-after': str(self.llm.retry_after)} if self.llm.retry_after is not None else {}
+            self._json(429, {'error': {'message': 'Rate limit reached (stub)', 'type': 'rate_limit_exceeded',
+                                       'code': 'rate_limit_exceeded'}}, headers)
+            return
+
+        base = {'id': f"stub-{self.llm.calls}", 'created': int(time.time()), 'model': request.get('model', 'stub')}
+        if request.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i, text in enumerate(chunks):
+                if i:
+                    time.sleep(per_chunk)
+                event = dict(base, object='chat.completion.chunk',
+                             choices=[{'index': 0, 'delta': {'content': text}, 'finish_reason': None}])
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        time.sleep(per_chunk * len(chunks))
+        text = "".join(chunks)
+        self._json(200, dict(base, object='chat.completion', choices=[
+            {'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}
+        ], usage={'prompt_tokens': 0, 'completion_tokens': len(chunks), 'total_tokens': len(chunks)}))
+
+
+def serve(host: str = '127.0.0.1', port: int = 8089, llm: Optional[StubLLM] = None) -> ThreadingHTTPServer:
+    """Start the HTTP stand-in on a background thread and return the server"""
+    handler = type('StubHandler', (_StubHandler,), {'llm': llm or StubLLM.from_env()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub LLM server (configured by STUB_* env vars)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    args = parser.parse_args()
+    server = serve(args.host, args.port)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1 - "
+          f"point OPENAI_BASE_URL there and use any OPENAI_API_KEY starting with sk-")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.churn_scoring_benchmark import synthesize_customers
+from models.churn_model import ChurnPredictor
+
+
+@pytest.fixture(scope='session')
+def faqs():
+    """The FAQs shipped in data/faqs.json"""
+    with open(os.path.join(ROOT, 'data', 'faqs.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)['faqs']
+
+
+@pytest.fixture
+def faq_file(tmp_path):
+    """A writable copy of data/faqs.json"""
+    path = str(tmp_path / 'faqs.json')
+    shutil.copy(os.path.join(ROOT, 'data', 'faqs.json'), path)
+    return path
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """The local stub provider with no simulated latency"""
+    monkeypatch.setenv('STUB_LATENCY_MS', '0')
+    monkeypatch.setenv('STUB_TOKENS_PER_SECOND', '0')
+
+
+@pytest.fixture(scope='session')
+def customers():
+    """Synthetic customers with every model input"""
+    return synthesize_customers(3000, seed=1)
+
+
+@pytest.fixture(scope='session')
+def churn_predictor(tmp_path_factory, customers):
+    """A small churn model fitted on synthetic customers, saved nowhere near models/"""
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    directory = tmp_path_factory.mktemp('churn-model')
+    predictor = ChurnPredictor()
+    predictor.bundle_path = str(directory / 'churn_model.bundle')
+    predictor.model_path = str(directory / 'churn_model.pkl')
+    predictor.scaler_path = str(directory / 'scaler.pkl')
+    predictor.compiled_path = str(directory / 'churn_model_compiled.npz')
+
+    X = predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    churn = (customers['complaints'] * 3 - customers['tenure_months'] / 12
+             + np.random.default_rng(0).normal(0, 2, len(customers))) > 2
+    predictor.scaler.fit(X)
+    predictor.model = GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=42)
+    predictor.model.fit(predictor.scaler.transform(X), churn.to_numpy().astype(int))
+    return predictor
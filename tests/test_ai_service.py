@@ -0,0 +1,178 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+from services.ai_service import AIService, AsyncAIService
+from services.resilience import CircuitBreaker, RetryPolicy
+from services.stub_provider import StubAPIError, StubClient, StubLLM, _chunk, _completion
+
+
+class ScriptedClient:
+    """OpenAI-style client that plays back one scripted outcome per create() call.
+
+    An outcome is an exception to raise, or a list of chunks to return (an
+    exception among the chunks is raised mid-stream).
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, messages, stream=False, **kwargs):
+        self.requests.append(dict(kwargs, messages=messages, stream=stream))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if not stream:
+            return _completion("".join(outcome))
+        return self._stream(outcome)
+
+    @staticmethod
+    def _stream(chunks):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield _chunk(chunk)
+
+
+def service_with(**clients) -> AIService:
+    service = AIService(ai_provider='stub')
+    service.clients = clients
+    service.retry_policy = RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.01)
+    return service
+
+
+def test_stream_retries_before_the_first_chunk():
+    client = ScriptedClient(StubAPIError(503, "overloaded"), StubAPIError(429, "rate_limit_exceeded"),
+                            ["Dial ", "*131#"])
+    service = service_with(openai=client)
+    assert list(service.generate_response_stream("balance?")) == ["Dial ", "*131#"]
+    assert len(client.requests) == 3
+    assert service.provider_stats['openai'].retries == 2
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    down, backup = ScriptedClient(*[StubAPIError(503, "down")] * 3), ScriptedClient(["From ", "backup"])
+    service = service_with(openai=down, backup=backup)
+    assert list(service.generate_response_stream("balance?")) == ["From ", "backup"]
+    assert service.provider_stats['backup'].failovers == 1
+
+
+def test_stream_is_not_retried_after_the_first_chunk():
+    client = ScriptedClient(["Dial ", ConnectionError("connection reset")], ["never sent"])
+    service = service_with(openai=client)
+    chunks = list(service.generate_response_stream("balance?"))
+    assert chunks[0] == "Dial "
+    assert len(chunks) == 2 and AIService.is_error_response(chunks[1])
+    assert len(client.requests) == 1
+    assert service.provider_stats['openai'].errors == 1
+
+
+def test_stream_reports_a_non_retryable_error_in_band():
+    client = ScriptedClient(StubAPIError(401, "authentication failed"))
+    service = service_with(openai=client)
+    chunks = list(service.generate_response_stream("balance?"))
+    assert len(chunks) == 1 and chunks[0].startswith("❌ Authentication Error")
+    assert len(client.requests) == 1
+
+
+class SlowAsyncClient:
+    """OpenAI-style async client that records how many requests are in flight"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.in_flight = self.peak = self.calls = 0
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    async def _create(self, messages, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.seconds)
+        finally:
+            self.in_flight -= 1
+        return _completion("ok")
+
+
+def async_service_with(client, **options) -> AsyncAIService:
+    service = AsyncAIService(ai_provider='stub', **options)
+    service.async_clients = {'openai': client}
+    service.retry_policy = RetryPolicy(max_retries=1, base_delay=0.001, max_delay=0.01)
+    return service
+
+
+def test_async_requests_are_bounded_by_max_concurrency():
+    client = SlowAsyncClient(0.02)
+    service = async_service_with(client, max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(*(service.agenerate_response(f"q{i}") for i in range(10)))
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert client.peak == 3
+
+
+def test_async_attempts_are_bounded_by_the_timeout():
+    client = SlowAsyncClient(5)
+    service = async_service_with(client, timeout=0.02)
+    reply = asyncio.run(service.agenerate_response("q"))
+    assert reply.startswith("⚠️ Timeout")
+    # A timeout is transient: retried once, then counted against the breaker
+    assert client.calls == 2
+    assert service.provider_stats['openai'].errors == 2
+
+
+def test_cancelling_aborts_the_request():
+    client = SlowAsyncClient(5)
+    service = async_service_with(client)
+
+    async def run():
+        task = asyncio.create_task(service.agenerate_response("q"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return client.in_flight
+
+    assert asyncio.run(run()) == 0
+    assert client.calls == 1
+
+
+class APITimeoutError(Exception):
+    """Named like the SDKs' timeout error, which doesn't subclass TimeoutError"""
+
+
+def test_sync_calls_pass_the_timeout_and_fail_over_on_it():
+    hung, backup = ScriptedClient(*[APITimeoutError("Request timed out.")] * 3), ScriptedClient(["ok"])
+    service = service_with(openai=hung, backup=backup)
+    service.timeout = 2.5
+    service._breaker('openai').failure_threshold = 3
+    assert service.generate_response("balance?") == "ok"
+    assert [request['timeout'] for request in hung.requests + backup.requests] == [2.5] * 4
+    # Timeouts are transient: retried, then counted as breaker failures
+    assert service.breakers['openai'].state == CircuitBreaker.OPEN
+    assert service.provider_stats['openai'].retries == 2
+
+
+def test_stream_passes_the_timeout():
+    client = ScriptedClient(["a", "b"])
+    service = service_with(openai=client)
+    service.timeout = 4.0
+    assert list(service.generate_response_stream("balance?")) == ["a", "b"]
+    assert client.requests[0]['timeout'] == 4.0
+
+
+def test_timeout_message():
+    assert AIService._error_message(APITimeoutError("Request timed out.")).startswith("⚠️ Timeout")
+
+
+def test_stub_gives_up_a_hung_call_at_the_timeout():
+    llm = StubLLM(latency_ms=0, timeout_rate=1.0, timeout_seconds=30)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        StubClient(llm).chat.completions.create(messages=[{'role': 'user', 'content': 'hi'}], timeout=0.01)
+    assert time.perf_counter() - start < 1
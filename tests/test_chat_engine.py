@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import json
+import os
+
+import pytest
+
+from services.chat_engine import ChatEngine
+from utils.tracing import _current_trace
+
+
+def make_engine(faq_file: str, **options) -> ChatEngine:
+    options = dict({'ai_provider': 'stub', 'cache_size': 0, 'semantic_cache_size': 0}, **options)
+    return ChatEngine(faq_file=faq_file, scraped_faq_file=os.path.join(os.path.dirname(faq_file), 'scraped.json'),
+                      **options)
+
+
+def rewrite(path: str, content: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_retries_a_half_written_file(stub_llm, faq_file):
+    engine = make_engine(faq_file)
+    with open(faq_file, encoding='utf-8') as f:
+        data = json.load(f)
+    data['faqs'].append({'id': 999, 'question': 'Can I gift a night plan?', 'answer': 'Yes, dial *131*9#.',
+                         'keywords': ['gift', 'night']})
+    complete = json.dumps(data)
+
+    rewrite(faq_file, complete[:len(complete) // 2])
+    changes = engine.reload_faqs()
+    assert changes['skipped'] == 1 and changes['added'] == 0
+    assert len(engine.faqs) == len(data['faqs']) - 1
+
+    rewrite(faq_file, complete)
+    changes = engine.reload_faqs()
+    assert changes == {'added': 1, 'changed': 0, 'removed': 0, 'skipped': 0}
+    assert engine.search_faqs('gift a night plan', 1)[0]['id'] == 999
+
+
+def test_single_pass_makes_one_provider_call(stub_llm, faq_file):
+    engine = make_engine(faq_file, single_pass=True, intent_threshold=1.01)
+    result = engine.generate_response("How do I activate international roaming?")
+    assert engine.ai_service.stub_llm.calls == 1
+    assert (result['intent'], result['intent_source']) == ('roaming_inquiry', 'llm')
+    assert result['response'].startswith("Thanks for reaching out!")
+
+
+def test_single_pass_falls_back_to_two_calls(stub_llm, faq_file, monkeypatch):
+    engine = make_engine(faq_file, single_pass=True, intent_threshold=1.01)
+    original = engine.ai_service.generate_response
+    prompts = []
+
+    def unparsable_single_pass(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        if '"response"' in prompt:
+            return "Sure! Roaming is easy to turn on."
+        return original(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(engine.ai_service, 'generate_response', unparsable_single_pass)
+    result = engine.generate_response("How do I activate international roaming?")
+    # The single-pass reply wasn't JSON, so the intent and the reply were asked for separately
+    assert len(prompts) == 3
+    assert 'Detected intent: roaming_inquiry' in prompts[2]
+    assert (result['intent'], result['intent_source']) == ('roaming_inquiry', 'llm')
+    assert result['response'].startswith("Thanks for reaching out!")
+
+
+def test_single_pass_skipped_when_the_local_model_is_sure(stub_llm, faq_file):
+    engine = make_engine(faq_file, single_pass=True, intent_threshold=0.0)
+    result = engine.generate_response("block my sim card")
+    assert result['intent_source'] == 'local'
+    assert engine.ai_service.stub_llm.calls == 1
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('{"intent": "data_inquiry", "confidence": 0.9, "response": " Dial *131#. "}', ('data_inquiry', 0.9, 'Dial *131#.')),
+    ('{"intent": "made_up", "confidence": 0.9, "response": "Hi"}', ('general_inquiry', 0.0, 'Hi')),
+    ('{"intent": "data_inquiry", "confidence": 7, "response": "Hi"}', ('data_inquiry', 1.0, 'Hi')),
+    ('{"intent": "data_inquiry", "confidence": "high", "response": "Hi"}', ('data_inquiry', 0.0, 'Hi')),
+])
+def test_parse_single_pass(stub_llm, faq_file, raw, expected):
+    result = make_engine(faq_file)._parse_single_pass(raw)
+    assert (result['intent'], result['confidence'], result['response']) == expected
+
+
+@pytest.mark.parametrize('raw', ['not json', '{"intent": "data_inquiry"}', '{"intent": "x", "response": "  "}'])
+def test_parse_single_pass_rejects(stub_llm, faq_file, raw):
+    assert make_engine(faq_file)._parse_single_pass(raw) is None
+
+
+def test_repeated_message_is_served_from_the_cache(stub_llm, faq_file):
+    engine = make_engine(faq_file, cache_size=16, intent_threshold=0.0)
+    first = engine.generate_response("How do I check my data balance?")
+    calls = engine.ai_service.stub_llm.calls
+    second = engine.generate_response("how do i check my data balance")
+    assert engine.ai_service.stub_llm.calls == calls
+    assert (first['cached'], second['cache_tier']) == (False, 'exact')
+    assert second['response'] == first['response']
+
+
+def test_semantic_cache_is_scoped_to_the_best_faq(stub_llm, faq_file):
+    engine = make_engine(faq_file, semantic_cache_size=16, intent_threshold=0.0)
+    relevant = engine.search_faqs("How do I check my data balance?")
+    other = engine.search_faqs("How do I port my number to MTN?")
+    assert relevant[0] is not other[0]
+    scope = engine._semantic_scope('data_inquiry', relevant)
+    assert scope != engine._semantic_scope('data_inquiry', other)
+    assert scope != engine._semantic_scope('tariff_inquiry', relevant)
+    # Keyed on FAQ content, so an unchanged FAQ reloaded as a new object keeps the scope
+    assert scope == engine._semantic_scope('data_inquiry', [dict(relevant[0])])
+
+    first = engine.generate_response("How do I check my data balance?")
+    second = engine.generate_response("How do i check my data balances")
+    assert not first['cached']
+    assert second['cache_tier'] == 'semantic'
+    assert second['response'] == first['response']
+
+
+def test_streamed_reply_matches_the_complete_reply(stub_llm, faq_file):
+    engine = make_engine(faq_file, intent_threshold=0.0)
+    expected = engine.generate_response("How do I check my data balance?")
+    stream = engine.generate_response_stream("How do I check my data balance?")
+    chunks = list(stream)
+    assert len(chunks) > 1
+    assert "".join(chunks) == expected['response'] == stream.result['response']
+    assert stream.result['intent'] == expected['intent']
+    assert stream.result['time_to_first_token'] == stream.time_to_first_token > 0
+
+
+@pytest.mark.parametrize('single_pass', [False, True])
+def test_async_reply_matches_the_sync_reply(stub_llm, faq_file, single_pass):
+    engine = make_engine(faq_file, single_pass=single_pass, intent_threshold=1.01)
+    expected = engine.generate_response("How do I activate international roaming?")
+    result = asyncio.run(engine.agenerate_response("How do I activate international roaming?"))
+    for key in ('response', 'intent', 'confidence', 'intent_source', 'relevant_faqs'):
+        assert result[key] == expected[key], key
+
+
+def test_stream_trace_stays_out_of_the_callers_context(stub_llm, faq_file):
+    engine = make_engine(faq_file, intent_threshold=0.0)
+    stream = engine.generate_response_stream("How do I check my data balance?")
+    for _ in stream:
+        # Between chunks the consumer is not inside the stream's trace
+        assert _current_trace.get() is None
+    assert {'faq_search', 'intent', 'generation', 'total'} <= set(stream.result['timings'])
+
+
+def test_abandoned_stream_ends_its_trace(stub_llm, faq_file, tmp_path):
+    log = str(tmp_path / 'traces.jsonl')
+    engine = make_engine(faq_file, intent_threshold=0.0, trace_log=log)
+    stream = engine.generate_response_stream("How do I check my data balance?")
+    next(iter(stream))
+    assert _current_trace.get() is None
+    # Dropped from another context, as when a Streamlit rerun abandons the stream
+    contextvars.Context().run(stream.close)
+    del stream
+    engine.tracer.close()
+    with open(log, encoding='utf-8') as f:
+        record = json.loads(f.readline())
+    assert record['name'] == 'generate_response_stream'
+    assert 'generation' in {s['name'] for s in record['spans']}
@@ -0,0 +1,213 @@
+import copy
+import os
+import tracemalloc
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.churn_scoring_benchmark import synthesize_customers
+from models import churn_model
+from models.churn_model import INPUT_DTYPES, MAX_COMPILED_ROWS, ChurnPredictor, load_bundle, save_bundle
+from models.compiled_churn import CompiledChurnModel
+
+
+@pytest.fixture
+def predictor(churn_predictor):
+    """A separate predictor over the session model, free to swap its model out"""
+    predictor = ChurnPredictor()
+    predictor.model, predictor.scaler = churn_predictor.model, churn_predictor.scaler
+    return predictor
+
+
+def test_prepare_features_fills_one_float32_matrix(churn_predictor, customers):
+    columns = list(customers.columns)
+    X = churn_predictor.prepare_features(customers)
+    assert X.dtype == np.float32 and X.flags['C_CONTIGUOUS']
+    assert X.shape == (len(customers), len(churn_predictor.all_features))
+    X_raw = churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    X_scaled = churn_predictor.scaler.transform(X_raw)
+    assert np.array_equal(X, X_scaled.astype(np.float32))
+    # The trees cast to float32 anyway, so both matrices score identically
+    assert np.array_equal(churn_predictor.model.predict_proba(X), churn_predictor.model.predict_proba(X_scaled))
+    # Derived features never land in the caller's DataFrame
+    assert list(customers.columns) == columns
+
+
+def test_prepare_features_makes_no_full_size_copies(churn_predictor):
+    customers = synthesize_customers(100_000, seed=2)
+    column_bytes = len(customers) * 8
+    tracemalloc.start()
+    try:
+        X = churn_predictor.prepare_features(customers)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The output plus a few column-sized float64 temporaries; one DataFrame copy alone is ~6 columns
+    assert peak < X.nbytes + 4 * column_bytes
+
+
+def test_predict_adds_scores(churn_predictor, customers):
+    result = churn_predictor.predict(customers)
+    assert result['churn_probability'].between(0, 1).all()
+    X = churn_predictor.scaler.transform(churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64))
+    assert np.array_equal(result['churn_probability'], churn_predictor.model.predict_proba(X)[:, 1])
+    assert np.array_equal(result['churn_prediction'].to_numpy(dtype=np.int64), churn_predictor.model.predict(X))
+    assert set(result['risk_level'].astype(str)) <= {'Low', 'Medium', 'High'}
+
+
+def test_parallel_scores_match_in_process(churn_predictor, customers):
+    X = churn_predictor.prepare_features(customers)
+    proba, labels = churn_predictor._score(X)
+    parallel_proba, parallel_labels = churn_predictor._score(X, n_jobs=2, min_partition_rows=500)
+    assert np.array_equal(parallel_proba, proba)
+    assert np.array_equal(parallel_labels, labels)
+
+
+def test_parallel_scoring_picks_up_a_replaced_model(predictor, customers):
+    X = predictor.prepare_features(customers)
+    predictor._score(X, n_jobs=2, min_partition_rows=500)
+    # A smaller model under the same predictor must not be served from the workers' cache
+    predictor.model = copy.deepcopy(predictor.model)
+    predictor.model.estimators_ = predictor.model.estimators_[:5]
+    predictor.model.n_estimators = predictor.model.n_estimators_ = 5
+    expected = predictor.model.predict_proba(X)[:, 1]
+    proba, _ = predictor._score(X, n_jobs=2, min_partition_rows=500)
+    assert np.array_equal(proba, expected)
+
+
+def test_small_inputs_stay_in_process(churn_predictor, customers, monkeypatch):
+    monkeypatch.setattr(churn_predictor, '_model_artifact', lambda: pytest.fail("started a worker pool"))
+    churn_predictor.predict(customers, n_jobs=2)
+
+
+def test_score_rows_routes_by_batch_size(predictor, customers, monkeypatch):
+    columns = {name: customers[name].to_numpy() for name in predictor.feature_columns}
+    expected, expected_labels = predictor._score(predictor.prepare_features(customers))
+    compiled_calls = []
+    compiled = predictor.compiled_model()
+    monkeypatch.setattr(compiled, 'predict_proba',
+                        lambda X, score=compiled.predict_proba: compiled_calls.append(len(X)) or score(X))
+    for rows in (1, MAX_COMPILED_ROWS, MAX_COMPILED_ROWS + 1, 1000):
+        proba, labels = predictor.score_rows({name: values[:rows] for name, values in columns.items()})
+        assert np.array_equal(proba, expected[:rows])
+        assert np.array_equal(labels, expected_labels[:rows])
+    # Larger batches go to sklearn, where the compiled walk is slower
+    assert compiled_calls == [1, MAX_COMPILED_ROWS]
+
+
+def test_predict_file_matches_predict(churn_predictor, customers, tmp_path):
+    input_path, output_path = str(tmp_path / 'customers.csv'), str(tmp_path / 'scored.csv')
+    customers.to_csv(input_path, index=False)
+    summary = churn_predictor.predict_file(input_path, output_path, chunksize=700)
+
+    expected = churn_predictor.predict(pd.read_csv(input_path, dtype=INPUT_DTYPES))
+    scored = pd.read_csv(output_path)
+    assert summary['rows'] == len(customers)
+    assert summary['chunks'] == 5
+    assert summary['incomplete_rows'] == 0
+    assert list(scored['customer_id']) == list(customers['customer_id'])
+    assert np.allclose(scored['churn_probability'], expected['churn_probability'], rtol=1e-12, atol=0)
+    assert list(scored['churn_prediction']) == list(expected['churn_prediction'])
+    assert summary['risk_levels'] == {level: int(count) for level, count
+                                      in expected['risk_level'].value_counts().items()}
+
+
+def test_predict_file_reports_incomplete_rows(churn_predictor, customers, tmp_path):
+    input_path, output_path = str(tmp_path / 'customers.csv'), str(tmp_path / 'scored.csv')
+    damaged = customers.head(50).copy()
+    damaged = damaged.astype({'tenure_months': 'Int32', 'monthly_spend': 'float64'})
+    damaged.loc[[3, 17], 'tenure_months'] = pd.NA
+    damaged.loc[[17, 30], 'monthly_spend'] = np.nan
+    damaged.to_csv(input_path, index=False)
+
+    summary = churn_predictor.predict_file(input_path, output_path, chunksize=20)
+    scored = pd.read_csv(output_path)
+    assert summary['rows'] == 50
+    assert summary['incomplete_rows'] == 3
+    missing = scored['churn_probability'].isna()
+    assert list(np.flatnonzero(missing)) == [3, 17, 30]
+    assert scored.loc[missing, 'churn_prediction'].isna().all()
+    assert scored.loc[~missing, 'churn_probability'].between(0, 1).all()
+
+
+def test_predict_file_header_only(churn_predictor, customers, tmp_path):
+    input_path, output_path = str(tmp_path / 'customers.csv'), str(tmp_path / 'scored.csv')
+    customers.head(0).to_csv(input_path, index=False)
+    summary = churn_predictor.predict_file(input_path, output_path)
+    assert summary['rows'] == 0
+    scored = pd.read_csv(output_path)
+    assert scored.empty
+    assert list(scored.columns) == list(customers.columns) + ['churn_probability', 'churn_prediction', 'risk_level']
+
+
+@pytest.fixture
+def bundle_cache(monkeypatch):
+    """An empty bundle cache for this test"""
+    monkeypatch.setattr(churn_model, '_BUNDLES', OrderedDict())
+    monkeypatch.setattr(churn_model, '_BUNDLE_FILES', {})
+
+
+def save_test_bundle(path: str, predictor: ChurnPredictor, scaler=None) -> dict:
+    scaler = scaler or predictor.scaler
+    compiled = CompiledChurnModel.from_sklearn(predictor.model, scaler, predictor.all_features)
+    return save_bundle(path, predictor.model, scaler, predictor.all_features, compiled, {'auc': 0.5})
+
+
+def rewrite_bundle(path: str, **changes):
+    """Change stored fields of a saved bundle, as a tampered or old file would have them"""
+    bundle = joblib.load(path)
+    bundle.update(changes)
+    joblib.dump(bundle, path)
+
+
+def test_bundle_round_trip_is_cached_by_hash(churn_predictor, customers, tmp_path, bundle_cache):
+    saved = save_test_bundle(str(tmp_path / 'a.bundle'), churn_predictor)
+    save_test_bundle(str(tmp_path / 'b.bundle'), churn_predictor)
+    first = load_bundle(str(tmp_path / 'a.bundle'))
+    assert first['content_hash'] == saved['content_hash']
+    assert first['features'] == churn_predictor.all_features and first['metadata'] == {'auc': 0.5}
+    X = churn_predictor.prepare_features(customers)
+    assert np.array_equal(first['model'].predict_proba(X), churn_predictor.model.predict_proba(X))
+    # Same content under another name shares the loaded copy
+    assert load_bundle(str(tmp_path / 'b.bundle')) is first
+    assert load_bundle(str(tmp_path / 'a.bundle')) is first
+
+
+def test_bundle_with_a_wrong_hash_is_refused(churn_predictor, tmp_path, bundle_cache):
+    path = str(tmp_path / 'churn_model.bundle')
+    save_test_bundle(path, churn_predictor)
+    payload = joblib.load(path)['payload']
+    rewrite_bundle(path, payload=payload[:-1] + bytes([payload[-1] ^ 1]))
+    with pytest.raises(ValueError, match='content hash'):
+        load_bundle(path)
+
+
+def test_bundle_from_another_sklearn_version_is_refused(churn_predictor, tmp_path, bundle_cache):
+    path = str(tmp_path / 'churn_model.bundle')
+    save_test_bundle(path, churn_predictor)
+    rewrite_bundle(path, sklearn_version='0.24.2')
+    with pytest.raises(ValueError, match='scikit-learn 0.24.2'):
+        load_bundle(path)
+    predictor = ChurnPredictor()
+    predictor.bundle_path = path
+    predictor.model_path = predictor.scaler_path = str(tmp_path / 'missing.pkl')
+    assert not predictor.load_model()
+
+
+def test_bundle_cache_evicts_files_with_their_bundles(churn_predictor, tmp_path, bundle_cache):
+    for i in range(churn_model._BUNDLE_CACHE_SIZE + 3):
+        scaler = copy.deepcopy(churn_predictor.scaler)
+        scaler.mean_ = scaler.mean_ + i
+        path = str(tmp_path / f'{i}.bundle')
+        save_test_bundle(path, churn_predictor, scaler)
+        load_bundle(path)
+        # Rewriting a file replaces its entry rather than adding one
+        save_test_bundle(path, churn_predictor, scaler)
+        os.utime(path, ns=(os.stat(path).st_mtime_ns + 1,) * 2)
+        load_bundle(path)
+    assert len(churn_model._BUNDLES) == churn_model._BUNDLE_CACHE_SIZE
+    assert len(churn_model._BUNDLE_FILES) == churn_model._BUNDLE_CACHE_SIZE
+    assert set(churn_model._BUNDLE_FILES.values()) == set(churn_model._BUNDLES)
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pytest
+
+from services.churn_scoring import ChurnScoringService, ScoringOverloaded
+
+
+@pytest.fixture
+def records(customers):
+    return customers.head(200).to_dict('records')
+
+
+def test_scores_match_predict(churn_predictor, customers, records):
+    service = ChurnScoringService(lambda: churn_predictor, max_batch=16, max_wait=0.01)
+    try:
+        futures = [service.submit(record, block=5) for record in records]
+        results = [future.result(10) for future in futures]
+    finally:
+        service.close()
+    expected = churn_predictor.predict(customers.head(len(records)))
+    assert [r['customer_id'] for r in results] == list(expected['customer_id'])
+    assert np.array_equal([r['churn_probability'] for r in results], expected['churn_probability'])
+    assert [r['churn_prediction'] for r in results] == list(expected['churn_prediction'])
+    assert [r['risk_level'] for r in results] == list(expected['risk_level'].astype(str))
+
+
+def test_requests_are_batched(churn_predictor, records):
+    release = threading.Event()
+
+    def predictor():
+        release.wait(5)
+        return churn_predictor
+
+    service = ChurnScoringService(predictor, max_batch=8, max_wait=0.05)
+    try:
+        futures = [service.submit(record, block=5) for record in records[:40]]
+        release.set()
+        for future in futures:
+            future.result(10)
+        stats = service.stats()
+    finally:
+        service.close()
+    assert stats['requests'] == 40
+    assert max(stats['batch_sizes']) <= 8
+    # Requests queued behind the first batch are scored eight at a time
+    assert stats['batches'] <= 6
+    assert stats['mean_batch_size'] > 1
+
+
+def test_full_queue_rejects_requests(churn_predictor, records):
+    entered, release = threading.Event(), threading.Event()
+
+    def predictor():
+        entered.set()
+        release.wait(5)
+        return churn_predictor
+
+    service = ChurnScoringService(predictor, max_batch=1, max_wait=0, max_queue=2)
+    try:
+        first = service.submit(records[0])
+        # The worker holds the first request, so the queue has room for exactly two more
+        assert entered.wait(5)
+        queued = [service.submit(records[1]), service.submit(records[2])]
+        with pytest.raises(ScoringOverloaded):
+            service.submit(records[3])
+        with pytest.raises(ScoringOverloaded):
+            service.submit(records[3], block=0.05)
+        assert service.stats()['rejected'] == 2
+        assert service.stats()['queue_depth'] == 2
+        release.set()
+        for future in [first] + queued:
+            assert 0 <= future.result(10)['churn_probability'] <= 1
+    finally:
+        release.set()
+        service.close()
+    assert service.stats()['requests'] == 3
+
+
+def test_missing_input_is_rejected_before_queueing(churn_predictor, records):
+    service = ChurnScoringService(lambda: churn_predictor)
+    try:
+        record = dict(records[0])
+        del record['complaints']
+        with pytest.raises(ValueError, match='complaints'):
+            service.submit(record)
+        assert service.stats()['queue_depth'] == 0
+    finally:
+        service.close()
+
+
+@pytest.mark.parametrize('value', ['twelve', None, float('nan'), float('inf'), '-inf'])
+def test_invalid_input_is_rejected_naming_the_column(churn_predictor, records, value):
+    service = ChurnScoringService(lambda: churn_predictor)
+    try:
+        record = dict(records[0], monthly_spend=value)
+        with pytest.raises(ValueError, match='monthly_spend'):
+            service.submit(record)
+        assert service.stats()['queue_depth'] == 0
+    finally:
+        service.close()
+
+
+def test_numeric_strings_are_accepted(churn_predictor, records):
+    service = ChurnScoringService(lambda: churn_predictor)
+    try:
+        record = {name: str(value) for name, value in records[0].items()}
+        expected = service.score(records[0])
+        assert service.score(record) == expected
+    finally:
+        service.close()
+
+
+def test_scoring_errors_reach_every_caller_in_the_batch(records):
+    def broken():
+        raise RuntimeError("model unavailable")
+
+    service = ChurnScoringService(broken, max_batch=4, max_wait=0.05)
+    try:
+        futures = [service.submit(record) for record in records[:4]]
+        for future in futures:
+            with pytest.raises(RuntimeError, match='model unavailable'):
+                future.result(10)
+        assert service.stats()['errors'] >= 1
+    finally:
+        service.close()
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+
+from models.compiled_churn import CompiledChurnModel, fold_threshold
+
+
+def goes_left(x: float, mean: float, scale: float, threshold: float) -> bool:
+    """sklearn's split test on a raw value: standardize in float64, cast to float32, compare"""
+    return bool(np.float32((np.float64(x) - mean) / scale) <= threshold)
+
+
+def sklearn_proba(predictor, X_raw: np.ndarray) -> np.ndarray:
+    return predictor.model.predict_proba(predictor.scaler.transform(X_raw))
+
+
+@pytest.fixture(scope='module')
+def compiled(churn_predictor):
+    return CompiledChurnModel.from_sklearn(churn_predictor.model, churn_predictor.scaler,
+                                           churn_predictor.all_features)
+
+
+def test_fold_threshold_is_the_last_value_sent_left():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        mean, scale = rng.normal(0, 100), rng.uniform(0.01, 100)
+        threshold = float(np.float32(rng.normal(0, 3)))
+        folded = fold_threshold(threshold, mean, scale)
+        assert goes_left(folded, mean, scale, threshold)
+        assert not goes_left(np.nextafter(folded, np.inf), mean, scale, threshold)
+
+
+def test_fold_threshold_covers_float32_rounding():
+    threshold = float(np.float32(0.1))
+    folded = fold_threshold(threshold, 0.0, 1.0)
+    # Doubles just above the float32 threshold still round down onto it
+    assert folded > threshold
+    assert np.float32(folded) == np.float32(threshold)
+    assert np.float32(np.nextafter(folded, np.inf)) > np.float32(threshold)
+
+
+def test_fold_threshold_all_or_nothing():
+    big = float(np.finfo(np.float32).max)
+    assert fold_threshold(big, 0.0, 1e300) == np.inf
+    assert fold_threshold(-big, 0.0, 1e300) == -np.inf
+
+
+def test_compiled_matches_sklearn(churn_predictor, compiled, customers):
+    X_raw = churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    assert np.array_equal(compiled.predict_proba(X_raw), sklearn_proba(churn_predictor, X_raw))
+    assert np.array_equal(compiled.predict(X_raw), churn_predictor.model.predict(churn_predictor.scaler.transform(X_raw)))
+
+
+def test_compiled_matches_sklearn_at_split_boundaries(churn_predictor, compiled, customers):
+    """Inputs exactly at, and one double either side of, every folded threshold"""
+    base = churn_predictor.prepare_features(customers.head(1), scaled=False, dtype=np.float64)[0]
+    rows = []
+    for node in np.flatnonzero(np.isfinite(compiled.threshold)):
+        t = compiled.threshold[node]
+        for x in (np.nextafter(t, -np.inf), t, np.nextafter(t, np.inf)):
+            row = base.copy()
+            row[compiled.feature[node]] = x
+            rows.append(row)
+    X_raw = np.array(rows)
+    assert len(X_raw) > 0
+    assert np.array_equal(compiled.predict_proba(X_raw), sklearn_proba(churn_predictor, X_raw))
+
+
+def test_arrays_round_trip(compiled, churn_predictor, customers, tmp_path):
+    path = str(tmp_path / 'compiled.npz')
+    compiled.save(path)
+    loaded = CompiledChurnModel.load(path)
+    X_raw = churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    assert loaded.feature_names == compiled.feature_names
+    assert np.array_equal(loaded.predict_proba(X_raw), compiled.predict_proba(X_raw))
+
+
+def test_feature_matrix_derives_inputs(compiled, churn_predictor, customers):
+    columns = {name: customers[name].to_numpy() for name in churn_predictor.feature_columns}
+    expected = churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    assert np.array_equal(compiled.feature_matrix(columns), expected)
+
+
+@pytest.mark.parametrize('init', [None, 'zero'])
+def test_init_score_matches_sklearn(churn_predictor, customers, init):
+    X_raw = churn_predictor.prepare_features(customers, scaled=False, dtype=np.float64)
+    X = churn_predictor.scaler.transform(X_raw)
+    model = GradientBoostingClassifier(n_estimators=5, max_depth=2, init=init, random_state=0)
+    model.fit(X, churn_predictor.model.predict(X))
+    compiled = CompiledChurnModel.from_sklearn(model, churn_predictor.scaler, churn_predictor.all_features)
+    assert np.array_equal(compiled.predict_proba(X_raw), model.predict_proba(X))
+
+
+def test_refuses_other_losses(churn_predictor, customers):
+    X = churn_predictor.scaler.transform(churn_predictor.prepare_features(customers, scaled=False,
+                                                                            dtype=np.float64))
+    model = GradientBoostingClassifier(loss='exponential', n_estimators=2, random_state=0)
+    model.fit(X, churn_predictor.model.predict(X))
+    with pytest.raises(ValueError):
+        CompiledChurnModel.from_sklearn(model, churn_predictor.scaler, churn_predictor.all_features)
@@ -0,0 +1,81 @@
+import copy
+
+import pytest
+
+from services.faq_corpus import FAQCorpus
+from tests.test_faq_index import synthetic_faqs
+
+QUERIES = ["data plan", "balance check", "recharge airtime", "roaming", "music video social", "sim swap port"]
+
+
+def all_scores(corpus: FAQCorpus, query: str):
+    """Score of every matching FAQ, keyed by content (slot order and object identity may differ)"""
+    return {FAQCorpus.faq_hash(faq): score for score, faq in corpus.faq_index.search(query, len(corpus.all_faqs))}
+
+
+def assert_same_ranking(corpus: FAQCorpus, rebuilt: FAQCorpus):
+    assert len(corpus.faq_index) == len(rebuilt.faq_index)
+    for query in QUERIES:
+        scores, expected = all_scores(corpus, query), all_scores(rebuilt, query)
+        assert scores.keys() == expected.keys(), query
+        for key, score in expected.items():
+            assert scores[key] == pytest.approx(score, rel=1e-6)
+
+
+def edited(faqs):
+    """Change two FAQs, drop one, add two"""
+    faqs = copy.deepcopy(faqs)
+    faqs[0]['answer'] += " You can also dial *131*4# for a roaming balance."
+    faqs[1]['keywords'] = ['recharge', 'airtime', 'voucher']
+    del faqs[2]
+    faqs.append({'id': 1001, 'question': 'How do I swap my SIM?', 'answer': 'Visit any store with ID for a sim swap.',
+                 'keywords': ['sim', 'swap']})
+    faqs.append({'id': 1002, 'question': 'Is there a night data plan?', 'answer': 'Night plans run from 12am to 5am.',
+                 'keywords': ['night', 'data', 'plan']})
+    return faqs
+
+
+@pytest.fixture
+def sources(faqs):
+    return {'data/faqs.json': list(faqs), 'data/extra.json': synthetic_faqs(300, seed=3)}
+
+
+def test_apply_matches_rebuild(sources):
+    corpus = FAQCorpus(sources, vector_cache_dir=None)
+    new_faqs = edited(sources['data/faqs.json'])
+    updated, changes = corpus.apply('data/faqs.json', new_faqs)
+
+    assert changes == {'added': 2, 'changed': 2, 'removed': 1}
+    rebuilt = FAQCorpus(dict(sources, **{'data/faqs.json': new_faqs}), vector_cache_dir=None)
+    assert_same_ranking(updated, rebuilt)
+
+
+def test_apply_leaves_the_old_corpus_intact(sources):
+    corpus = FAQCorpus(sources, vector_cache_dir=None)
+    before = {query: corpus.search(query, 5) for query in QUERIES}
+    corpus.apply('data/faqs.json', edited(sources['data/faqs.json']))
+    for query in QUERIES:
+        assert corpus.search(query, 5) == before[query]
+    assert_same_ranking(corpus, FAQCorpus(sources, vector_cache_dir=None))
+
+
+def test_repeated_applies_match_rebuild(sources):
+    corpus = FAQCorpus(sources, vector_cache_dir=None)
+    extra = sources['data/extra.json']
+    for step in range(3):
+        added = synthetic_faqs(15, seed=10 + step)
+        for i, faq in enumerate(added):
+            faq['id'] = f"new-{step}-{i}"
+        extra = extra[10:] + added
+        corpus, changes = corpus.apply('data/extra.json', extra)
+        assert changes == {'added': 15, 'changed': 0, 'removed': 10}
+    rebuilt = FAQCorpus(dict(sources, **{'data/extra.json': extra}), vector_cache_dir=None)
+    assert_same_ranking(corpus, rebuilt)
+
+
+def test_unchanged_apply_keeps_objects(sources):
+    corpus = FAQCorpus(sources, vector_cache_dir=None)
+    same, changes = corpus.apply('data/faqs.json', copy.deepcopy(sources['data/faqs.json']))
+    assert changes == {'added': 0, 'changed': 0, 'removed': 0}
+    assert same.sources['data/faqs.json'] == sources['data/faqs.json']
+    assert all(a is b for a, b in zip(same.sources['data/faqs.json'], sources['data/faqs.json']))
@@ -0,0 +1,151 @@
+import math
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from services.faq_index import FIELD_WEIGHTS, FAQIndex
+from utils.text_processor import TextProcessor
+
+VOCABULARY = ['data', 'plan', 'bundle', 'airtime', 'recharge', 'balance', 'roaming', 'voice', 'night', 'weekly',
+              'monthly', 'sim', 'swap', 'port', 'network', 'router', 'fiber', 'gift', 'borrow', 'share', 'code',
+              'dial', 'app', 'transfer', 'refund', 'outage', 'speed', 'video', 'social', 'music']
+
+
+class ReferenceScorer:
+    """BM25F computed directly from every FAQ's fields, with no postings or pruning"""
+
+    def __init__(self, faqs: List[Dict], k1: float = 1.2, b: float = 0.75):
+        self.faqs = faqs
+        self.k1, self.b = k1, b
+        self.docs = []
+        for faq in faqs:
+            fields = []
+            for field in FIELD_WEIGHTS:
+                value = faq.get(field) or ''
+                if isinstance(value, (list, tuple)):
+                    value = ' '.join(value)
+                fields.append(Counter(TextProcessor.tokenize(value)))
+            self.docs.append(fields)
+        self.lengths = np.array([[sum(c.values()) for c in doc] for doc in self.docs], dtype=float)
+        avg = self.lengths.mean(axis=0)
+        self.avg = np.where(avg > 0, avg, 1.0)
+
+    def scores(self, query: str) -> np.ndarray:
+        n = len(self.docs)
+        scores = np.zeros(n)
+        for token in set(TextProcessor.tokenize(query)):
+            df = sum(1 for doc in self.docs if any(token in field for field in doc))
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i, doc in enumerate(self.docs):
+                weighted_tf = sum(weight * doc[j][token] / (1 - self.b + self.b * self.lengths[i, j] / self.avg[j])
+                                  for j, weight in enumerate(FIELD_WEIGHTS.values()))
+                if weighted_tf:
+                    scores[i] += idf * weighted_tf * (self.k1 + 1) / (self.k1 + weighted_tf)
+        return scores
+
+
+def assert_matches_reference(index: FAQIndex, reference: ReferenceScorer, query: str, top_k: int):
+    scores = reference.scores(query)
+    positions = {id(faq): i for i, faq in enumerate(reference.faqs)}
+    expected = sorted(np.flatnonzero(scores > 0), key=lambda i: (-scores[i], i))[:top_k]
+    results = index.search(query, top_k)
+    assert len(results) == len(expected), query
+    # Impacts are stored as float32, so scores agree to about 1e-6 and near-ties may swap
+    assert [score for score, _ in results] == pytest.approx([scores[i] for i in expected], rel=1e-5)
+    for score, faq in results:
+        assert score == pytest.approx(scores[positions[id(faq)]], rel=1e-5)
+    assert all(a[0] >= b[0] for a, b in zip(results, results[1:]))
+
+
+def synthetic_faqs(n: int, seed: int = 0) -> List[Dict]:
+    """FAQs over a small vocabulary with Zipf-like word frequencies and varied lengths"""
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+
+    def words(count: int) -> List[str]:
+        return list(rng.choice(VOCABULARY, size=count, p=weights))
+
+    return [{'id': i, 'question': ' '.join(words(int(rng.integers(3, 9)))),
+             'answer': ' '.join(words(int(rng.integers(5, 40)))),
+             'keywords': words(int(rng.integers(1, 4)))} for i in range(n)]
+
+
+@pytest.fixture(scope='module')
+def large_faqs():
+    return synthetic_faqs(12000)
+
+
+def test_search_matches_reference_on_shipped_faqs(faqs):
+    index, reference = FAQIndex(faqs), ReferenceScorer(faqs)
+    queries = [faq['question'] for faq in faqs] + [' '.join(faq.get('keywords', [])) for faq in faqs]
+    queries += ["how do i buy data", "balance", "roaming charges abroad"]
+    for query in queries:
+        for top_k in (1, 3, len(faqs)):
+            assert_matches_reference(index, reference, query, top_k)
+
+
+def test_search_finds_the_asked_question(faqs):
+    index = FAQIndex(faqs)
+    for faq in faqs:
+        assert index.search(faq['question'], 1)[0][1] is faq
+
+
+def test_search_edge_cases(faqs):
+    index = FAQIndex(faqs)
+    assert index.search("", 3) == []
+    assert index.search("xyzzy plugh", 3) == []
+    assert index.search(faqs[0]['question'], 0) == []
+    assert FAQIndex([]).search("data", 3) == []
+
+
+def test_pruned_search_matches_reference(large_faqs, monkeypatch):
+    index, reference = FAQIndex(large_faqs), ReferenceScorer(large_faqs)
+    pruned = []
+    original = FAQIndex._pruned_scores
+
+    def recording(self, terms, top_k):
+        result = original(self, terms, top_k)
+        pruned.append(result is not None)
+        return result
+
+    monkeypatch.setattr(FAQIndex, '_pruned_scores', recording)
+    for query in ("data", "plan", "data plan", "bundle airtime", "music", "data plan bundle airtime recharge"):
+        for top_k in (1, 5, 20):
+            assert_matches_reference(index, reference, query, top_k)
+    # The common single terms are answered from the top-impact postings alone
+    assert any(pruned)
+
+
+def test_add_and_remove_match_a_fresh_build(large_faqs):
+    faqs = large_faqs[:2000]
+    index = FAQIndex(faqs[:1500])
+    snapshot = index.copy()
+    before = snapshot.search("data plan", 10)
+    for faq in faqs[1500:]:
+        index.add(faq, refresh=False)
+    for slot in range(0, 300, 3):
+        index.remove(slot, refresh=False)
+    index.refresh()
+
+    live = [faq for slot, faq in enumerate(faqs) if not (slot < 300 and slot % 3 == 0)]
+    reference = ReferenceScorer(live)
+    assert len(index) == len(live)
+    for query in ("data plan", "recharge", "music video social", "sim swap port"):
+        assert_matches_reference(index, reference, query, 10)
+    # The copy taken before the changes still answers from the old corpus
+    assert snapshot.search("data plan", 10) == before
+
+
+def test_removed_slot_is_reused(faqs):
+    index = FAQIndex(faqs)
+    index.remove(2)
+    assert all(faq is not faqs[2] for _, faq in index.search(faqs[2]['question'], len(faqs)))
+    replacement = {'id': 99, 'question': 'How do I port my number to MTN?', 'answer': 'Visit a store.',
+                   'keywords': ['port', 'number']}
+    assert index.add(replacement) == 2
+    assert index.search('port my number', 1)[0][1] is replacement
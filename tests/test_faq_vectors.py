@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from services.faq_corpus import FAQCorpus
+from services.faq_vectors import FAQVectorIndex
+
+
+def test_exact_question_is_the_best_match(faqs):
+    index = FAQVectorIndex(faqs, cache_dir=None)
+    for faq in faqs:
+        score, best = index.search(faq['question'], 1)[0]
+        assert best is faq
+        assert 0 < score <= 1 + 1e-6
+
+
+def test_rows_are_unit_length(faqs):
+    index = FAQVectorIndex(faqs, cache_dir=None)
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1, atol=1e-5)
+    assert index.search("", 3) == []
+    assert FAQVectorIndex([], cache_dir=None).search("data", 3) == []
+
+
+def test_saved_matrix_is_memory_mapped_on_reload(faqs, tmp_path):
+    built = FAQVectorIndex(faqs, cache_dir=str(tmp_path))
+    loaded = FAQVectorIndex(faqs, cache_dir=str(tmp_path))
+    assert isinstance(loaded.matrix, np.memmap)
+    assert np.array_equal(loaded.scores("buy a data bundle"), built.scores("buy a data bundle"))
+    assert sorted(os.listdir(tmp_path)) == ['faq_vectors.idf.npy', 'faq_vectors.json', 'faq_vectors.npy']
+
+
+def test_changed_corpus_rebuilds_the_saved_matrix(faqs, tmp_path, monkeypatch):
+    FAQVectorIndex(faqs, cache_dir=str(tmp_path))
+    changed = [dict(faqs[0], answer=faqs[0]['answer'] + " Roaming bundles start at 100 MB.")] + list(faqs[1:])
+    rebuilt = FAQVectorIndex(changed, cache_dir=str(tmp_path))
+    fresh = FAQVectorIndex(changed, cache_dir=None)
+    assert np.array_equal(np.asarray(rebuilt.matrix), fresh.matrix)
+
+    # An unchanged corpus is loaded, not rebuilt
+    monkeypatch.setattr(FAQVectorIndex, '_build', lambda self: pytest.fail("rebuilt an unchanged corpus"))
+    FAQVectorIndex(changed, cache_dir=str(tmp_path))
+
+
+def test_search_modes(faqs):
+    corpus = FAQCorpus({'data/faqs.json': faqs}, vector_cache_dir=None)
+    question = faqs[4]['question']
+    for mode in ('keyword', 'vector', 'hybrid'):
+        assert corpus.search(question, 3, mode=mode)[0] is faqs[4], mode
+    # alpha=0 ranks by BM25 alone, alpha=1 by cosine alone
+    assert corpus.search("data plan", 3, mode='hybrid', hybrid_alpha=0) == corpus.search("data plan", 3)
+    assert corpus.search("data plan", 3, mode='hybrid', hybrid_alpha=1) == corpus.search("data plan", 3, mode='vector')
+    with pytest.raises(ValueError):
+        corpus.search("data plan", mode='semantic')
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from models.intent_classifier import SEED_EXAMPLES, IntentClassifier
+from services.ai_service import AIService
+
+INTENTS = list(SEED_EXAMPLES)
+
+
+@pytest.fixture
+def classifier(faqs):
+    return IntentClassifier.from_faqs(faqs, INTENTS)
+
+
+def test_predicts_unseen_phrasings(classifier):
+    for message, intent in (("my sim card got stolen yesterday", 'security_issue'),
+                            ("how much is the 2gb data bundle", 'data_inquiry'),
+                            ("i want to port my line from airtel", 'porting_request'),
+                            ("no signal in my house since morning", 'network_complaint')):
+        assert classifier.predict(message)[0] == intent, message
+    probs = classifier.predict_proba("recharge failed")
+    assert set(probs) == set(INTENTS)
+    assert sum(probs.values()) == pytest.approx(1)
+
+
+def test_confident_local_intent_skips_the_llm(classifier, monkeypatch):
+    service = AIService.__new__(AIService)
+    monkeypatch.setattr(service, 'generate_response', lambda *args, **kwargs: pytest.fail("called the LLM"),
+                        raising=False)
+    intent, confidence = classifier.predict("block my sim card please")
+    result = service.classify_intent("block my sim card please", INTENTS, local_classifier=classifier,
+                                     confidence_threshold=confidence)
+    assert result == {'intent': intent, 'confidence': confidence, 'entities': {}, 'source': 'local'}
+
+
+def test_learning_shifts_predictions(classifier):
+    message = "abeg my bundle don finish"
+    before = classifier.predict_proba(message)['data_inquiry']
+    for _ in range(5):
+        classifier.learn(message, 'data_inquiry')
+    assert classifier.predict_proba(message)['data_inquiry'] > before
+    assert list(classifier.traffic)[-1] == (message, 'data_inquiry')
+
+
+def test_learning_publishes_new_arrays(classifier):
+    """Readers holding the previous (feature, prior) pair keep a consistent, unchanged pair"""
+    before = classifier._log_probs
+    copies = [array.copy() for array in before]
+    classifier.learn("abeg my bundle don finish", 'data_inquiry')
+    after = classifier._log_probs
+    assert after is not before
+    assert all(a is not b for a, b in zip(after, before))
+    assert all(np.array_equal(array, copy) for array, copy in zip(before, copies))
+    feature_log_prob, class_log_prior = after
+    assert np.exp(class_log_prior).sum() == pytest.approx(1)
+    assert np.exp(feature_log_prob).sum(axis=1) == pytest.approx(np.ones(len(INTENTS)))
+
+
+def test_traffic_log_is_rotated_and_sampled(tmp_path):
+    log = str(tmp_path / 'intent_log.jsonl')
+    for i in range(40):
+        IntentClassifier.log_traffic(log, f"message {i}", 'data_inquiry', 0.9, max_bytes=500)
+    assert (tmp_path / 'intent_log.jsonl.1').exists()
+    texts, labels = IntentClassifier.load_traffic(log, limit=5)
+    assert texts == [f"message {i}" for i in range(35, 40)]
+    assert labels == ['data_inquiry'] * 5
+    assert IntentClassifier.load_traffic(None) == ([], [])
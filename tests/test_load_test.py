@@ -0,0 +1,64 @@
+import itertools
+
+import pytest
+
+from benchmarks.load_test import VARIANTS, LoadTest, build_corpus, message_stream, percentiles
+from tests.test_chat_engine import make_engine
+
+
+def test_message_stream_is_reproducible_and_skewed(faq_file):
+    corpus = build_corpus(faq_file)
+    a = list(itertools.islice(message_stream(corpus, seed=3), 2000))
+    assert a == list(itertools.islice(message_stream(corpus, seed=3), 2000))
+    assert a != list(itertools.islice(message_stream(corpus, seed=4), 2000))
+    # Zipf: the most popular message is asked far more often than a uniform draw would
+    counts = {}
+    for message in a:
+        counts[message] = counts.get(message, 0) + 1
+    assert max(counts.values()) > 5 * 2000 / (len(corpus) * len(VARIANTS))
+
+
+def test_build_corpus_reads_a_messages_file(tmp_path):
+    path = tmp_path / 'messages.jsonl'
+    path.write_text('{"message": "buy data"}\n\nmy sim is blocked\n{"other": 1}\n', encoding='utf-8')
+    assert build_corpus('missing.json', str(path)) == ["buy data", "my sim is blocked"]
+
+
+def test_percentiles():
+    stats = percentiles([0.001 * i for i in range(1, 101)])
+    assert stats['count'] == 100
+    assert stats['p50_ms'] == pytest.approx(50.5)
+    assert stats['max_ms'] == pytest.approx(100)
+    assert percentiles([]) == {'count': 0}
+
+
+@pytest.mark.parametrize('mode, rate', [('sync', None), ('async', None), ('sync', 200.0), ('async', 200.0)])
+def test_run_completes_the_requested_load(stub_llm, faq_file, mode, rate):
+    engine = make_engine(faq_file, cache_size=64)
+    test = LoadTest(engine, message_stream(build_corpus(faq_file), 0), requests=30, duration=None,
+                    concurrency=4, rate=rate)
+    elapsed = test.run(mode)
+    assert len(test.latencies) == 30
+    assert test.errors == 0
+    assert sum(test.intent_sources.values()) == 30
+    assert {'faq_search', 'intent'} <= set(test.stage_samples)
+    assert elapsed > 0
+
+
+def test_run_stops_at_the_duration(stub_llm, faq_file):
+    engine = make_engine(faq_file)
+    test = LoadTest(engine, message_stream(build_corpus(faq_file), 0), requests=None, duration=0.2,
+                    concurrency=2, rate=None)
+    assert test.run('sync') < 2
+    assert len(test.latencies) > 0
+
+
+def test_errors_are_counted(faq_file, monkeypatch):
+    monkeypatch.setenv('STUB_LATENCY_MS', '0')
+    monkeypatch.setenv('STUB_ERROR_RATE', '1')
+    engine = make_engine(faq_file, intent_threshold=0.0)
+    engine.ai_service.retry_policy.max_retries = 0
+    test = LoadTest(engine, message_stream(build_corpus(faq_file), 0), requests=5, duration=None,
+                    concurrency=1, rate=None)
+    test.run('sync')
+    assert test.errors == 5
@@ -0,0 +1,195 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pytest
+
+from utils.metrics import MetricsAggregator, MetricsSnapshot, MetricsTracker, QuantileSketch, SlidingWindow
+
+
+def sketch_of(values, relative_accuracy=0.01) -> QuantileSketch:
+    sketch = QuantileSketch(relative_accuracy)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(-3, 1.5, 20000)
+    sketch = sketch_of(values)
+    ordered = np.sort(values)
+    for q in (0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1):
+        exact = ordered[math.floor(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact * (1 + 1e-9), q
+
+
+def test_quantile_of_empty_and_zero_values():
+    assert QuantileSketch().quantile(0.5) == 0
+    sketch = sketch_of([0, 0, 0, 2.0])
+    assert sketch.quantile(0.5) == 0
+    assert sketch.quantile(1) == pytest.approx(2.0, rel=0.01)
+
+
+def test_merge_equals_one_sketch_of_everything():
+    rng = np.random.default_rng(1)
+    a_values, b_values = rng.exponential(0.2, 5000), rng.exponential(3.0, 3000)
+    merged = sketch_of(a_values)
+    merged.merge(sketch_of(b_values))
+    combined = sketch_of(np.concatenate([a_values, b_values]))
+    assert merged.count == combined.count
+    assert merged.zero_count == combined.zero_count
+    assert merged.buckets == combined.buckets
+
+
+def test_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_collapse_keeps_the_upper_quantiles():
+    values = np.geomspace(1e-6, 1e4, 5000)
+    sketch = QuantileSketch(max_buckets=100)
+    for value in values:
+        sketch.add(value)
+    assert len(sketch.buckets) <= 100
+    assert sketch.count == len(values)
+    assert sketch.quantile(0.99) == pytest.approx(np.sort(values)[math.floor(0.99 * 4999)], rel=0.01)
+
+
+def test_sketch_json_round_trip():
+    sketch = sketch_of(np.random.default_rng(2).lognormal(0, 1, 1000))
+    copy = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert copy.buckets == sketch.buckets and copy.count == sketch.count
+    assert copy.quantile(0.95) == sketch.quantile(0.95)
+
+
+def log_some(snapshot: MetricsSnapshot, seed: int, count: int, now: float):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        snapshot.log_conversation(
+            intent=['data_inquiry', 'billing', 'greeting'][i % 3], confidence=float(rng.uniform(0.5, 1)),
+            response_time=float(rng.exponential(0.8)), intent_source=['local', 'ai'][i % 2],
+            time_to_first_token=float(rng.exponential(0.2)), timings={'retrieval': float(rng.uniform(1, 5))},
+            now=now - i
+        )
+    snapshot.log_satisfaction(4)
+
+
+def assert_same_summary(summary, expected):
+    for key in ('total_conversations', 'intent_distribution', 'intent_sources', 'p50_response_time',
+                'p95_response_time', 'p99_response_time', 'p95_time_to_first_token'):
+        assert summary[key] == expected[key], key
+    for key in ('avg_response_time', 'avg_time_to_first_token', 'avg_confidence', 'avg_satisfaction',
+                'llm_calls_avoided'):
+        assert summary[key] == pytest.approx(expected[key]), key
+    assert summary['stage_latency_ms']['retrieval'] == pytest.approx(expected['stage_latency_ms']['retrieval'])
+    assert summary['recent']['conversations'] == expected['recent']['conversations']
+
+
+def test_snapshot_merge_equals_one_snapshot_of_everything():
+    now = time.time()
+    a, b, combined = MetricsSnapshot(), MetricsSnapshot(), MetricsSnapshot()
+    log_some(a, 0, 40, now)
+    log_some(b, 1, 25, now)
+    log_some(combined, 0, 40, now)
+    log_some(combined, 1, 25, now)
+    assert_same_summary(a.merge(b).summary(), combined.summary())
+
+
+def test_snapshot_json_round_trip_merges_like_the_original():
+    now = time.time()
+    a, b = MetricsSnapshot(), MetricsSnapshot()
+    log_some(a, 0, 30, now)
+    log_some(b, 1, 30, now)
+    expected = MetricsSnapshot().merge(a).merge(b).summary()
+    restored = MetricsSnapshot.from_dict(json.loads(json.dumps(a.to_dict())))
+    assert_same_summary(restored.merge(MetricsSnapshot.from_dict(b.to_dict())).summary(), expected)
+
+
+def test_aggregator_shards_merge():
+    aggregator = MetricsAggregator(shards=4)
+    for i in range(10):
+        aggregator._local.shard = i % 4
+        aggregator.log_conversation('billing', 0.9, 0.5, intent_source='local')
+    summary = aggregator.snapshot().summary()
+    assert summary['total_conversations'] == 10
+    assert summary['intent_distribution'] == {'billing': 10}
+
+
+def test_sliding_window_forgets_old_buckets():
+    window = SlidingWindow(window_seconds=600, bucket_seconds=60)
+    start = 1_000_000 * 60.0
+    for minute in range(20):
+        window.add(float(minute), now=start + minute * 60)
+    now = start + 19 * 60
+    assert window.totals(now=now) == (10, float(sum(range(10, 20))))
+    assert window.totals(120, now=now) == (2, 37.0)
+    assert window.rate(600, now=now) == pytest.approx(1.0)
+    assert window.mean(60, now=now) == 19.0
+
+
+def test_tracker_memory_does_not_grow_with_traffic():
+    tracker = MetricsTracker(history=100)
+    rng = np.random.default_rng(3)
+    times = rng.exponential(0.8, 20000)
+    for i, response_time in enumerate(times):
+        tracker.log_conversation(['billing', 'data'][i % 2], 0.9, float(response_time), intent_source='local')
+    assert len(tracker.response_times) == 100
+    assert np.array_equal(tracker.response_times.values(), times[-100:])
+    assert len(tracker.stats.response_time_sketch.buckets) < 2048
+    summary = tracker.get_summary()
+    assert summary['total_conversations'] == 20000
+    assert summary['avg_response_time'] == pytest.approx(times.mean())
+    assert summary['p95_response_time'] == pytest.approx(np.percentile(times, 95), rel=0.02)
+    assert summary['intent_distribution'] == {'billing': 10000, 'data': 10000}
+
+
+def test_cluster_snapshot_merges_replicas_and_skips_stale_files(tmp_path):
+    directory = str(tmp_path)
+    this = MetricsAggregator(snapshot_dir=directory, publish_interval=0)
+    other = MetricsAggregator(snapshot_dir=directory, publish_interval=0)
+    gone = MetricsAggregator(snapshot_dir=directory, publish_interval=0)
+    other.replica_id, gone.replica_id = 'other-1', 'gone-2'
+    for aggregator, count in ((this, 3), (other, 2), (gone, 4)):
+        for _ in range(count):
+            aggregator.log_conversation('billing', 0.9, 0.5)
+        aggregator.publish()
+
+    stale = time.time() - this.stale_after - 60
+    os.utime(os.path.join(directory, 'gone-2.json'), (stale, stale))
+    assert this.cluster_snapshot().summary()['total_conversations'] == 5
+    # Another replica's file is skipped, not removed
+    assert sorted(os.listdir(directory)) == sorted([f"{this.replica_id}.json", 'gone-2.json', 'other-1.json'])
+
+
+def test_cluster_snapshot_is_cached_for_the_publish_interval(tmp_path):
+    aggregator = MetricsAggregator(snapshot_dir=str(tmp_path), publish_interval=60)
+    aggregator.log_conversation('billing', 0.9, 0.5)
+    first = aggregator.cluster_snapshot()
+    aggregator.log_conversation('billing', 0.9, 0.5)
+    assert aggregator.cluster_snapshot() is first
+    aggregator._cluster = (None, 0.0)
+    assert aggregator.cluster_snapshot().summary()['total_conversations'] == 2
+
+
+def test_publisher_runs_without_readers(tmp_path):
+    aggregator = MetricsAggregator(snapshot_dir=str(tmp_path), publish_interval=0.01)
+    path = os.path.join(str(tmp_path), f"{aggregator.replica_id}.json")
+    aggregator.start_publisher()
+    try:
+        aggregator.log_conversation('billing', 0.9, 0.5)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    if MetricsSnapshot.from_dict(json.load(f)).response_time.count == 1:
+                        break
+            except (OSError, ValueError):
+                pass
+            time.sleep(0.01)
+        else:
+            pytest.fail("snapshot was not republished")
+    finally:
+        aggregator.stop_publisher()
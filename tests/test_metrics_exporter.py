@@ -0,0 +1,90 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tests.test_chat_engine import make_engine
+from utils.metrics import MetricsAggregator, MetricsSnapshot
+from utils.metrics_exporter import LATENCY_BUCKETS, MetricsExporter, render
+
+
+def samples(body: bytes) -> dict:
+    """{'name{labels}': value} for every sample line"""
+    values = {}
+    for line in body.decode('utf-8').splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+def test_render_counters_and_cumulative_histogram():
+    snapshot = MetricsSnapshot()
+    for response_time in (0.02, 0.2, 0.2, 3.0):
+        snapshot.log_conversation('billing', 0.8, response_time, intent_source='local')
+    snapshot.log_conversation('data_inquiry', 0.6, 40.0, intent_source='ai')
+    values = samples(render(snapshot))
+
+    assert values['smartassist_conversations_total'] == 5
+    assert values['smartassist_intents_total{intent="billing"}'] == 4
+    assert values['smartassist_intent_classifications_total{source="ai"}'] == 1
+    buckets = [values[f'smartassist_response_time_seconds_bucket{{le="{float(bound)!r}"}}']
+               for bound in LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)
+    assert values['smartassist_response_time_seconds_bucket{le="0.025"}'] == 1
+    assert values['smartassist_response_time_seconds_bucket{le="0.25"}'] == 3
+    assert values['smartassist_response_time_seconds_bucket{le="30.0"}'] == 4
+    assert values['smartassist_response_time_seconds_bucket{le="+Inf"}'] == 5
+    assert values['smartassist_response_time_seconds_sum'] == pytest.approx(43.42)
+    assert values['smartassist_response_time_seconds_count'] == 5
+
+
+def test_render_escapes_label_values():
+    snapshot = MetricsSnapshot()
+    snapshot.log_conversation('say "hi"\\now', 0.9, 0.1)
+    assert b'intent="say \\"hi\\"\\\\now"' in render(snapshot)
+
+
+def test_render_includes_engine_caches_and_providers(faq_file, stub_llm):
+    engine = make_engine(faq_file, cache_size=8)
+    engine.generate_response("How do I check my data balance?")
+    engine.generate_response("How do I check my data balance?")
+    values = samples(render(MetricsSnapshot(), chat_engine=engine))
+    assert values['smartassist_cache_hits_total{tier="exact"}'] == 1
+    assert values['smartassist_cache_entries{tier="exact"}'] == 1
+    assert values['smartassist_provider_calls_total{provider="stub"}'] >= 1
+    assert values['smartassist_provider_circuit_state{provider="stub",state="closed"}'] == 1
+
+
+def test_app_exporter_renders_only_local_counters(tmp_path):
+    this = MetricsAggregator(snapshot_dir=str(tmp_path))
+    other = MetricsAggregator(snapshot_dir=str(tmp_path))
+    other.replica_id = 'other-1'
+    this.log_conversation('billing', 0.9, 0.5)
+    for _ in range(3):
+        other.log_conversation('billing', 0.9, 0.5)
+    other.publish()
+
+    assert samples(MetricsExporter(this).body)['smartassist_conversations_total'] == 1
+    # The sidecar merges every replica's file
+    sidecar = MetricsExporter(MetricsAggregator(snapshot_dir=str(tmp_path)), cluster=True)
+    assert samples(sidecar.body)['smartassist_conversations_total'] == 3
+
+
+def test_exporter_serves_the_rendered_body():
+    aggregator = MetricsAggregator()
+    aggregator.log_conversation('billing', 0.9, 0.5)
+    exporter = MetricsExporter(aggregator, interval=60)
+    server = exporter.start(host='127.0.0.1', port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + '/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            body = response.read()
+        assert body == exporter.body
+        assert samples(body)['smartassist_conversations_total'] == 1
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + '/other')
+        assert error.value.code == 404
+    finally:
+        exporter.stop()
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from services.registry import ResourceRegistry
+
+
+class Counter:
+    def __init__(self):
+        self.builds = 0
+
+    def __call__(self):
+        self.builds += 1
+        return {'build': self.builds}
+
+
+def touch(path, content: str):
+    with open(path, 'w') as f:
+        f.write(content)
+    # Make sure the fingerprint changes even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def watched(tmp_path):
+    path = str(tmp_path / 'faqs.json')
+    touch(path, 'v1')
+    return path
+
+
+def test_built_once_and_shared(watched):
+    registry, factory = ResourceRegistry(check_interval=0), Counter()
+    registry.register('engine', factory, watch_files=[watched])
+    first, second = registry.lease('engine'), registry.lease('engine')
+    assert first.get() is second.get() is registry.get('engine')
+    assert factory.builds == 1
+    with pytest.raises(KeyError):
+        registry.get('unknown')
+
+
+def test_leases_follow_a_rebuilt_generation(watched):
+    registry, factory = ResourceRegistry(check_interval=0), Counter()
+    registry.register('model', factory, watch_files=[watched])
+    lease = registry.lease('model')
+    old = lease.get()
+    touch(watched, 'v2')
+    assert lease.get() == {'build': 2}
+    assert registry.footprint()['model']['generation'] == 2
+    # The old generation was given back by the lease that followed the rebuild
+    assert registry.footprint()['model']['retired_generations'] == []
+    assert old == {'build': 1}
+
+
+def test_retired_generation_is_kept_until_released(watched):
+    registry, factory = ResourceRegistry(check_interval=0), Counter()
+    registry.register('model', factory, watch_files=[watched])
+    lease = registry.lease('model')
+    registry.invalidate('model')
+    retired = registry.footprint()['model']['retired_generations']
+    assert [(old['generation'], old['refs']) for old in retired] == [(1, 1)]
+    lease.release()
+    assert registry.footprint()['model']['retired_generations'] == []
+    with pytest.raises(RuntimeError):
+        lease.get()
+
+
+def test_refresh_hook_updates_in_place(watched):
+    registry, factory = ResourceRegistry(check_interval=0), Counter()
+    refreshed = []
+    registry.register('engine', factory, watch_files=[watched],
+                      refresh=lambda value: refreshed.append(value) or True)
+    engine = registry.get('engine')
+    touch(watched, 'v2')
+    assert registry.get('engine') is engine
+    assert refreshed == [engine]
+    assert factory.builds == 1
+    assert registry.footprint()['engine']['generation'] == 2
+    # Applied: the same file state is not refreshed again
+    registry.get('engine')
+    assert len(refreshed) == 1
+
+
+def test_unapplied_refresh_is_retried(watched):
+    registry, factory = ResourceRegistry(check_interval=0), Counter()
+    results = [False, True]
+    calls = []
+
+    def refresh(value):
+        calls.append(value)
+        return results.pop(0)
+
+    registry.register('engine', factory, watch_files=[watched], refresh=refresh)
+    registry.get('engine')
+    touch(watched, 'half')
+    registry.get('engine')
+    assert registry.footprint()['engine']['generation'] == 1
+    # The file is completed without another change to its fingerprint; the next check still retries
+    registry.get('engine')
+    assert len(calls) == 2
+    assert registry.footprint()['engine']['generation'] == 2
+    registry.get('engine')
+    assert len(calls) == 2
+
+
+def test_check_interval_limits_file_checks(watched):
+    registry, factory = ResourceRegistry(check_interval=3600), Counter()
+    registry.register('model', factory, watch_files=[watched])
+    registry.get('model')
+    touch(watched, 'v2')
+    assert registry.get('model') == {'build': 1}
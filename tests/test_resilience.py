@@ -0,0 +1,124 @@
+import pytest
+
+from services import resilience
+from services.ai_service import AIService
+from services.resilience import CircuitBreaker, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code=None, headers=None):
+        super().__init__(f"status {status_code}")
+        if status_code is not None:
+            self.status_code = status_code
+        self.response = type('Response', (), {'headers': headers})() if headers is not None else None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_breaker_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed probe re-opens the breaker for another reset_timeout, without counting a new trip
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_gives_up_on_a_silent_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    clock.now += 5
+    assert not breaker.allow()
+    clock.now += 5
+    assert breaker.allow()
+
+
+def test_only_transient_errors_trip_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(5):
+        AIService._record_error(breaker, ProviderError(401))
+    assert breaker.state == CircuitBreaker.CLOSED
+    AIService._record_error(breaker, ProviderError(503))
+    AIService._record_error(breaker, TimeoutError("read timed out"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize('error, retryable', [
+    (ProviderError(429), True), (ProviderError(503), True), (ProviderError(529), True),
+    (ProviderError(400), False), (ProviderError(401), False), (ProviderError(404), False),
+    (TimeoutError(), True), (ConnectionError(), True), (ValueError("bad json"), False),
+    (RuntimeError("Error code: 429 - rate_limit_exceeded"), True)
+])
+def test_is_retryable(error, retryable):
+    assert RetryPolicy.is_retryable(error) is retryable
+
+
+def test_retry_after_header():
+    assert RetryPolicy.retry_after(ProviderError(429, {'retry-after': '2.5'})) == 2.5
+    assert RetryPolicy.retry_after(ProviderError(429, {'retry-after': 'soon'})) is None
+    assert RetryPolicy.retry_after(ProviderError(429, {})) is None
+    assert RetryPolicy.retry_after(ProviderError(429)) is None
+
+
+def test_delay_honours_retry_after_up_to_max_delay():
+    policy = RetryPolicy(max_retries=3, base_delay=0.5, max_delay=8.0)
+    assert policy.delay(0, retry_after=3.0) == 3.0
+    assert policy.delay(2, retry_after=8.0) == 8.0
+    # Longer than max_delay: better to fail over than to wait
+    assert policy.delay(0, retry_after=20.0) is None
+
+
+def test_delay_backs_off_with_jitter():
+    policy = RetryPolicy(max_retries=5, base_delay=0.5, max_delay=3.0)
+    for attempt, cap in ((0, 0.5), (1, 1.0), (2, 2.0), (3, 3.0), (6, 3.0)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+
+
+def test_retry_delay_uses_the_servers_retry_after():
+    service = AIService.__new__(AIService)
+    service.retry_policy = RetryPolicy(max_retries=2)
+    assert service._retry_delay(ProviderError(429, {'retry-after': '1'}), 0) == 1.0
+    assert service._retry_delay(ProviderError(429, {'retry-after': '1'}), 2) is None
+    assert service._retry_delay(ProviderError(401), 0) is None
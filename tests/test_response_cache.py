@@ -0,0 +1,103 @@
+import pytest
+
+from services import response_cache
+from services.response_cache import ResponseCache, SemanticCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+
+def test_key_depends_on_message_intent_and_context():
+    key = ResponseCache.make_key("How do I buy data?", 'data_inquiry', "FAQ: data")
+    assert ResponseCache.make_key("  how do I BUY data? ", 'data_inquiry', "FAQ: data") == key
+    assert ResponseCache.make_key("How do I buy data?", 'tariff_inquiry', "FAQ: data") != key
+    assert ResponseCache.make_key("How do I buy data?", 'data_inquiry', "FAQ: data, edited") != key
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', {'response': 'A'})
+    cache.set('b', {'response': 'B'})
+    assert cache.get('a') == {'response': 'A'}
+    cache.set('c', {'response': 'C'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'response': 'A'} and cache.get('c') == {'response': 'C'}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set('a', {'response': 'A'})
+    clock.now += 60
+    assert cache.get('a') == {'response': 'A'}
+    clock.now += 1
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['size']) == (1, 1, 1, 0)
+
+
+def test_disk_tier_survives_a_restart(clock, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(db_path=path, ttl=60).set('a', {'response': 'A'})
+    restarted = ResponseCache(db_path=path, ttl=60)
+    assert restarted.get('a') == {'response': 'A'}
+    assert restarted.stats()['disk_hits'] == 1
+    clock.now += 61
+    assert ResponseCache(db_path=path, ttl=60).get('a') is None
+
+
+def test_semantic_hit_needs_the_same_scope_and_words(clock):
+    cache = SemanticCache(capacity=8, threshold=0.7)
+    cache.set("how do i activate roaming", 'roaming_inquiry:faq1', {'response': 'Dial *123#'})
+    assert cache.get("how can i activate roaming?", 'roaming_inquiry:faq1') == {'response': 'Dial *123#'}
+    # Same wording under another intent or best FAQ
+    assert cache.get("how do i activate roaming", 'roaming_inquiry:faq2') is None
+    assert cache.get("how do i activate roaming", 'data_inquiry:faq1') is None
+    # Similar characters, opposite meaning
+    assert cache.get("how do i deactivate roaming", 'roaming_inquiry:faq1') is None
+    assert cache.stats()['rejected'] >= 1
+
+
+def test_semantic_entries_expire(clock):
+    cache = SemanticCache(capacity=8, ttl=60)
+    cache.set("buy data bundle", 'data', {'response': 'A'})
+    clock.now += 61
+    assert cache.get("buy data bundle", 'data') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_repeated_message_updates_its_row(clock):
+    cache = SemanticCache(capacity=4)
+    for i in range(10):
+        cache.set("buy data bundle", 'data', {'response': str(i)})
+    assert cache.stats()['size'] == 1
+    assert cache.get("buy data bundle", 'data') == {'response': '9'}
+    # The same message in another scope takes its own row
+    cache.set("buy data bundle", 'tariff', {'response': 'T'})
+    assert cache.stats()['size'] == 2
+
+
+def test_least_recently_used_row_is_replaced(clock):
+    cache = SemanticCache(capacity=2)
+    cache.set("buy data bundle", 'data', {'response': 'data'})
+    clock.now += 1
+    cache.set("recharge failed", 'recharge', {'response': 'recharge'})
+    clock.now += 1
+    assert cache.get("buy data bundle", 'data') is not None
+    clock.now += 1
+    cache.set("network is slow", 'network', {'response': 'network'})
+    assert cache.get("recharge failed", 'recharge') is None
+    assert cache.get("buy data bundle", 'data') == {'response': 'data'}
+    assert cache.stats()['evictions'] == 1
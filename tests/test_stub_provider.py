@@ -0,0 +1,86 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from services.ai_service import AIService
+from services.stub_provider import StubAPIError, StubClient, StubLLM, serve
+
+INTENTS = ['data_inquiry', 'roaming_inquiry', 'security_issue', 'general_inquiry']
+MESSAGES = [{'role': 'user', 'content': "Customer message: How do I buy data?\n\nAnswer: Dial *312#."}]
+
+
+def intent_prompt(message: str) -> list:
+    return [{'role': 'user', 'content': AIService._intent_prompt(message, INTENTS)}]
+
+
+def test_same_seed_same_plans():
+    a, b = StubLLM(error_rate=0.3, timeout_rate=0.1, seed=7), StubLLM(error_rate=0.3, timeout_rate=0.1, seed=7)
+    assert [a.plan(MESSAGES) for _ in range(50)] == [b.plan(MESSAGES) for _ in range(50)]
+    assert StubLLM(seed=8).plan(MESSAGES) != StubLLM(seed=7).plan(MESSAGES)
+
+
+def test_replies_depend_only_on_the_prompt():
+    llm = StubLLM()
+    assert json.loads(llm.reply(intent_prompt("I lost my phone, block my sim"))) == \
+        {'intent': 'security_issue', 'confidence': 0.92, 'entities': {}}
+    assert json.loads(llm.reply(intent_prompt("hello there")))['intent'] == 'general_inquiry'
+    assert llm.reply(MESSAGES) == "Thanks for reaching out! Dial *312#. If you need more help, dial 180."
+    assert llm.reply(MESSAGES) == StubLLM(seed=99).reply(MESSAGES)
+
+
+def test_failure_rates():
+    llm = StubLLM(error_rate=0.2, timeout_rate=0.1, seed=1)
+    failures = [llm.plan(MESSAGES)[3] for _ in range(5000)]
+    assert failures.count('429') / 5000 == pytest.approx(0.2, abs=0.03)
+    assert failures.count('timeout') / 5000 == pytest.approx(0.1, abs=0.03)
+    assert llm.calls == 5000
+
+
+def test_latency_model():
+    llm = StubLLM(latency_ms=200, latency_sigma=0.0, tokens_per_second=40)
+    chunks, first_token, per_chunk, failure = llm.plan(MESSAGES, max_tokens=3)
+    assert (first_token, per_chunk, failure) == (pytest.approx(0.2), 0.025, None)
+    assert len(chunks) == 3
+
+
+def test_client_raises_provider_style_errors():
+    client = StubClient(StubLLM(latency_ms=0, error_rate=1.0, retry_after=1.5))
+    with pytest.raises(StubAPIError) as raised:
+        client.chat.completions.create(messages=MESSAGES)
+    assert raised.value.status_code == 429
+    assert raised.value.response.headers == {'retry-after': '1.5'}
+
+
+def test_client_streams_the_reply():
+    client = StubClient(StubLLM(latency_ms=0, tokens_per_second=0))
+    stream = client.chat.completions.create(messages=MESSAGES, stream=True)
+    text = "".join(chunk.choices[0].delta.content for chunk in stream)
+    assert text == client.llm.reply(MESSAGES)
+
+
+def test_http_server_speaks_the_openai_wire_format():
+    server = serve(port=0, llm=StubLLM(latency_ms=0, tokens_per_second=0))
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    try:
+        request = urllib.request.Request(url, json.dumps({'messages': MESSAGES}).encode('utf-8'),
+                                         {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = json.load(response)
+        assert body['choices'][0]['message']['content'] == StubLLM().reply(MESSAGES)
+
+        stream = urllib.request.Request(url, json.dumps({'messages': MESSAGES, 'stream': True}).encode('utf-8'),
+                                        {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(stream, timeout=5) as response:
+            events = [line[6:] for line in response.read().decode('utf-8').split('\n') if line.startswith('data: ')]
+        assert events[-1] == '[DONE]'
+        streamed = "".join(json.loads(event)['choices'][0]['delta']['content'] for event in events[:-1])
+        assert streamed == body['choices'][0]['message']['content']
+
+        with pytest.raises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(url.replace('chat/completions', 'models'), b'{}', timeout=5)
+        assert raised.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
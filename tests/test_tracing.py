@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from utils.tracing import Tracer, _current_trace, span
+
+
+def test_spans_outside_a_trace_do_nothing():
+    with span("faq_search") as stage:
+        stage.set(hits=3)
+    assert _current_trace.get() is None
+
+
+def test_trace_records_nested_spans(tmp_path):
+    log = str(tmp_path / 'traces.jsonl')
+    tracer = Tracer(export_path=log)
+    with tracer.trace("generate_response") as trace:
+        assert _current_trace.get() is trace
+        with span("intent"):
+            with span("provider_call", provider='stub') as call:
+                call.set(attempt=0)
+        with span("generation"):
+            pass
+    assert _current_trace.get() is None
+    tracer.close()
+
+    timings = trace.timings()
+    assert set(timings) == {'intent', 'provider_call', 'generation', 'total'}
+    assert timings['total'] >= timings['intent'] >= timings['provider_call']
+    with open(log, encoding='utf-8') as f:
+        record = json.loads(f.readline())
+    spans = {s['name']: s for s in record['spans']}
+    assert spans['provider_call']['parent'] == 'intent'
+    assert spans['provider_call']['provider'] == 'stub' and spans['provider_call']['attempt'] == 0
+    assert 'parent' not in spans['generation']
+
+
+def test_span_records_errors():
+    with Tracer().trace("request") as trace:
+        with pytest.raises(ValueError):
+            with span("generation"):
+                raise ValueError("bad reply")
+    assert trace.to_dict()['spans'][0]['error'] == 'ValueError'
+
+
+def test_disabled_tracer_records_nothing():
+    with Tracer(enabled=False).trace("request") as trace:
+        assert trace is None
+        with span("intent"):
+            pass
+        assert _current_trace.get() is None
+
+
+def test_spans_in_worker_threads_join_the_trace():
+    async def handle():
+        with Tracer().trace("agenerate_response") as trace:
+            def search():
+                with span("faq_search"):
+                    pass
+            await asyncio.gather(asyncio.to_thread(search), asyncio.to_thread(search))
+        return trace
+
+    assert [s.name for s in asyncio.run(handle()).spans] == ['faq_search', 'faq_search']
@@ -1,49 +1,545 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import itertools
+import json
+import math
+import os
+import socket
+import threading
 import time
 
-class MetricsTracker:
-    """Track application metrics"""
-    
+import numpy as np
+
+
+class RingBuffer:
+    """Most recent `capacity` values in a preallocated NumPy array"""
+
+    def __init__(self, capacity: int = 1000, dtype=np.float64):
+        self._values = np.zeros(capacity, dtype=dtype)
+        self._next = 0
+        self._size = 0
+
+    def append(self, value: float):
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self._size = min(self._size + 1, len(self._values))
+
+    def values(self) -> np.ndarray:
+        """Stored values, oldest first"""
+        if self._size < len(self._values):
+            return self._values[:self._size].copy()
+        return np.concatenate((self._values[self._next:], self._values[:self._next]))
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class RunningStat:
+    """Count, mean, min and max in O(1) memory"""
+
     def __init__(self):
-        self.conversation_metrics = []
-        self.response_times = []
-        self.satisfaction_scores = []
-    
-    def log_conversation(self, intent: str, confidence: float, response_time: float):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def merge(self, other: 'RunningStat'):
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> Dict:
+        if not self.count:
+            return {'count': 0, 'total': 0.0}
+        return {'count': self.count, 'total': self.total, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStat':
+        stat = cls()
+        stat.count = data['count']
+        stat.total = data['total']
+        stat.min = data.get('min', math.inf)
+        stat.max = data.get('max', -math.inf)
+        return stat
+
+
+class QuantileSketch:
+    """Streaming quantiles over log-spaced buckets (the DDSketch scheme).
+
+    Any quantile is within relative_accuracy of the true value. Memory depends
+    on the spread of the values, not their number: about 1,200 buckets cover
+    1 microsecond to 3 hours at 1%. Past max_buckets the lowest buckets are
+    merged, which only blurs the bottom of the distribution. Sketches with the
+    same accuracy merge exactly.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = self.key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def key(self, value: float) -> int:
+        """Bucket index of a positive value"""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Representative value of a bucket: the midpoint of (gamma^(key-1), gamma^key]"""
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def cumulative_counts(self, bounds: List[float]) -> List[int]:
+        """How many values fall at or below each bound (sorted ascending), for histogram export"""
+        counts = [self.zero_count] * len(bounds)
+        for key, count in self.buckets.items():
+            value = self.value(key)
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    counts[i] += count
+        return counts
+
+    def _collapse(self):
+        keys = sorted(self.buckets)
+        lowest, second = keys[0], keys[1]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1), 0 when empty"""
+        if not self.count:
+            return 0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.buckets))
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can only merge sketches with the same relative_accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def to_dict(self) -> Dict:
+        return {'relative_accuracy': self.relative_accuracy, 'count': self.count, 'zero_count': self.zero_count,
+                'buckets': {str(key): count for key, count in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.count = data['count']
+        sketch.zero_count = data['zero_count']
+        sketch.buckets = {int(key): count for key, count in data['buckets'].items()}
+        return sketch
+
+
+class SlidingWindow:
+    """Event counts and value sums over the last window_seconds, in fixed time buckets"""
+
+    def __init__(self, window_seconds: float = 3600, bucket_seconds: float = 60):
+        self.bucket_seconds = bucket_seconds
+        slots = math.ceil(window_seconds / bucket_seconds)
+        self._epochs = np.full(slots, -1, dtype=np.int64)
+        self._counts = np.zeros(slots, dtype=np.int64)
+        self._sums = np.zeros(slots)
+
+    @property
+    def window_seconds(self) -> float:
+        return len(self._epochs) * self.bucket_seconds
+
+    def add(self, value: float = 0.0, now: Optional[float] = None):
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        slot = epoch % len(self._epochs)
+        if self._epochs[slot] != epoch:
+            # Slot last held a bucket that has since slid out of the window
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+            self._sums[slot] = 0.0
+        self._counts[slot] += 1
+        self._sums[slot] += value
+
+    def totals(self, seconds: Optional[float] = None, now: Optional[float] = None) -> Tuple[int, float]:
+        """(count, sum) over the last `seconds` (whole buckets, capped at the window)"""
+        seconds = self.window_seconds if seconds is None else min(seconds, self.window_seconds)
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        buckets = max(1, math.ceil(seconds / self.bucket_seconds))
+        live = (self._epochs > current - buckets) & (self._epochs <= current)
+        return int(self._counts[live].sum()), float(self._sums[live].sum())
+
+    def rate(self, seconds: Optional[float] = None, now: Optional[float] = None) -> float:
+        """Events per minute over the last `seconds`"""
+        seconds = self.window_seconds if seconds is None else min(seconds, self.window_seconds)
+        count, _ = self.totals(seconds, now)
+        return count / (seconds / 60)
+
+    def mean(self, seconds: Optional[float] = None, now: Optional[float] = None) -> float:
+        """Mean value over the last `seconds`"""
+        count, total = self.totals(seconds, now)
+        return total / count if count else 0
+
+    def merge(self, other: 'SlidingWindow'):
+        """Add another window's buckets; both must use the same bucket size and length"""
+        if other.bucket_seconds != self.bucket_seconds or len(other._epochs) != len(self._epochs):
+            raise ValueError("Can only merge sliding windows with the same bucket_seconds and window")
+        for slot in np.flatnonzero(other._epochs >= 0):
+            epoch = other._epochs[slot]
+            if self._epochs[slot] > epoch:
+                continue
+            if self._epochs[slot] < epoch:
+                self._epochs[slot] = epoch
+                self._counts[slot] = 0
+                self._sums[slot] = 0.0
+            self._counts[slot] += other._counts[slot]
+            self._sums[slot] += other._sums[slot]
+
+    def to_dict(self) -> Dict:
+        live = np.flatnonzero(self._epochs >= 0)
+        return {'window_seconds': self.window_seconds, 'bucket_seconds': self.bucket_seconds,
+                'epochs': self._epochs[live].tolist(), 'counts': self._counts[live].tolist(),
+                'sums': self._sums[live].tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SlidingWindow':
+        window = cls(data['window_seconds'], data['bucket_seconds'])
+        epochs = np.array(data['epochs'], dtype=np.int64)
+        slots = epochs % len(window._epochs)
+        window._epochs[slots] = epochs
+        window._counts[slots] = data['counts']
+        window._sums[slots] = data['sums']
+        return window
+
+
+class MetricsSnapshot:
+    """Running aggregates for a set of conversations.
+
+    Everything in it merges exactly (counts, sums, sketches, time buckets),
+    so snapshots from sessions, shards or whole app replicas can be combined,
+    and to_dict()/from_dict() carry them between processes as plain JSON.
+    """
+
+    def __init__(self, window_seconds: float = 3600):
+        self.response_time = RunningStat()
+        self.response_time_sketch = QuantileSketch()
+        self.first_token = RunningStat()
+        self.first_token_sketch = QuantileSketch()
+        self.confidence = RunningStat()
+        self.satisfaction = RunningStat()
+        self.intent_counts: Dict[str, int] = {}
+        self.intent_sources: Dict[str, int] = {}
+        self.stage_times: Dict[str, RunningStat] = {}
+        self.stage_sketches: Dict[str, QuantileSketch] = {}
+        self.recent = SlidingWindow(window_seconds)
+
+    def log_conversation(self, intent: str, confidence: float, response_time: float,
+                         intent_source: str = None, time_to_first_token: float = None,
+                         timings: Dict[str, float] = None, now: Optional[float] = None):
+        self.intent_counts[intent] = self.intent_counts.get(intent, 0) + 1
+        self.confidence.add(confidence)
+        self.response_time.add(response_time)
+        self.response_time_sketch.add(response_time)
+        self.recent.add(response_time, now)
+        if time_to_first_token is not None:
+            self.first_token.add(time_to_first_token)
+            self.first_token_sketch.add(time_to_first_token)
+        if intent_source:
+            self.intent_sources[intent_source] = self.intent_sources.get(intent_source, 0) + 1
+        for stage, ms in (timings or {}).items():
+            self.stage_times.setdefault(stage, RunningStat()).add(ms)
+            self.stage_sketches.setdefault(stage, QuantileSketch()).add(ms)
+
+    def log_satisfaction(self, score: int):
+        self.satisfaction.add(score)
+
+    def merge(self, other: 'MetricsSnapshot') -> 'MetricsSnapshot':
+        """Fold another snapshot into this one and return self"""
+        for name in ('response_time', 'response_time_sketch', 'first_token', 'first_token_sketch',
+                     'confidence', 'satisfaction', 'recent'):
+            getattr(self, name).merge(getattr(other, name))
+        for counts, others in ((self.intent_counts, other.intent_counts),
+                               (self.intent_sources, other.intent_sources)):
+            for key, count in others.items():
+                counts[key] = counts.get(key, 0) + count
+        for stage, stat in other.stage_times.items():
+            self.stage_times.setdefault(stage, RunningStat()).merge(stat)
+        for stage, sketch in other.stage_sketches.items():
+            self.stage_sketches.setdefault(stage, QuantileSketch(sketch.relative_accuracy)).merge(sketch)
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'response_time': self.response_time.to_dict(),
+            'response_time_sketch': self.response_time_sketch.to_dict(),
+            'first_token': self.first_token.to_dict(),
+            'first_token_sketch': self.first_token_sketch.to_dict(),
+            'confidence': self.confidence.to_dict(),
+            'satisfaction': self.satisfaction.to_dict(),
+            'intent_counts': dict(self.intent_counts),
+            'intent_sources': dict(self.intent_sources),
+            'stage_times': {stage: stat.to_dict() for stage, stat in self.stage_times.items()},
+            'stage_sketches': {stage: sketch.to_dict() for stage, sketch in self.stage_sketches.items()},
+            'recent': self.recent.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MetricsSnapshot':
+        snapshot = cls()
+        for name in ('response_time', 'first_token', 'confidence', 'satisfaction'):
+            setattr(snapshot, name, RunningStat.from_dict(data[name]))
+        for name in ('response_time_sketch', 'first_token_sketch'):
+            setattr(snapshot, name, QuantileSketch.from_dict(data[name]))
+        snapshot.intent_counts = dict(data['intent_counts'])
+        snapshot.intent_sources = dict(data['intent_sources'])
+        snapshot.stage_times = {stage: RunningStat.from_dict(stat) for stage, stat in data['stage_times'].items()}
+        snapshot.stage_sketches = {stage: QuantileSketch.from_dict(sketch)
+                                   for stage, sketch in data.get('stage_sketches', {}).items()}
+        snapshot.recent = SlidingWindow.from_dict(data['recent'])
+        return snapshot
+
+    def summary(self) -> Dict:
+        """Summary in the shape MetricsTracker.get_summary returns"""
+        local = self.intent_sources.get('local', 0)
+        classified = sum(self.intent_sources.values())
+        return {
+            'total_conversations': self.response_time.count,
+            'avg_response_time': self.response_time.mean,
+            'p50_response_time': self.response_time_sketch.quantile(0.5),
+            'p95_response_time': self.response_time_sketch.quantile(0.95),
+            'p99_response_time': self.response_time_sketch.quantile(0.99),
+            'avg_time_to_first_token': self.first_token.mean,
+            'p95_time_to_first_token': self.first_token_sketch.quantile(0.95),
+            'avg_confidence': self.confidence.mean,
+            'avg_satisfaction': self.satisfaction.mean,
+            'intent_distribution': dict(self.intent_counts),
+            'intent_sources': dict(self.intent_sources),
+            'llm_calls_avoided': local / classified if classified else 0,
+            'stage_latency_ms': {stage: stat.mean for stage, stat in self.stage_times.items()},
+            'recent': self.window(5)
+        }
+
+    def window(self, minutes: float = 5) -> Dict:
+        """Conversation rate and mean response time over the last `minutes`"""
+        seconds = minutes * 60
+        return {
+            'minutes': min(minutes, self.recent.window_seconds / 60),
+            'conversations': self.recent.totals(seconds)[0],
+            'conversations_per_minute': self.recent.rate(seconds),
+            'avg_response_time': self.recent.mean(seconds)
+        }
+
+
+class MetricsAggregator:
+    """Process-wide metrics that every session's MetricsTracker reports into.
+
+    Writes go to one of `shards` MetricsSnapshots, picked per thread, so
+    concurrent sessions rarely contend for the same lock; snapshot() merges
+    the shards. With snapshot_dir, start_publisher() writes this process's
+    snapshot there as JSON every publish_interval seconds, whether or not
+    anything reads it, and cluster_snapshot() merges in the other replicas'
+    files. Files not updated for stale_after seconds belong to replicas that
+    have gone away and are skipped (never deleted: the directory may be
+    shared, and a slow replica's file is not ours to remove). The merged
+    result is cached for publish_interval seconds.
+    """
+
+    def __init__(self, shards: int = 8, window_seconds: float = 3600, snapshot_dir: Optional[str] = None,
+                 publish_interval: float = 5.0, stale_after: float = 300.0):
+        self.window_seconds = window_seconds
+        self.snapshot_dir = snapshot_dir
+        self.publish_interval = publish_interval
+        self.stale_after = stale_after
+        self.replica_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._shards = [(threading.Lock(), MetricsSnapshot(window_seconds)) for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self._publish_lock = threading.Lock()
+        self._publisher: Optional[threading.Thread] = None
+        self._stop_publisher = threading.Event()
+        # (merged snapshot, time.time() it was built) served by cluster_snapshot()
+        self._cluster: Tuple[Optional[MetricsSnapshot], float] = (None, 0.0)
+
+    def _shard(self) -> Tuple[threading.Lock, MetricsSnapshot]:
+        index = getattr(self._local, 'shard', None)
+        if index is None:
+            # Round-robin on first use; thread ids are aligned addresses and hash poorly
+            index = self._local.shard = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    def log_conversation(self, *args, **kwargs):
+        lock, shard = self._shard()
+        with lock:
+            shard.log_conversation(*args, **kwargs)
+
+    def log_satisfaction(self, score: int):
+        lock, shard = self._shard()
+        with lock:
+            shard.log_satisfaction(score)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Merged copy of every shard in this process"""
+        merged = MetricsSnapshot(self.window_seconds)
+        for lock, shard in self._shards:
+            with lock:
+                merged.merge(shard)
+        return merged
+
+    def publish(self, snapshot: Optional[MetricsSnapshot] = None):
+        """Atomically write this process's snapshot to snapshot_dir/<replica_id>.json"""
+        if not self.snapshot_dir:
+            return
+        snapshot = snapshot or self.snapshot()
+        path = os.path.join(self.snapshot_dir, f"{self.replica_id}.json")
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(snapshot.to_dict(), f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Error publishing metrics snapshot {path}: {e}")
+
+    def start_publisher(self):
+        """Publish this process's snapshot every publish_interval seconds from a background thread"""
+        if not self.snapshot_dir or (self._publisher and self._publisher.is_alive()):
+            return
+        self._stop_publisher.clear()
+
+        def run():
+            self.publish()
+            while not self._stop_publisher.wait(self.publish_interval):
+                self.publish()
+
+        self._publisher = threading.Thread(target=run, name="metrics-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop_publisher(self):
+        """Stop the background publisher"""
+        self._stop_publisher.set()
+
+    def cluster_snapshot(self) -> MetricsSnapshot:
+        """This process merged with every fresh replica snapshot in snapshot_dir.
+
+        The result is shared by all callers for publish_interval seconds, so
+        frequent dashboard reruns cost one merge and one directory scan per
+        interval; treat it as read-only.
+        """
+        with self._publish_lock:
+            cached, built = self._cluster
+            if cached is not None and time.time() - built < self.publish_interval:
+                return cached
+            merged = self.snapshot()
+            if self.snapshot_dir:
+                self._merge_replicas(merged)
+            self._cluster = (merged, time.time())
+            return merged
+
+    def _merge_replicas(self, merged: MetricsSnapshot):
+        """Merge the other replicas' fresh snapshot files into `merged`"""
+        try:
+            names = os.listdir(self.snapshot_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.snapshot_dir, name)
+            if not name.endswith('.json') or name == f"{self.replica_id}.json":
+                continue
+            try:
+                # Replica ids are hostname-pid, so a restarted replica never rewrites an old file
+                if time.time() - os.path.getmtime(path) > self.stale_after:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    merged.merge(MetricsSnapshot.from_dict(json.load(f)))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error reading metrics snapshot {path}: {e}")
+
+
+class MetricsTracker:
+    """Track one session's metrics in bounded memory.
+
+    Totals, means and intent counts are running aggregates, latency
+    percentiles come from quantile sketches, and recent activity is kept in
+    per-minute buckets for the last window_seconds. Only the last `history`
+    response times are kept verbatim. Events are also reported to the
+    process-wide MetricsAggregator and persisted by the MetricsStore, when
+    given, for service-wide and historical numbers.
+    """
+
+    def __init__(self, history: int = 1000, window_seconds: float = 3600, store=None,
+                 session_id: Optional[str] = None, aggregator: Optional[MetricsAggregator] = None):
+        self.store = store
+        self.aggregator = aggregator
+        self.session_id = session_id
+        self.response_times = RingBuffer(history)
+        self.stats = MetricsSnapshot(window_seconds)
+
+    def log_conversation(self, intent: str, confidence: float, response_time: float,
+                         intent_source: str = None, time_to_first_token: float = None,
+                         timings: Dict[str, float] = None):
         """Log conversation metrics"""
-        self.conversation_metrics.append({
-            'intent': intent,
-            'confidence': confidence,
-            'timestamp': time.time()
-        })
         self.response_times.append(response_time)
-    
+        self.stats.log_conversation(intent, confidence, response_time, intent_source, time_to_first_token, timings)
+        if self.aggregator is not None:
+            self.aggregator.log_conversation(intent, confidence, response_time, intent_source,
+                                             time_to_first_token, timings)
+        if self.store is not None:
+            self.store.record_conversation(intent, confidence, response_time, intent_source,
+                                           time_to_first_token, session=self.session_id)
+
     def log_satisfaction(self, score: int):
         """Log customer satisfaction score (1-5)"""
         if 1 <= score <= 5:
-            self.satisfaction_scores.append(score)
-    
-    def get_summary(self) -> Dict:
-        """Get metrics summary"""
-        if not self.conversation_metrics:
-            return {
-                'total_conversations': 0,
-                'avg_response_time': 0,
-                'avg_satisfaction': 0
-            }
-        
-        return {
-            'total_conversations': len(self.conversation_metrics),
-            'avg_response_time': sum(self.response_times) / len(self.response_times) if self.response_times else 0,
-            'avg_confidence': sum(m['confidence'] for m in self.conversation_metrics) / len(self.conversation_metrics),
-            'avg_satisfaction': sum(self.satisfaction_scores) / len(self.satisfaction_scores) if self.satisfaction_scores else 0,
-            'intent_distribution': self._get_intent_distribution()
-        }
-    
-    def _get_intent_distribution(self) -> Dict:
-        """Get distribution of intents"""
-        intents = [m['intent'] for m in self.conversation_metrics]
-        distribution = {}
-        for intent in intents:
-            distribution[intent] = distribution.get(intent, 0) + 1
-        return distribution
+            self.stats.log_satisfaction(score)
+            if self.aggregator is not None:
+                self.aggregator.log_satisfaction(score)
+            if self.store is not None:
+                self.store.record_satisfaction(score, session=self.session_id)
+
+    def get_summary(self, history_hours: Optional[float] = None, scope: str = 'session') -> Dict:
+        """Get metrics summary; O(1) in the number of conversations logged.
+
+        scope='service' reports every session across all app replicas (via
+        the aggregator) instead of this one. With history_hours and a store,
+        'history' holds the all-session totals for that many hours, read
+        from the store's rollups.
+        """
+        if scope == 'service' and self.aggregator is not None:
+            summary = self.aggregator.cluster_snapshot().summary()
+        else:
+            summary = self.stats.summary()
+        if history_hours is not None and self.store is not None:
+            summary['history'] = self.store.summary(history_hours)
+        return summary
+
+    def get_window(self, minutes: float = 5) -> Dict:
+        """Conversation rate and mean response time over the last `minutes`"""
+        return self.stats.window(minutes)
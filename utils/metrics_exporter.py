@@ -0,0 +1,255 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from utils.metrics import MetricsAggregator, MetricsSnapshot, QuantileSketch, RunningStat
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+STAGE_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Writer:
+    """Accumulates exposition-format lines, one HELP/TYPE header per metric family"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> str:
+        name = f"{self.prefix}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def sample(self, name: str, value: float, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {_number(value)}")
+
+    def metric(self, name: str, kind: str, help_text: str, value: float, **labels):
+        self.sample(self.family(name, kind, help_text), value, **labels)
+
+    def histogram(self, name: str, sketch: QuantileSketch, stat: RunningStat, bounds: List[float],
+                  scale: float = 1.0, **labels):
+        """Cumulative buckets from a quantile sketch; scale converts the sketch's unit to the bounds'"""
+        counts = sketch.cumulative_counts([bound * scale for bound in bounds])
+        for bound, count in zip(bounds, counts):
+            self.sample(f"{name}_bucket", count, le=repr(float(bound)), **labels)
+        self.sample(f"{name}_bucket", sketch.count, le="+Inf", **labels)
+        self.sample(f"{name}_sum", stat.total / scale, **labels)
+        self.sample(f"{name}_count", stat.count, **labels)
+
+    def text(self) -> bytes:
+        return ("\n".join(self.lines) + "\n").encode('utf-8')
+
+
+def render(snapshot: MetricsSnapshot, chat_engine=None, churn_predictor=None, churn_scoring=None,
+           prefix: str = "smartassist") -> bytes:
+    """Prometheus text exposition of conversation, stage, cache, provider and churn-scoring metrics"""
+    out = _Writer(prefix)
+
+    out.metric("conversations_total", "counter", "Conversations handled", snapshot.response_time.count)
+    name = out.family("intents_total", "counter", "Conversations by detected intent")
+    for intent, count in sorted(snapshot.intent_counts.items()):
+        out.sample(name, count, intent=intent)
+    name = out.family("intent_classifications_total", "counter", "Intent classifications by source (local model or LLM)")
+    for source, count in sorted(snapshot.intent_sources.items()):
+        out.sample(name, count, source=source)
+    out.metric("conversations_per_minute", "gauge", "Conversation rate over the last 5 minutes",
+               snapshot.recent.rate(300))
+
+    name = out.family("response_time_seconds", "histogram", "End-to-end response time")
+    out.histogram(name, snapshot.response_time_sketch, snapshot.response_time, LATENCY_BUCKETS)
+    name = out.family("time_to_first_token_seconds", "histogram", "Time to the first streamed token")
+    out.histogram(name, snapshot.first_token_sketch, snapshot.first_token, LATENCY_BUCKETS)
+    # Stage timings are recorded in milliseconds
+    name = out.family("stage_duration_seconds", "histogram", "Time spent per pipeline stage (from request traces)")
+    for stage in sorted(snapshot.stage_sketches):
+        if stage != 'total':
+            out.histogram(name, snapshot.stage_sketches[stage], snapshot.stage_times[stage], STAGE_BUCKETS,
+                          scale=1000, stage=stage)
+
+    out.metric("intent_confidence_sum", "counter", "Sum of intent confidences", snapshot.confidence.total)
+    out.metric("satisfaction_score_sum", "counter", "Sum of 1-5 satisfaction ratings", snapshot.satisfaction.total)
+    out.metric("satisfaction_ratings_total", "counter", "Satisfaction ratings given", snapshot.satisfaction.count)
+
+    if chat_engine is not None:
+        _render_caches(out, chat_engine)
+        _render_providers(out, chat_engine.ai_service.health())
+    if churn_predictor is not None:
+        stats = dict(churn_predictor.scoring_stats)
+        out.metric("churn_scoring_calls_total", "counter", "Churn scoring calls", stats['calls'])
+        out.metric("churn_scoring_rows_total", "counter", "Customers scored", stats['rows'])
+        out.metric("churn_scoring_seconds_total", "counter", "Time spent scoring", stats['seconds'])
+    if churn_scoring is not None:
+        _render_churn_service(out, churn_scoring)
+    return out.text()
+
+
+def _render_churn_service(out: _Writer, service):
+    stats = service.stats()
+    out.metric("churn_service_requests_total", "counter", "On-demand churn scoring requests answered",
+               stats['requests'])
+    out.metric("churn_service_rejected_total", "counter", "Requests rejected because the scoring queue was full",
+               stats['rejected'])
+    out.metric("churn_service_errors_total", "counter", "Micro-batches that failed to score", stats['errors'])
+    out.metric("churn_service_queue_depth", "gauge", "Requests waiting to be batched", stats['queue_depth'])
+    out.metric("churn_service_queue_capacity", "gauge", "Scoring queue bound", stats['max_queue'])
+    # Batch sizes are counted exactly, so the buckets are too
+    name = out.family("churn_service_batch_size", "histogram", "Requests per scored micro-batch")
+    for bound in BATCH_SIZE_BUCKETS:
+        out.sample(f"{name}_bucket", sum(count for size, count in stats['batch_sizes'].items() if size <= bound),
+                   le=repr(float(bound)))
+    out.sample(f"{name}_bucket", stats['batches'], le="+Inf")
+    out.sample(f"{name}_sum", stats['requests'])
+    out.sample(f"{name}_count", stats['batches'])
+    name = out.family("churn_service_latency_seconds", "histogram", "Request latency, queueing included")
+    out.histogram(name, *service.latency(), STAGE_BUCKETS)
+
+
+def _render_caches(out: _Writer, chat_engine):
+    tiers = {'exact': chat_engine.response_cache, 'semantic': chat_engine.semantic_cache}
+    stats = {tier: cache.stats() for tier, cache in tiers.items() if cache is not None}
+    for counter, help_text in (('hits', "Reply cache hits"), ('misses', "Reply cache misses"),
+                               ('evictions', "Reply cache evictions")):
+        name = out.family(f"cache_{counter}_total", "counter", help_text)
+        for tier, values in stats.items():
+            value = values.get(counter, 0) + (values.get('disk_hits', 0) if counter == 'hits' else 0)
+            out.sample(name, value, tier=tier)
+    name = out.family("cache_entries", "gauge", "Live reply cache entries")
+    for tier, values in stats.items():
+        out.sample(name, values['size'], tier=tier)
+
+
+def _render_providers(out: _Writer, health: Dict[str, Dict]):
+    for counter, help_text in (('calls', "Provider attempts"), ('errors', "Failed provider attempts"),
+                               ('retries', "Provider retries"), ('failovers', "Failovers to this provider"),
+                               ('trips', "Circuit breaker trips")):
+        name = out.family(f"provider_{counter}_total", "counter", help_text)
+        for provider, info in health.items():
+            out.sample(name, info[counter], provider=provider)
+    name = out.family("provider_circuit_state", "gauge", "1 for the provider's current circuit breaker state")
+    for provider, info in health.items():
+        for state in ('closed', 'open', 'half_open'):
+            out.sample(name, int(info['state'] == state), provider=provider, state=state)
+    name = out.family("provider_latency_seconds", "gauge", "Provider call latency percentiles over the recent window")
+    for provider, info in health.items():
+        for q in (50, 95, 99):
+            out.sample(name, info[f'p{q}_latency'], provider=provider, quantile=str(q / 100))
+
+
+class MetricsExporter:
+    """Serves /metrics from a body re-rendered every `interval` seconds.
+
+    Rendering (merging shards, reading cache and provider stats) runs on its
+    own thread, so a scrape only writes out the last pre-rendered bytes.
+    chat_engine, churn_predictor and churn_scoring are callables returning
+    the current shared objects (or None), since the registry may swap them.
+
+    An exporter inside the app renders only this process's counters:
+    Prometheus sums them across scrape targets, and a merged total would
+    be counted once per replica and drop whenever a replica's file expires.
+    cluster=True merges the replica snapshot files instead, for the sidecar
+    that is the only target scraped for conversation metrics.
+    """
+
+    def __init__(self, aggregator: MetricsAggregator, chat_engine: Optional[Callable] = None,
+                 churn_predictor: Optional[Callable] = None, churn_scoring: Optional[Callable] = None,
+                 interval: float = 5.0, cluster: bool = False):
+        self.aggregator = aggregator
+        self.cluster = cluster
+        self.chat_engine = chat_engine
+        self.churn_predictor = churn_predictor
+        self.churn_scoring = churn_scoring
+        self.interval = interval
+        self.render_seconds = 0.0
+        self.body = b""
+        self.server = None
+        self._stop = threading.Event()
+        self.refresh()
+
+    def refresh(self):
+        """Re-render the exposition body now"""
+        start = time.perf_counter()
+        try:
+            snapshot = self.aggregator.cluster_snapshot() if self.cluster else self.aggregator.snapshot()
+            body = render(snapshot,
+                          self.chat_engine() if self.chat_engine else None,
+                          self.churn_predictor() if self.churn_predictor else None,
+                          self.churn_scoring() if self.churn_scoring else None)
+        except Exception as e:
+            print(f"Error rendering metrics: {e}")
+            return
+        self.render_seconds = time.perf_counter() - start
+        self.body = body + (f"# HELP smartassist_metrics_render_seconds Time to render this page\n"
+                            f"# TYPE smartassist_metrics_render_seconds gauge\n"
+                            f"smartassist_metrics_render_seconds {self.render_seconds!r}\n").encode('utf-8')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self, host: str = '0.0.0.0', port: int = 9464) -> ThreadingHTTPServer:
+        """Serve on a background thread and keep the body fresh"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = exporter.body
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True).start()
+        threading.Thread(target=self._run, name="metrics-renderer", daemon=True).start()
+        return self.server
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Sidecar /metrics endpoint: merges the conversation snapshots app replicas publish")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=9464)
+    parser.add_argument('--snapshot-dir', default='data/metrics_snapshots')
+    parser.add_argument('--interval', type=float, default=5.0)
+    args = parser.parse_args()
+    exporter = MetricsExporter(MetricsAggregator(snapshot_dir=args.snapshot_dir),
+                               interval=args.interval, cluster=True)
+    exporter.start(args.host, args.port)
+    print(f"Serving metrics on http://{args.host}:{args.port}/metrics")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        exporter.stop()
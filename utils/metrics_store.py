@@ -0,0 +1,285 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import QuantileSketch
+
+MINUTE = 60
+HOUR = 3600
+
+# Rollup columns summed on upsert (response_time_max is the only non-sum)
+_SUMS = ('conversations', 'response_time_sum', 'confidence_sum', 'first_token_count', 'first_token_sum',
+         'local_intents', 'classified_intents', 'satisfaction_count', 'satisfaction_sum')
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS events (ts REAL NOT NULL, session TEXT, kind TEXT NOT NULL, intent TEXT, "
+    "confidence REAL, response_time REAL, first_token REAL, intent_source TEXT, satisfaction INTEGER)",
+    "CREATE INDEX IF NOT EXISTS events_ts ON events (ts)",
+    "CREATE TABLE IF NOT EXISTS rollups (resolution INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+    "intent TEXT NOT NULL, " + ", ".join(f"{column} REAL NOT NULL DEFAULT 0" for column in _SUMS) +
+    ", response_time_max REAL NOT NULL DEFAULT 0, PRIMARY KEY (resolution, bucket, intent))",
+    "CREATE TABLE IF NOT EXISTS latency_rollups (resolution INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+    "key INTEGER NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (resolution, bucket, key))"
+]
+
+# Fills classified_intents in a database created before the column existed: recounted from
+# the raw events where they are still kept, else all conversations (the old denominator)
+_BACKFILL_CLASSIFIED = (
+    "UPDATE rollups SET classified_intents = CASE WHEN bucket + resolution > (SELECT MIN(ts) FROM events) THEN "
+    "(SELECT COUNT(*) FROM events WHERE ts >= rollups.bucket AND ts < rollups.bucket + rollups.resolution "
+    "AND kind = 'conversation' AND intent_source IS NOT NULL AND intent_source != '' "
+    "AND COALESCE(intent, '') = rollups.intent) ELSE conversations END"
+)
+
+_STOP = object()
+
+
+class MetricsStore:
+    """Append-only SQLite store for conversation metrics, shared by every session.
+
+    record_* calls only enqueue the event; a background thread writes
+    batches (up to batch_size events, or whatever arrived within
+    flush_interval) in one transaction. Raw events go to `events`, and the
+    same transaction folds them into per-minute and per-hour rollups per
+    intent, plus latency histograms. Queries read only the rollups, so their
+    cost depends on the time range and not on how many events were logged.
+    If the queue is full, events are dropped (and counted) rather than
+    blocking the chat path.
+    """
+
+    def __init__(self, db_path: str = "data/metrics.db", batch_size: int = 256, flush_interval: float = 1.0,
+                 max_queue: int = 10000, retention_days: float = 30, minute_retention_days: float = 7):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.minute_retention_days = minute_retention_days
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._sketch = QuantileSketch()
+        self._stats = {'written': 0, 'dropped': 0, 'batches': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._migrate()
+        self._db.commit()
+
+        self._writer = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _migrate(self):
+        """Add rollup columns introduced after the database was created"""
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(rollups)")}
+        for column in _SUMS:
+            if column not in existing:
+                self._db.execute(f"ALTER TABLE rollups ADD COLUMN {column} REAL NOT NULL DEFAULT 0")
+                if column == 'classified_intents':
+                    self._db.execute(_BACKFILL_CLASSIFIED)
+
+    # Recording (called on the chat path; never blocks)
+
+    def record_conversation(self, intent: str, confidence: float, response_time: float,
+                            intent_source: Optional[str] = None, time_to_first_token: Optional[float] = None,
+                            session: Optional[str] = None, timestamp: Optional[float] = None):
+        self._put((timestamp or time.time(), session, 'conversation', intent, confidence, response_time,
+                   time_to_first_token, intent_source, None))
+
+    def record_satisfaction(self, score: int, session: Optional[str] = None, timestamp: Optional[float] = None):
+        self._put((timestamp or time.time(), session, 'satisfaction', None, None, None, None, None, score))
+
+    def _put(self, event: Tuple):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until everything recorded so far is written"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10)
+
+    # Background writer
+
+    def _run(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            batch, waiters, stop = self._next_batch()
+            if batch:
+                self._write(db, batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                db.close()
+                return
+
+    def _next_batch(self) -> Tuple[List[Tuple], List[threading.Event], bool]:
+        """Block for one event, then gather more until batch_size or flush_interval"""
+        batch, waiters = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is _STOP:
+                return batch, waiters, True
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                return batch, waiters, False
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, waiters, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, waiters, False
+
+    def _write(self, db: sqlite3.Connection, batch: List[Tuple]):
+        rollups: Dict[Tuple, Dict] = {}
+        latencies: Dict[Tuple, int] = {}
+        for ts, _, kind, intent, confidence, response_time, first_token, intent_source, satisfaction in batch:
+            for resolution in (MINUTE, HOUR):
+                bucket = int(ts // resolution) * resolution
+                row = rollups.setdefault((resolution, bucket, intent or ''), dict.fromkeys(_SUMS + ('response_time_max',), 0))
+                if kind == 'satisfaction':
+                    row['satisfaction_count'] += 1
+                    row['satisfaction_sum'] += satisfaction
+                    continue
+                row['conversations'] += 1
+                row['response_time_sum'] += response_time
+                row['response_time_max'] = max(row['response_time_max'], response_time)
+                row['confidence_sum'] += confidence
+                if first_token is not None:
+                    row['first_token_count'] += 1
+                    row['first_token_sum'] += first_token
+                if intent_source:
+                    # Same denominator as MetricsSnapshot: conversations whose intent was classified
+                    row['classified_intents'] += 1
+                if intent_source == 'local':
+                    row['local_intents'] += 1
+                if response_time > 0:
+                    key = (resolution, bucket, self._sketch.key(response_time))
+                    latencies[key] = latencies.get(key, 0) + 1
+
+        columns = _SUMS + ('response_time_max',)
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in _SUMS)
+        try:
+            with db:
+                db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                db.executemany(
+                    f"INSERT INTO rollups (resolution, bucket, intent, {', '.join(columns)}) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT (resolution, bucket, intent) DO UPDATE SET {updates}, "
+                    f"response_time_max = MAX(response_time_max, excluded.response_time_max)",
+                    [key + tuple(row[column] for column in columns) for key, row in rollups.items()]
+                )
+                db.executemany(
+                    "INSERT INTO latency_rollups VALUES (?, ?, ?, ?) ON CONFLICT (resolution, bucket, key) "
+                    "DO UPDATE SET count = count + excluded.count",
+                    [key + (count,) for key, count in latencies.items()]
+                )
+            with self._lock:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+                trim = self._stats['batches'] % 1000 == 1
+            if trim:
+                self._trim(db)
+        except sqlite3.Error as e:
+            with self._lock:
+                self._stats['errors'] += 1
+            print(f"Error writing metrics to {self.db_path}: {e}")
+
+    def _trim(self, db: sqlite3.Connection):
+        """Drop raw events and minute rollups past their retention; hourly rollups are kept"""
+        now = time.time()
+        with db:
+            db.execute("DELETE FROM events WHERE ts < ?", (now - self.retention_days * 86400,))
+            for table in ('rollups', 'latency_rollups'):
+                db.execute(f"DELETE FROM {table} WHERE resolution = ? AND bucket < ?",
+                           (MINUTE, now - self.minute_retention_days * 86400))
+
+    # Queries (rollups only)
+
+    @staticmethod
+    def _since(hours: Optional[float], resolution: int) -> int:
+        if hours is None:
+            return 0
+        return int((time.time() - hours * HOUR) // resolution) * resolution
+
+    def summary(self, hours: Optional[float] = 24) -> Dict:
+        """Totals over the last `hours` (all history if None), counted from the start of the first hour"""
+        since = self._since(hours, HOUR)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT intent, {', '.join(f'SUM({column})' for column in _SUMS)}, MAX(response_time_max) "
+                f"FROM rollups WHERE resolution = ? AND bucket >= ? GROUP BY intent", (HOUR, since)
+            ).fetchall()
+            histogram = self._db.execute(
+                "SELECT key, SUM(count) FROM latency_rollups WHERE resolution = ? AND bucket >= ? GROUP BY key",
+                (HOUR, since)
+            ).fetchall()
+        totals = dict.fromkeys(_SUMS, 0)
+        distribution = {}
+        max_response_time = 0
+        for row in rows:
+            values = dict(zip(_SUMS, row[1:-1]))
+            for column in _SUMS:
+                totals[column] += values[column] or 0
+            if row[0] and values['conversations']:
+                distribution[row[0]] = int(values['conversations'])
+            max_response_time = max(max_response_time, row[-1] or 0)
+
+        sketch = QuantileSketch(self._sketch.relative_accuracy)
+        for key, count in histogram:
+            sketch.buckets[key] = count
+            sketch.count += count
+        conversations = totals['conversations']
+
+        def ratio(numerator, denominator):
+            return numerator / denominator if denominator else 0
+        return {
+            'hours': hours,
+            'total_conversations': int(conversations),
+            'avg_response_time': ratio(totals['response_time_sum'], conversations),
+            'max_response_time': max_response_time,
+            'p50_response_time': sketch.quantile(0.5),
+            'p95_response_time': sketch.quantile(0.95),
+            'p99_response_time': sketch.quantile(0.99),
+            'avg_time_to_first_token': ratio(totals['first_token_sum'], totals['first_token_count']),
+            'avg_confidence': ratio(totals['confidence_sum'], conversations),
+            'avg_satisfaction': ratio(totals['satisfaction_sum'], totals['satisfaction_count']),
+            'llm_calls_avoided': ratio(totals['local_intents'], totals['classified_intents']),
+            'intent_distribution': distribution
+        }
+
+    def timeseries(self, hours: float = 24, resolution: int = HOUR) -> List[Dict]:
+        """Conversations and mean response time per bucket (MINUTE or HOUR) over the last `hours`"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT bucket, SUM(conversations), SUM(response_time_sum) FROM rollups "
+                "WHERE resolution = ? AND bucket >= ? GROUP BY bucket ORDER BY bucket",
+                (resolution, self._since(hours, resolution))
+            ).fetchall()
+        return [
+            {'timestamp': bucket, 'conversations': int(count),
+             'avg_response_time': total / count if count else 0}
+            for bucket, count, total in rows if count
+        ]
+
+    def stats(self) -> Dict:
+        """Writer counters and current queue depth"""
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
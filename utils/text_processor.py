@@ -0,0 +1,64 @@
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for', 'from',
+    'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so',
+    'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'with',
+    'you', 'your'
+])
+
+
+class TextProcessor:
+    """Utility functions for text normalization"""
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase text and collapse whitespace"""
+        return " ".join(text.lower().split())
+
+    @staticmethod
+    def stem(token: str) -> str:
+        """Very light stemming so 'plans' matches 'plan'"""
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            return token[:-1]
+        return token
+
+    @staticmethod
+    def tokenize(text: str, drop_stop_words: bool = True) -> List[str]:
+        """Split text into lowercase, lightly stemmed word tokens"""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if drop_stop_words:
+            tokens = [t for t in tokens if t not in STOP_WORDS]
+        return [TextProcessor.stem(t) for t in tokens]
+
+    @staticmethod
+    def ngram_features(text: str) -> List[str]:
+        """Word tokens plus character trigrams of each word, for fuzzy matching"""
+        features = []
+        for token in TextProcessor.tokenize(text):
+            features.append(f"w:{token}")
+            padded = f" {token} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    @staticmethod
+    def hashed_features(text: str, n_features: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse hashed n-gram features as (indices, counts), stable across processes"""
+        counts = Counter(zlib.crc32(f.encode('utf-8')) % n_features for f in TextProcessor.ngram_features(text))
+        return (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+
+    @staticmethod
+    def hashed_vector(text: str, n_features: int = 4096) -> np.ndarray:
+        """Dense count vector of hashed n-gram features"""
+        indices, counts = TextProcessor.hashed_features(text, n_features)
+        vector = np.zeros(n_features, dtype=np.float32)
+        vector[indices] = counts
+        return vector
@@ -0,0 +1,176 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# Trace of the request being handled in this thread/task, None when not tracing
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class _NoopSpan:
+    """Returned by span() outside a trace; entering and leaving it does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed stage of a request"""
+
+    __slots__ = ('trace', 'name', 'parent', 'attrs', 'start', 'duration', '_token')
+
+    def __init__(self, trace: 'Trace', name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.parent = None
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.trace.add(self)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. provider, attempt) to the span"""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        record = {
+            'name': self.name,
+            'start_ms': (self.start - self.trace.start) * 1000,
+            'duration_ms': self.duration * 1000
+        }
+        if self.parent:
+            record['parent'] = self.parent
+        record.update(self.attrs)
+        return record
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        # Spans can finish on worker threads (e.g. asyncio.to_thread), hence the lock
+        with self._lock:
+            self.spans.append(span)
+
+    def timings(self) -> Dict[str, float]:
+        """Total milliseconds per stage name, plus the whole request as 'total'"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration * 1000
+        totals['total'] = self.duration * 1000
+        return totals
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'timestamp': self.wall_start,
+            'duration_ms': self.duration * 1000,
+            'spans': [span.to_dict() for span in spans]
+        }
+
+
+class _TraceScope:
+    def __init__(self, tracer: 'Tracer', name: str):
+        self.tracer = tracer
+        self.trace = Trace(name)
+
+    def __enter__(self) -> Trace:
+        self._token = _current_trace.set(self.trace)
+        self._span_token = _current_span.set(None)
+        return self.trace
+
+    def __exit__(self, *exc):
+        self.trace.duration = time.perf_counter() - self.trace.start
+        _current_span.reset(self._span_token)
+        _current_trace.reset(self._token)
+        self.tracer.export(self.trace)
+        return False
+
+
+class _NoopScope:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Tracer:
+    """Starts per-request traces and optionally appends them to a JSON-lines file"""
+
+    def __init__(self, enabled: bool = True, export_path: Optional[str] = None):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def trace(self, name: str):
+        """Context manager that yields the new Trace (or None when tracing is disabled)"""
+        if not self.enabled:
+            return _NoopScope()
+        return _TraceScope(self, name)
+
+    def export(self, trace: Trace):
+        if not self.export_path:
+            return
+        line = json.dumps(trace.to_dict()) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.export_path, 'a', encoding='utf-8')
+                self._file.write(line)
+                self._file.flush()
+            except OSError as e:
+                print(f"Error writing trace log {self.export_path}: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def span(name: str, **attrs):
+    """Time a stage of the current request; a no-op when no trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, name, attrs)